@@ -0,0 +1,79 @@
+"""
+Run Benchmarks - Chunked Wendling Kernel
+
+Measures simulated seconds per wall second, peak RSS and compile time across
+N, connection density, dt and output modes, and compares against a saved
+JSON baseline.
+
+Usage:
+    python RUN_BENCHMARKS.py                    # full suite, compare to baseline
+    python RUN_BENCHMARKS.py --quick            # N <= 80 only
+    python RUN_BENCHMARKS.py --save-baseline    # record this machine as the reference
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+base_dir = Path(__file__).parent
+sys.path.insert(0, str(base_dir / 'tests'))
+
+from utils.benchmark import (compare_to_baseline, default_cases, load_baseline,
+                             run_suite, save_baseline)
+
+parser = argparse.ArgumentParser(description="Benchmark the chunked Wendling kernel")
+parser.add_argument('--quick', action='store_true', help="only N <= 80")
+parser.add_argument('--baseline', default=str(base_dir / 'results' / 'benchmarks' / 'baseline.json'),
+                    help="reference profile (JSON)")
+parser.add_argument('--output', default=str(base_dir / 'results' / 'benchmarks' / 'latest.json'),
+                    help="where to write this run")
+parser.add_argument('--save-baseline', action='store_true',
+                    help="store this run as the new reference profile")
+parser.add_argument('--target-wall', type=float, default=1.0,
+                    help="wall seconds per case")
+parser.add_argument('--speed-tol', type=float, default=0.2)
+parser.add_argument('--memory-tol', type=float, default=0.25)
+parser.add_argument('--no-isolate', action='store_true',
+                    help="run all cases in this process (peak RSS is then cumulative)")
+args = parser.parse_args()
+
+print("="*80)
+print("WENDLING KERNEL BENCHMARKS")
+print("="*80)
+
+report = run_suite(default_cases(quick=args.quick), isolate=not args.no_isolate,
+                   target_wall=args.target_wall)
+save_baseline(report, args.output)
+print(f"\n✓ Saved: {args.output}")
+
+if args.save_baseline:
+    save_baseline(report, args.baseline)
+    print(f"✓ Baseline updated: {args.baseline}")
+    sys.exit(0)
+
+if not Path(args.baseline).exists():
+    print(f"\nNo baseline at {args.baseline}; run with --save-baseline first.")
+    sys.exit(0)
+
+print("\n" + "="*80)
+print("COMPARISON WITH BASELINE")
+print("="*80)
+
+baseline = load_baseline(args.baseline)
+print(f"Reference: {baseline['machine']['node']} ({baseline['created']}), "
+      f"calibration {baseline['machine']['calibration']:.1f} vs "
+      f"{report['machine']['calibration']:.1f} here")
+
+comparison = compare_to_baseline(report, baseline, speed_tol=args.speed_tol,
+                                 memory_tol=args.memory_tol)
+for c in comparison:
+    status = "❌ REGRESSION" if c['regression'] else "✅"
+    memory = '   n/a' if c['memory_ratio'] is None else f"{c['memory_ratio']:6.2f}"
+    print(f"{status:14s} {c['key']:42s} speed {c['speed_ratio']:5.2f}x  memory {memory}x  "
+          + "; ".join(c['reasons']))
+
+n_regressions = sum(c['regression'] for c in comparison)
+print(f"\n{n_regressions} regression(s) in {len(comparison)} cases")
+print("="*80)
+
+sys.exit(1 if n_regressions else 0)
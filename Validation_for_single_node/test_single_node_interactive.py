@@ -4,9 +4,11 @@ Single-Node Wendling Model - Interactive Testing
 可以轻松调整参数或选择不同的 Wendling types 进行测试
 """
 
+import os
 import sys
 sys.path.insert(0, r'c:\Epilepsy_project\Neurolib_desktop\Neurolib_package')
 sys.path.insert(0, r'c:\Epilepsy_project\whole_brain_wendling\Validation_for_single_node')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tests'))
 
 import numpy as np
 import matplotlib.pyplot as plt
@@ -40,6 +42,10 @@ DURATION = 10000  # ms (10 seconds)
 DT = 0.1  # ms
 SEED = 42
 
+# 实时流式预览 (s)：> 0 时先用分块内核实时运行，每 0.5 s 打印滚动功率谱的峰值频率；
+# 交互调参请在 notebook 中使用 utils.live.LiveSession（session.set_params 立即生效）
+LIVE_SECONDS = 0
+
 # ============================================================================
 
 # 选择参数
@@ -68,6 +74,17 @@ print(f"  G = {params['G']}")
 print(f"  p_mean = {params['p_mean']}")
 print(f"  p_sigma = {params['p_sigma']}")
 
+if LIVE_SECONDS > 0:
+    from utils.live import LiveSession
+
+    print(f"\nLive preview ({LIVE_SECONDS} s, real time)...")
+    session = LiveSession(params, seed=SEED, psd_every=500.0)
+    every = int(round(500.0 / session.chunk))
+    for i, frame in enumerate(session.frames(LIVE_SECONDS * 1000.0)):
+        if frame['f_star'] is not None and (i + 1) % every == 0:
+            print(f"  t = {frame['t'][-1] / 1000.0:5.1f} s   f* = {frame['f_star']:5.2f} Hz   "
+                  f"chunk compute {frame['wall_ms']:.2f} ms")
+
 # ============================================================================
 # 创建并运行模型
 # ============================================================================
@@ -15,122 +15,40 @@
 - 时域和频域验证
 """
 
+import os
 import sys
 sys.path.insert(0, r'c:\Epilepsy_project\Neurolib_desktop\Neurolib_package')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tests'))
 
 import numpy as np
 import matplotlib.pyplot as plt
-from scipy.signal import welch, find_peaks
+from scipy.signal import welch
 from neurolib.models.wendling import WendlingModel
 
+from utils.activity_types import ACTIVITY_TYPES
+from utils.features import extract_features
+
 print("="*80)
 print("严格的六种活动类型测试（neurolib Wendling 模型）")
 print("="*80)
 
-# 参数集（基于 Wendling 2002 和验证测试）
+# 参数集（基于 Wendling 2002 和验证测试），定义见 utils/activity_types.py；
+# 这里只补充每种类型的随机种子与预期类型
+TYPE_SEEDS = {'Type1': 100, 'Type2': 200, 'Type3': 300, 'Type4': 400, 'Type5': 500, 'Type6': 600}
+EXPECTED_TYPES = {
+    'Type1': 'background',
+    'Type2': 'sporadic_spikes',
+    'Type3': 'sustained_SWD',
+    'Type4': 'alpha-like',
+    'Type5': 'LVFA',
+    'Type6': 'quasi-sinusoidal',
+}
 ACTIVITY_PARAMS = {
-    'Type1': {
-        'name': 'Type 1: Background activity',
-        'params': {'A': 5.0, 'B': 50, 'G': 15, 'p_mean': 90, 'p_sigma': 30.0},
-        'seed': 100,
-        'expected_freq_range': (1, 7),  # Hz
-        'expected_type': 'background'
-    },
-    'Type2': {
-        'name': 'Type 2: Sporadic spikes',
-        'params': {'A': 5.0, 'B': 40, 'G': 15, 'p_mean': 90, 'p_sigma': 30.0},
-        'seed': 200,
-        'expected_freq_range': (1, 5),
-        'expected_type': 'sporadic_spikes'
-    },
-    'Type3': {
-        'name': 'Type 3: Sustained SWD',
-        'params': {'A': 5.0, 'B': 25, 'G': 15, 'p_mean': 90, 'p_sigma': 2.0},
-        'seed': 300,
-        'expected_freq_range': (3, 6),
-        'expected_type': 'sustained_SWD'
-    },
-    'Type4': {
-        'name': 'Type 4: Slow rhythmic (alpha-like)',
-        'params': {'A': 5.0, 'B': 10, 'G': 15, 'p_mean': 90, 'p_sigma': 30.0},
-        'seed': 400,
-        'expected_freq_range': (8, 13),
-        'expected_type': 'alpha-like'
-    },
-    'Type5': {
-        'name': 'Type 5: Low-voltage fast activity',
-        'params': {'A': 5.0, 'B': 5, 'G': 25, 'p_mean': 90, 'p_sigma': 30.0},
-        'seed': 500,
-        'expected_freq_range': (10, 20),
-        'expected_type': 'LVFA'
-    },
-    'Type6': {
-        'name': 'Type 6: Slow quasi-sinusoidal',
-        'params': {'A': 5.0, 'B': 15, 'G': 0, 'p_mean': 90, 'p_sigma': 2.0},
-        'seed': 600,
-        'expected_freq_range': (9, 13),
-        'expected_type': 'quasi-sinusoidal'
-    }
+    type_key: dict(spec, seed=TYPE_SEEDS[type_key], expected_type=EXPECTED_TYPES[type_key])
+    for type_key, spec in ACTIVITY_TYPES.items()
 }
 
 
-def extract_features(t, v_pyr, freqs, psd):
-    """提取定量特征"""
-    features = {}
-    
-    # 时域特征
-    features['RMS'] = np.sqrt(np.mean(v_pyr**2))
-    features['max_amplitude'] = np.max(np.abs(v_pyr))
-    features['mean'] = np.mean(v_pyr)
-    features['std'] = np.std(v_pyr)
-    
-    # 频域特征
-    freq_mask = (freqs >= 1) & (freqs <= 50)
-    freqs_band = freqs[freq_mask]
-    psd_band = psd[freq_mask]
-    psd_db = 10*np.log10(psd_band + 1e-12)
-    
-    # 峰值频率
-    peak_idx = np.argmax(psd_band)
-    features['f_star'] = freqs_band[peak_idx]
-    features['P_star'] = psd_db[peak_idx]
-    
-    # 显著峰数量
-    distance_val = max(1, int(0.5*len(psd_db)/50))
-    peaks, properties = find_peaks(psd_db, prominence=3, distance=distance_val)
-    features['N_peaks'] = len(peaks)
-    
-    # 频带功率比
-    delta_band = (freqs >= 1) & (freqs <= 4)
-    theta_band = (freqs >= 4) & (freqs <= 8)
-    alpha_band = (freqs >= 8) & (freqs <= 13)
-    beta_band = (freqs >= 13) & (freqs <= 30)
-    gamma_band = (freqs >= 30) & (freqs <= 50)
-    
-    total_power = np.sum(psd[freq_mask])
-    features['delta_ratio'] = np.sum(psd[delta_band]) / (total_power + 1e-12)
-    features['theta_ratio'] = np.sum(psd[theta_band]) / (total_power + 1e-12)
-    features['alpha_ratio'] = np.sum(psd[alpha_band]) / (total_power + 1e-12)
-    features['beta_ratio'] = np.sum(psd[beta_band]) / (total_power + 1e-12)
-    features['gamma_ratio'] = np.sum(psd[gamma_band]) / (total_power + 1e-12)
-    
-    # 尖波检测
-    threshold = features['mean'] + 3 * features['std']
-    spikes = v_pyr > threshold
-    spike_times = t[spikes]
-    features['spike_count'] = len(spike_times)
-    features['spike_rate'] = len(spike_times) / (t[-1] - t[0])  # spikes/sec
-    
-    # ISI CV
-    if len(spike_times) > 2:
-        isis = np.diff(spike_times)
-        features['cv_isi'] = np.std(isis) / (np.mean(isis) + 1e-12)
-    else:
-        features['cv_isi'] = 0.0
-    
-    return features
-
-
 def classify_type(features, params_dict):
     """简单分类：检查频率是否在预期范围内"""
     expected_range = params_dict['expected_freq_range']
@@ -11,6 +11,7 @@ Key parameters to optimize:
 
 if __name__ == '__main__':
     import sys
+    import os
     sys.path.insert(0, r'C:\Epilepsy_project\Neurolib_desktop\Neurolib_package')
     
     import numpy as np
@@ -20,6 +21,10 @@ if __name__ == '__main__':
     from neurolib.utils.loadData import Dataset
     import time
     
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tests'))
+    from utils.sweeps import continuation_sweep
+    from utils.memory_guard import MemoryBudgetError, check_model_memory
+    
     print("=" * 70)
     print("Wendling FC Optimization - Target: r >= 0.4")
     print("=" * 70)
@@ -45,55 +50,68 @@ if __name__ == '__main__':
     print(f"\nParameter sweep: {len(K_gl_values)} x {len(het_values)} = {len(K_gl_values)*len(het_values)} combinations")
     print("-" * 70)
     
-    for K_gl in K_gl_values:
-        for het in het_values:
-            start = time.time()
+    emp_fc_flat = empirical_fc[~np.eye(N, dtype=bool)]
+    
+    def evaluate(model, start_idx):
+        # A failed point is recorded as NaN; the rest of the sweep continues
+        try:
+            # Extract signals (PSP), discarding the burn-in
+            signals = model.y1 - model.y2 - model.y3
+            signals_clean = signals[:, start_idx:]
+            
+            # Compute simulated FC
+            sim_fc = np.corrcoef(signals_clean)
+            
+            # FC-FC correlation
+            sim_fc_flat = sim_fc[~np.eye(N, dtype=bool)]
+            fc_corr, _ = pearsonr(sim_fc_flat, emp_fc_flat)
+        except Exception as e:
+            print(f"  K_gl={model.params['K_gl']:.2f}: ERROR - {e}")
+            return {'fc_corr': np.nan, 'sim_fc_mean': np.nan, 'sim_fc': None}
+        
+        return {'fc_corr': fc_corr, 'sim_fc_mean': np.mean(np.abs(sim_fc_flat)),
+                'sim_fc': sim_fc}
+    
+    # Heterogeneity changes the node parameters, so one model per het value;
+    # K_gl is swept by continuation (each point starts from the previous
+    # point's final state and only needs a short burn-in)
+    for het in het_values:
+        start = time.time()
+        
+        # Create model
+        model = WendlingModel(Cmat=ds.Cmat, Dmat=ds.Dmat, heterogeneity=het, seed=42)
+        model.params['dt'] = 0.1
+        
+        # Refuse before allocating if the longest point does not fit
+        try:
+            check_model_memory(model, duration=2000.0 + 8000.0, verbose=False)
+        except MemoryBudgetError as e:
+            print(f"  het={het:.1f}: ERROR - {e}")
+            continue
+        
+        het_results = continuation_sweep(model, {'K_gl': K_gl_values}, evaluate,
+                                         record=8000.0, burn_in_first=2000.0,
+                                         burn_in=500.0)
+        
+        elapsed = time.time() - start
+        
+        for res in het_results:
+            K_gl, fc_corr = res['K_gl'], res['fc_corr']
+            results.append({
+                'K_gl': K_gl, 'het': het, 'fc_corr': fc_corr,
+                'sim_fc_mean': res['sim_fc_mean']
+            })
             
-            # Create model
-            model = WendlingModel(Cmat=ds.Cmat, Dmat=ds.Dmat, heterogeneity=het, seed=42)
-            model.params['duration'] = 10000  # 10 seconds
-            model.params['dt'] = 0.1
-            model.params['K_gl'] = K_gl
+            status = "***" if fc_corr > 0.4 else ""
+            print(f"  K_gl={K_gl:.2f}, het={het:.1f}: FC-corr={fc_corr:.3f}, "
+                  f"sim_FC_mean={res['sim_fc_mean']:.3f} {status}")
             
-            # Run
-            try:
-                model.run()
-                
-                # Extract signals (PSP)
-                signals = np.zeros((N, len(model.t)))
-                for i in range(N):
-                    signals[i, :] = model.y1[i, :] - model.y2[i, :] - model.y3[i, :]
-                
-                # Discard transient (first 2 seconds)
-                discard_idx = int(2000 / 0.1)
-                signals_clean = signals[:, discard_idx:]
-                
-                # Compute simulated FC
-                sim_fc = np.corrcoef(signals_clean)
-                
-                # FC-FC correlation
-                sim_fc_flat = sim_fc[~np.eye(N, dtype=bool)]
-                emp_fc_flat = empirical_fc[~np.eye(N, dtype=bool)]
-                fc_corr, _ = pearsonr(sim_fc_flat, emp_fc_flat)
-                
-                elapsed = time.time() - start
-                
-                results.append({
-                    'K_gl': K_gl, 'het': het, 'fc_corr': fc_corr,
-                    'sim_fc_mean': np.mean(np.abs(sim_fc_flat))
-                })
-                
-                status = "***" if fc_corr > 0.4 else ""
-                print(f"  K_gl={K_gl:.2f}, het={het:.1f}: FC-corr={fc_corr:.3f}, "
-                      f"sim_FC_mean={np.mean(np.abs(sim_fc_flat)):.3f} ({elapsed:.1f}s) {status}")
-                
-                if fc_corr > best_corr:
-                    best_corr = fc_corr
-                    best_params = {'K_gl': K_gl, 'het': het}
-                    best_sim_fc = sim_fc.copy()
-                
-            except Exception as e:
-                print(f"  K_gl={K_gl:.2f}, het={het:.1f}: ERROR - {e}")
+            if fc_corr > best_corr:
+                best_corr = fc_corr
+                best_params = {'K_gl': K_gl, 'het': het}
+                best_sim_fc = res['sim_fc'].copy()
+        
+        print(f"  het={het:.1f}: {len(K_gl_values)} points in {elapsed:.1f}s")
     
     # Summary
     print("\n" + "=" * 70)
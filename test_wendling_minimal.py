@@ -22,6 +22,9 @@ if __name__ == '__main__':
     from neurolib.utils.loadData import Dataset
     import neurolib.utils.functions as func
     
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "tests"))
+    from utils.sweeps import continuation_sweep, split_hysteresis
+    
     plt.rcParams['image.cmap'] = 'plasma'
     
     # Create output directory
@@ -87,47 +90,48 @@ if __name__ == '__main__':
     print("=" * 70)
     
     model = WendlingModel()
-    model.params['duration'] = 2.0 * 1000
     model.params['dt'] = 0.05
     
-    max_output = []
-    min_output = []
-    peak_freq = []
-    
     B_values = np.linspace(5, 50, 30)
     
-    print("Scanning B parameter...")
-    for i, B in enumerate(B_values):
-        model.params['B'] = B
-        model.run()
-        
-        # Get last 1 second
-        last_sec = model.output[0, -int(1000/model.params['dt']):]
-        max_output.append(np.max(last_sec))
-        min_output.append(np.min(last_sec))
-        
-        # Peak frequency
+    def evaluate(model, start_idx):
+        # Last 1 second (after the continuation burn-in)
+        last_sec = model.output[0, start_idx:]
         frs, powers = func.getPowerSpectrum(
-            model.output[:, -int(1000/model.params['dt']):], 
+            model.output[:, start_idx:], 
             dt=model.params['dt']
         )
-        peak_freq.append(frs[np.argmax(powers)])
-        
-        if (i + 1) % 10 == 0:
-            print(f"  Progress: {i+1}/{len(B_values)}")
+        return {
+            'max': np.max(last_sec),
+            'min': np.min(last_sec),
+            'peak_freq': frs[np.argmax(powers)],
+        }
+    
+    # Continuation: each B starts from the previous B's final state,
+    # so only the first point pays the full transient (up + down pass)
+    print("Scanning B parameter (continuation, up/down)...")
+    results = continuation_sweep(model, {'B': B_values}, evaluate,
+                                 record=1000.0, burn_in_first=1000.0,
+                                 burn_in=200.0, hysteresis=True, verbose=True)
+    branches = split_hysteresis(results, 'B')
     
     # Plot bifurcation diagram
     fig, axes = plt.subplots(1, 2, figsize=(12, 4))
     
-    axes[0].fill_between(B_values, min_output, max_output, alpha=0.3, color='blue')
-    axes[0].plot(B_values, max_output, 'b-', lw=2, label='Max')
-    axes[0].plot(B_values, min_output, 'b-', lw=2, label='Min')
+    for direction, color in [('up', 'b'), ('down', 'm')]:
+        B_branch, res = branches[direction]
+        max_output = [r['max'] for r in res]
+        min_output = [r['min'] for r in res]
+        axes[0].fill_between(B_branch, min_output, max_output, alpha=0.15, color=color)
+        axes[0].plot(B_branch, max_output, f'{color}-', lw=2, label=f'Max ({direction})')
+        axes[0].plot(B_branch, min_output, f'{color}--', lw=2, label=f'Min ({direction})')
+        axes[1].plot(B_branch, [r['peak_freq'] for r in res], f'{color}-o', lw=2,
+                     markersize=4, label=f'B {direction}')
     axes[0].set_xlabel("B (Excitatory→Inhibitory gain)")
     axes[0].set_ylabel("PSP amplitude (mV)")
     axes[0].set_title("Bifurcation Diagram - Amplitude")
     axes[0].legend()
     
-    axes[1].plot(B_values, peak_freq, 'r-o', lw=2, markersize=4)
     axes[1].set_xlabel("B (Excitatory→Inhibitory gain)")
     axes[1].set_ylabel("Peak Frequency (Hz)")
     axes[1].set_title("Bifurcation Diagram - Peak Frequency")
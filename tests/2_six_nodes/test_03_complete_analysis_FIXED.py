@@ -9,8 +9,10 @@
 """
 
 import sys
+import os
 sys.path.insert(0, r'c:\Epilepsy_project\Neurolib_desktop\Neurolib_package')
 sys.path.insert(0, r'c:\Epilepsy_project\whole_brain_wendling\Validation_for_single_node')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
 
 import numpy as np
 import matplotlib.pyplot as plt
@@ -18,6 +20,7 @@ from scipy.signal import welch
 from scipy.stats import pearsonr
 from neurolib.models.wendling import WendlingModel
 from STANDARD_PARAMETERS import WENDLING_STANDARD_PARAMS
+from utils.wendling_kernel import ChunkedSimulation
 
 print("="*80)
 print("6-Nodes Complete Network Analysis (FIXED)")
@@ -123,10 +126,7 @@ if NODE_TYPES is not None:
     G_vals = np.zeros(N)
     A_vals = np.zeros(N)
     p_mean_vals = np.zeros(N)
-    
-    # Determine p_sigma (currently NOT vectorized in model, so use most common value)
-    p_sigma_vals = [WENDLING_STANDARD_PARAMS[nt]['params']['p_sigma'] for nt in NODE_TYPES]
-    p_sigma_mode = max(set(p_sigma_vals), key=p_sigma_vals.count)  # Most common value
+    p_sigma_vals = np.zeros(N)
     
     print(f"\nNode Parameter Assignment:")
     print(f"{'Node':<6} {'Type':<10} {'B':<6} {'G':<6} {'A':<6} {'p_mean':<8} {'p_sigma':<10} {'Description'}")
@@ -140,20 +140,16 @@ if NODE_TYPES is not None:
         G_vals[i] = params['G']
         A_vals[i] = params['A']
         p_mean_vals[i] = params['p_mean']
+        p_sigma_vals[i] = params['p_sigma']
         
         print(f"{i:<6} {node_type:<10} {params['B']:<6.0f} {params['G']:<6.0f} {params['A']:<6.1f} {params['p_mean']:<8.0f} {params['p_sigma']:<10.1f} {desc}")
     
-    if len(set(p_sigma_vals)) > 1:
-        print(f"\n[!] Note: p_sigma is not yet vectorized in model.")
-        print(f"   Using mode value: p_sigma = {p_sigma_mode} for all nodes")
-        print(f"   (Some types specify {set(p_sigma_vals)}, but model uses scalar)")
-    
     # Assign to model - MUST be vectors for heterogeneity mode
     model.params['B'] = B_vals
     model.params['G'] = G_vals
     model.params['A'] = A_vals
     model.params['p_mean'] = p_mean_vals
-    model.params['p_sigma'] = p_sigma_mode  # Scalar only
+    model.params['p_sigma'] = p_sigma_vals  # Per node (vectorized kernel)
     
     # Verify parameters were set correctly
     print(f"\n[OK] Verification after assignment:")
@@ -188,7 +184,9 @@ if NODE_TYPES is not None:
 print(f"\nRunning simulation...")
 import time
 start_time = time.time()
-model.run()
+# Vectorized kernel: every parameter (including p_sigma) may differ per node
+sim = ChunkedSimulation(model.params, Cmat=Cmat, Dmat=Dmat, seed=42)
+t, signals, _ = sim.advance(model.params['duration'])
 elapsed = time.time() - start_time
 print(f"  Simulation completed in {elapsed:.2f}s")
 
@@ -198,12 +196,7 @@ if NODE_TYPES is not None:
     print(f"  B = {model.params['B']}")
     print(f"  G = {model.params['G']}")
 
-# Extract signals
-t = model.t
-signals = np.zeros((N, len(t)))
-for i in range(N):
-    signals[i, :] = model.y1[i, :] - model.y2[i, :] - model.y3[i, :]
-
+# Extract signals (v_pyr = y1 - y2 - y3, returned by the kernel)
 print(f"\nExtracting signals...")
 print(f"  Signal shape: {signals.shape}")
 print(f"  Time shape: {t.shape}")
@@ -6,27 +6,27 @@ Six Activity Types in Whole-Brain Network
 """
 
 import sys
+import os
 sys.path.insert(0, r'c:\Epilepsy_project\Neurolib_desktop\Neurolib_package')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
 
 import numpy as np
 import matplotlib.pyplot as plt
 from scipy.signal import welch
 from scipy.stats import pearsonr
 from neurolib.models.wendling import WendlingModel
+from utils.activity_types import ACTIVITY_TYPES, node_params_for_types
+from utils.wendling_kernel import ChunkedSimulation
 
 print("="*80)
 print("Six Activity Types in Whole-Brain Network")
 print("="*80)
 
-# Correct Wendling 2002 parameters (from test_six_types_strict.py)
-TYPE_PARAMS = {
-    0: {'B': 50, 'G': 15, 'name': 'Type 1: Background'},
-    1: {'B': 40, 'G': 15, 'name': 'Type 2: Sporadic spikes'},
-    2: {'B': 25, 'G': 15, 'name': 'Type 3: SWD'},
-    3: {'B': 10, 'G': 15, 'name': 'Type 4: Alpha-like'},
-    4: {'B': 5,  'G': 25, 'name': 'Type 5: LVFA'},
-    5: {'B': 15, 'G': 0,  'name': 'Type 6: Quasi-sinusoidal'},
-}
+# Correct Wendling 2002 parameters (utils/activity_types.py); node i gets Type i+1.
+# p_sigma is per node (vectorized kernel), so all six types share one run
+NODE_TYPES = ['Type1', 'Type2', 'Type3', 'Type4', 'Type5', 'Type6']
+TYPE_PARAMS = {i: dict(ACTIVITY_TYPES[t]['params'], name=ACTIVITY_TYPES[t]['name'])
+               for i, t in enumerate(NODE_TYPES)}
 
 N = 6
 np.random.seed(42)
@@ -86,33 +86,25 @@ for test_idx, (K_gl, coupling_desc) in enumerate(coupling_strengths):
     model.params['dt'] = 0.1
     model.params['K_gl'] = K_gl
     
-    # Manually assign each node a different activity type
-    B_vals = np.zeros(N)
-    G_vals = np.zeros(N)
-    for i in range(N):
-        B_vals[i] = TYPE_PARAMS[i]['B']
-        G_vals[i] = TYPE_PARAMS[i]['G']
-    
-    model.params['B'] = B_vals
-    model.params['G'] = G_vals
-    model.params['A'] = 5.0  # Scalar, will broadcast
-    model.params['p_mean'] = 90.0
+    # Manually assign each node a different activity type (A, B, G, p_mean, p_sigma)
+    node_params = node_params_for_types(NODE_TYPES)
+    for key, vals in node_params.items():
+        model.params[key] = vals
+    B_vals = node_params['B']
+    G_vals = node_params['G']
+    p_sigma_vals = node_params['p_sigma']
     
     print(f"\nNode Parameter Assignment:")
     for i in range(N):
-        print(f"  Node {i}: {TYPE_PARAMS[i]['name']:<30} B={B_vals[i]:<4.0f} G={G_vals[i]:<4.0f}")
+        print(f"  Node {i}: {TYPE_PARAMS[i]['name']:<30} B={B_vals[i]:<4.0f} G={G_vals[i]:<4.0f} "
+              f"p_sigma={p_sigma_vals[i]:<4.1f}")
     
-    # Run simulation
+    # Run simulation (vectorized kernel: per-node p_sigma in a single run)
     print(f"\nRunning simulation...")
-    model.run()
+    sim = ChunkedSimulation(model.params, Cmat=Cmat, Dmat=Dmat, seed=42)
+    t, signals, _ = sim.advance(model.params['duration'])
     print(f"  Done!")
     
-    # Extract signals
-    t = model.t
-    signals = np.zeros((N, len(t)))
-    for i in range(N):
-        signals[i, :] = model.y1[i, :] - model.y2[i, :] - model.y3[i, :]
-    
     # Discard transient
     discard_idx = int(2000 / 0.1)
     signals_clean = signals[:, discard_idx:]
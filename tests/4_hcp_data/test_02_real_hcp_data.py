@@ -5,8 +5,10 @@ Load actual brain connectivity from HCP dataset and run Wendling model.
 Compare simulated FC with empirical FC.
 """
 
+import os
 import sys
 sys.path.insert(0, r'c:\Epilepsy_project\Neurolib_desktop\Neurolib_package')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
 
 import numpy as np
 import matplotlib.pyplot as plt
@@ -15,6 +17,13 @@ from neurolib.models.wendling import WendlingModel
 from neurolib.utils.loadData import Dataset
 import time
 
+from utils.feature_atlas import FeatureAtlas
+from utils.features import classify_batch, extract_features_batch
+from utils.memory_guard import check_model_memory
+
+# 单节点特征图谱（首次运行时构建并缓存）
+ATLAS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'feature_atlas.npz')
+
 print("="*80)
 print("Real HCP Data Test - Wendling Whole-Brain Model")
 print("="*80)
@@ -118,8 +127,9 @@ print(f"    K_gl = 0.15")
 print(f"    N = {N}")
 print(f"    SC density (thresholded) = {density_after:.3f}")
 
-# Run simulation
+# Run simulation (check the memory estimate before model.run() allocates)
 print(f"\nRunning simulation...")
+check_model_memory(model)
 start_time = time.time()
 model.run()
 sim_time = time.time() - start_time
@@ -170,37 +180,31 @@ else:
     print(f"  B: {model.params['B']} (scalar)")
     print(f"  G: {model.params['G']} (scalar)")
 
-# Classify activity types
-def classify_activity_type(signal, B, G):
-    amplitude = np.std(signal)
-    spike_threshold = np.mean(signal) + 3 * np.std(signal)
-    n_spikes = np.sum(signal > spike_threshold)
-    spike_rate = n_spikes / (len(signal) * 0.0001)
-    
-    if B < 20:
-        return "Type 1"
-    elif 20 <= B < 28:
-        return "Type 2" if 12 <= G <= 25 else "Type 2*"
-    elif 28 <= B < 35:
-        return "Type 3" if spike_rate > 2 else "Type 2/3"
-    else:
-        return "Type 3+"
-
-activity_types = []
-for i in range(N):
-    B_i = model.params['B'][i] if isinstance(model.params['B'], np.ndarray) else model.params['B']
-    G_i = model.params['G'][i] if isinstance(model.params['G'], np.ndarray) else model.params['G']
-    activity_type = classify_activity_type(signals_clean[i, :], B_i, G_i)
-    activity_types.append(activity_type)
+# Classify activity types (single-node feature atlas lookup, no extra simulation).
+# The atlas is built separately: python -m utils.feature_atlas 4_hcp_data/feature_atlas.npz
+if os.path.exists(ATLAS_PATH):
+    activity_types = list(FeatureAtlas.load(ATLAS_PATH).label(model.params))
+else:
+    activity_types = []
+    print(f"\n  (Feature atlas not found at {ATLAS_PATH}; skipping isolated-node types."
+          f"\n   Build it with: python -m utils.feature_atlas {ATLAS_PATH})")
+
+# Observed types in the coupled network (batched features of all nodes)
+observed_types = list(classify_batch(extract_features_batch(signals_clean, fs=10000.0)))
 
 from collections import Counter
 type_counts = Counter(activity_types)
-print(f"\nActivity Type Distribution:")
-for atype in sorted(type_counts.keys()):
-    count = type_counts[atype]
-    print(f"  {atype}: {count}/{N} nodes ({count/N*100:.1f}%)")
-
-if type_counts.get('Type 3', 0) + type_counts.get('Type 3+', 0) > N * 0.3:
+observed_counts = Counter(observed_types)
+print(f"\nActivity Type Distribution (isolated-node atlas / observed in network):")
+for atype in sorted(set(type_counts) | set(observed_counts)):
+    count = type_counts.get(atype, 0)
+    observed = observed_counts.get(atype, 0)
+    isolated = f"{count}/{N} nodes ({count/N*100:.1f}%)" if activity_types else "n/a"
+    print(f"  {atype}: {isolated} / {observed}/{N} nodes ({observed/N*100:.1f}%)")
+
+# Without the atlas, judge epileptic activity from the observed network types
+warn_counts = type_counts if activity_types else observed_counts
+if warn_counts.get('Type3', 0) > N * 0.3:
     print(f"\n  ⚠️  WARNING: High proportion of epileptic activity!")
     print(f"  Consider: Reduce B_base or increase G_base")
 
@@ -2,43 +2,107 @@
 共用工具函数模块
 
 提供所有测试阶段共用的分析和绘图工具。
+
+子模块按需导入：`import utils` 只加载本文件，访问 `utils.ChunkedSimulation` 时才导入
+wendling_kernel，访问绘图函数时才导入 matplotlib。无界面的扫描、进程池 worker 和命令行
+工具只为实际用到的部分付出导入时间和内存。
 """
 
-from .analysis_tools import (
-    compute_fc,
-    compute_psd,
-    extract_peak_frequency,
-    compute_modularity
-)
-
-from .plotting_tools import (
-    plot_timeseries,
-    plot_psd,
-    plot_fc_matrix,
-    plot_sc_fc_comparison
-)
-
-from .network_generators import (
-    create_modular_network,
-    create_random_network,
-    create_ring_network
-)
-
-__all__ = [
+import importlib
+
+
+# 子模块 -> 导出的名称（按功能分组）
+_EXPORTS = {
     # Analysis tools
-    'compute_fc',
-    'compute_psd',
-    'extract_peak_frequency',
-    'compute_modularity',
-    
+    'analysis_tools': (
+        'compute_fc', 'compute_psd', 'extract_peak_frequency', 'compute_modularity',
+    ),
     # Plotting tools
-    'plot_timeseries',
-    'plot_psd',
-    'plot_fc_matrix',
-    'plot_sc_fc_comparison',
-    
+    'plotting_tools': (
+        'plot_timeseries', 'plot_psd', 'plot_fc_matrix', 'plot_sc_fc_comparison',
+        'plot_bifurcation_map',
+    ),
     # Network generators
-    'create_modular_network',
-    'create_random_network',
-    'create_ring_network',
-]
+    'network_generators': (
+        'create_modular_network', 'create_random_network', 'create_ring_network',
+    ),
+    # Warm start
+    'warm_start': (
+        'WarmStartStore', 'detect_burn_in', 'get_final_state', 'set_initial_state',
+        'warm_start_model',
+    ),
+    # Sweeps
+    'sweeps': ('order_grid_path', 'continuation_sweep', 'split_hysteresis'),
+    # Chunked kernel
+    'wendling_kernel': (
+        'ChunkedSimulation', 'bin_coupling_delays', 'load_default_params', 'low_rank_coupling',
+        'prepare_kernel_params', 'run_model',
+    ),
+    # Approximate coupling
+    'coupling_approx': ('delay_binning_report', 'low_rank_report', 'select_coupling_rank',
+                        'select_delay_bins'),
+    # JIT cache
+    'jit_cache': ('build_aot', 'prime_jit_cache'),
+    # Profiling
+    'profiling': ('RunStats', 'read_jsonl', 'summarize_phases'),
+    # Parameter schedules
+    'schedules': ('ParameterSchedule', 'ramp_bifurcation'),
+    # Activity types
+    'activity_types': ('ACTIVITY_TYPES', 'node_params_for_types'),
+    # Bifurcation analysis
+    'bifurcation': (
+        'fixed_points', 'jacobian', 'limit_cycle_branch', 'node_constants', 'trace_branch',
+        'two_parameter_map',
+    ),
+    # Linear response
+    'linear_response': (
+        'analytic_peak_frequency', 'analytic_psd', 'network_fixed_point', 'network_stability',
+        'predict_fc', 'screen_coupling',
+    ),
+    # Features and regime maps
+    'features': (
+        'classify_activity', 'classify_batch', 'extract_features', 'extract_features_batch',
+        'label_node', 'node_features', 'type_centroids',
+    ),
+    'regime_map': ('RegimeAtlas', 'explore_regimes'),
+    'feature_atlas': ('FeatureAtlas', 'params_for_targets'),
+    # Noise ensembles
+    'ensemble': ('ensemble_statistics', 'run_ensemble', 'simulate_ensemble'),
+    # Benchmarks
+    'benchmark': ('compare_to_baseline', 'run_suite'),
+    # On-disk output
+    'output_store': ('HDF5Writer', 'OutputReader', 'run_to_disk'),
+    # Memory guard
+    'memory_guard': (
+        'MemoryBudgetError', 'check_model_memory', 'estimate_run_memory', 'guarded_run',
+        'plan_run',
+    ),
+    # Live streaming
+    'live': ('LiveSession',),
+    # Simulation server
+    'sim_server': ('SimulationClient', 'SimulationService'),
+    # Observers
+    'observers': (
+        'BOLDObserver', 'EventObserver', 'FCObserver', 'PSDObserver', 'SensorObserver',
+        'bipolar_montage', 'run_bold', 'run_sensors',
+    ),
+    # Simulation / analysis pipeline
+    'pipeline': ('analyze_model', 'run_pipeline'),
+}
+
+_MODULE_OF = {name: module for module, names in _EXPORTS.items() for name in names}
+
+__all__ = list(_MODULE_OF)
+
+
+def __getattr__(name):
+    module = _MODULE_OF.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'.{module}', __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,68 @@
+"""
+Wendling 2002 六种活动类型
+
+六种类型参数的唯一定义（Validation_for_single_node/test_six_types_strict.py 与
+tests/2_six_nodes/test_04_six_types_network.py 都从这里导入），并提供把类型列表
+转换为逐节点参数向量的工具（包括 p_sigma）。
+"""
+
+import numpy as np
+
+
+ACTIVITY_TYPES = {
+    'Type1': {
+        'name': 'Type 1: Background activity',
+        'params': {'A': 5.0, 'B': 50.0, 'G': 15.0, 'p_mean': 90.0, 'p_sigma': 30.0},
+        'expected_freq_range': (1, 7),
+    },
+    'Type2': {
+        'name': 'Type 2: Sporadic spikes',
+        'params': {'A': 5.0, 'B': 40.0, 'G': 15.0, 'p_mean': 90.0, 'p_sigma': 30.0},
+        'expected_freq_range': (1, 5),
+    },
+    'Type3': {
+        'name': 'Type 3: Sustained SWD',
+        'params': {'A': 5.0, 'B': 25.0, 'G': 15.0, 'p_mean': 90.0, 'p_sigma': 2.0},
+        'expected_freq_range': (3, 6),
+    },
+    'Type4': {
+        'name': 'Type 4: Slow rhythmic (alpha-like)',
+        'params': {'A': 5.0, 'B': 10.0, 'G': 15.0, 'p_mean': 90.0, 'p_sigma': 30.0},
+        'expected_freq_range': (8, 13),
+    },
+    'Type5': {
+        'name': 'Type 5: Low-voltage fast activity',
+        'params': {'A': 5.0, 'B': 5.0, 'G': 25.0, 'p_mean': 90.0, 'p_sigma': 30.0},
+        'expected_freq_range': (10, 20),
+    },
+    'Type6': {
+        'name': 'Type 6: Slow quasi-sinusoidal',
+        'params': {'A': 5.0, 'B': 15.0, 'G': 0.0, 'p_mean': 90.0, 'p_sigma': 2.0},
+        'expected_freq_range': (9, 13),
+    },
+}
+
+
+def node_params_for_types(node_types, types=ACTIVITY_TYPES):
+    """
+    把每个节点的类型转换为逐节点参数向量。
+
+    Parameters
+    ----------
+    node_types : sequence of str
+        每个节点的类型，例如 ['Type1', 'Type3', 'Type6']
+    types : dict
+        类型定义（默认 ACTIVITY_TYPES）
+
+    Returns
+    -------
+    params : dict
+        参数名 -> ndarray, shape (N,)（包括 p_sigma）
+    """
+    for node_type in node_types:
+        if node_type not in types:
+            raise ValueError(f"Invalid type: {node_type}. Must be one of {list(types.keys())}")
+
+    keys = types[node_types[0]]['params'].keys()
+    return {key: np.array([types[nt]['params'][key] for nt in node_types], dtype=np.float64)
+            for key in keys}
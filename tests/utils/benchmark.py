@@ -0,0 +1,362 @@
+"""
+分块内核的基准测试
+
+在 N、连接密度、dt 与输出模式上扫描 ChunkedSimulation，记录每秒墙钟时间模拟的秒数
+(sim_per_wall)、峰值内存与首次调用（编译 / 读取 numba 缓存）时间。结果与机器信息一起
+保存为 JSON 基线；与参考基线比较时，吞吐量先除以各自机器的校准分数，
+因此换机器后仍可判断是否退化。
+"""
+
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+from numba import njit
+
+from .wendling_kernel import ChunkedSimulation, load_default_params
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# 默认扫描
+BENCH_N = (1, 6, 20, 80, 400, 1000)
+BENCH_DENSITY = (1.0, 0.1)
+BENCH_DT = (0.1, 0.05)
+# 输出模式 -> (decimate, record_states)
+OUTPUT_MODES = {
+    'v': (1, False),
+    'decimated': (10, False),
+    'states': (1, True),
+}
+
+_TESTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@njit(cache=True)
+def _calibration_loop(n):
+    """固定工作量的标量循环（与内核相同的 exp / 乘加组合）。"""
+    acc = 0.0
+    x = 0.1
+    for k in range(n):
+        x = 0.999 * x + 1.0 / (1.0 + np.exp(0.56 * (6.0 - x)))
+        acc += x
+    return acc
+
+
+def calibration_score(n=2_000_000, repeats=5):
+    """
+    机器速度的校准分数（每秒循环次数的百万倍数，取多次中的最大值）。
+    """
+    _calibration_loop(10)
+    best = np.inf
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        _calibration_loop(n)
+        best = min(best, time.perf_counter() - t0)
+    return n / best / 1e6
+
+
+def machine_profile():
+    """
+    当前机器与软件版本信息，以及校准分数。
+
+    Returns
+    -------
+    profile : dict
+    """
+    import numba
+    return {
+        'node': platform.node(),
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'numba': numba.__version__,
+        'calibration': calibration_score(),
+    }
+
+
+def peak_rss_mb():
+    """进程的峰值常驻内存 (MB)；无法获取时为 None。"""
+    if resource is not None:
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux 以 KB 计，macOS 以字节计
+        return rss / 1024.0 ** 2 if sys.platform == 'darwin' else rss / 1024.0
+    try:
+        import psutil
+    except ImportError:
+        return None
+    info = psutil.Process().memory_info()
+    return getattr(info, 'peak_wset', info.rss) / 1024.0 ** 2
+
+
+def case_key(case):
+    """基准用例的唯一键，例如 'N=80,density=0.1,dt=0.1,output=v'。"""
+    return f"N={case['N']},density={case['density']},dt={case['dt']},output={case['output']}"
+
+
+def default_cases(n_values=BENCH_N, quick=False):
+    """
+    默认用例：所有 N 的稠密 / 稀疏连接（dt=0.1，输出 v_pyr），
+    以及 N=80 上 dt 与输出模式的变化。
+
+    Parameters
+    ----------
+    n_values : sequence of int
+        网络规模
+    quick : bool
+        只保留 N <= 80（用于快速检查）
+
+    Returns
+    -------
+    cases : list of dict
+    """
+    if quick:
+        n_values = [n for n in n_values if n <= 80]
+    cases = [{'N': n, 'density': d, 'dt': BENCH_DT[0], 'output': 'v'}
+             for n in n_values for d in (BENCH_DENSITY if n > 1 else BENCH_DENSITY[:1])]
+    for dt in BENCH_DT[1:]:
+        cases.append({'N': 80, 'density': BENCH_DENSITY[1], 'dt': dt, 'output': 'v'})
+    for output in OUTPUT_MODES:
+        if output != 'v':
+            cases.append({'N': 80, 'density': BENCH_DENSITY[1], 'dt': BENCH_DT[0],
+                          'output': output})
+    return cases
+
+
+def benchmark_network(N, density, seed=0):
+    """
+    基准用的随机网络（对角为零，距离 0-100 mm，signalV=20 时最长延迟 5 ms）。
+
+    Returns
+    -------
+    Cmat, Dmat : ndarray, shape (N, N)
+    """
+    rng = np.random.default_rng(seed)
+    Cmat = rng.uniform(0.0, 1.0, (N, N)) * (rng.random((N, N)) < density)
+    np.fill_diagonal(Cmat, 0.0)
+    Dmat = rng.uniform(0.0, 100.0, (N, N))
+    return Cmat, Dmat
+
+
+def run_case(case, target_wall=1.0, chunk_duration=1000.0, seed=0):
+    """
+    在当前进程中运行一个用例。
+
+    模拟时长自动确定：先运行 10 ms 估计速度，再按 target_wall 秒墙钟时间外推
+    （限制在 10 ms - 20 s）。
+
+    Parameters
+    ----------
+    case : dict
+        'N', 'density', 'dt', 'output'（OUTPUT_MODES 的键），可选 'duration' (ms)
+    target_wall : float
+        每个用例的目标墙钟时间 (s)
+    chunk_duration : float
+        分块时长 (ms)
+    seed : int
+        网络与噪声的随机种子
+
+    Returns
+    -------
+    result : dict
+        用例字段以及 'first_call_s', 'duration_ms', 'wall_s', 'sim_per_wall',
+        'steps_per_s', 'node_steps_per_s', 'peak_alloc_mb', 'peak_rss_mb'
+    """
+    N, dt = int(case['N']), float(case['dt'])
+    decimate, record_states = OUTPUT_MODES[case['output']]
+    Cmat, Dmat = benchmark_network(N, case['density'], seed)
+    params = load_default_params(Cmat, Dmat, seed=seed, heterogeneity=0.1)
+    params.update({'dt': dt, 'K_gl': 0.1, 'p_sigma': 30.0})
+
+    # 首次调用（含编译或读取缓存）
+    t0 = time.perf_counter()
+    sim = ChunkedSimulation(params, seed=seed)
+    sim.advance(10 * dt * decimate, decimate=decimate, record_states=record_states)
+    first_call = time.perf_counter() - t0
+
+    duration = case.get('duration')
+    if duration is None:
+        t0 = time.perf_counter()
+        sim.advance(10.0, decimate=decimate, record_states=record_states)
+        per_ms = (time.perf_counter() - t0) / 10.0
+        duration = float(np.clip(target_wall / max(per_ms, 1e-9), 10.0, 20000.0))
+
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    sim.run(duration, chunk_duration=chunk_duration, decimate=decimate,
+            record_states=record_states)
+    wall = time.perf_counter() - t0
+    _, peak_alloc = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    n_steps = int(round(duration / dt)) // decimate * decimate
+    result = dict(case)
+    result.update({
+        'nnz': int(np.count_nonzero(Cmat)),
+        'first_call_s': first_call,
+        'duration_ms': duration,
+        'wall_s': wall,
+        'sim_per_wall': duration / 1000.0 / wall,
+        'steps_per_s': n_steps / wall,
+        'node_steps_per_s': n_steps * N / wall,
+        'peak_alloc_mb': peak_alloc / 1024.0 ** 2,
+        'peak_rss_mb': peak_rss_mb(),
+    })
+    return result
+
+
+def _worker_main():
+    """子进程入口：从 stdin 读取 JSON 参数，把结果 JSON 写到 stdout 的最后一行。"""
+    kwargs = json.loads(sys.stdin.read())
+    print(json.dumps(run_case(**kwargs)))
+
+
+def _run_subprocess(code, stdin='', env=None, timeout=None):
+    out = subprocess.run([sys.executable, '-c', code], input=stdin, capture_output=True,
+                         text=True, cwd=_TESTS_DIR, env=env, timeout=timeout, check=True)
+    return out.stdout.strip().splitlines()[-1]
+
+
+_WORKER = ("import sys; sys.path.insert(0, {path!r}); "
+           "from utils.benchmark import _worker_main; _worker_main()")
+
+_COMPILE = ("import sys, time; sys.path.insert(0, {path!r}); "
+            "from utils.benchmark import run_case; "
+            "t0 = time.perf_counter(); "
+            "run_case({{'N': 2, 'density': 1.0, 'dt': 0.1, 'output': 'v', 'duration': 1.0}}); "
+            "print(time.perf_counter() - t0)")
+
+
+def measure_compile_time(timeout=600):
+    """
+    冷编译时间 (s)：在使用空 NUMBA_CACHE_DIR 的子进程中运行一个极小的用例。
+
+    子进程设置 WENDLING_NO_AOT=1，即使已构建 AOT 模块也测量内核的 JIT 编译。
+    """
+    with tempfile.TemporaryDirectory() as cache_dir:
+        env = dict(os.environ, NUMBA_CACHE_DIR=cache_dir, WENDLING_NO_AOT='1')
+        return float(_run_subprocess(_COMPILE.format(path=_TESTS_DIR), env=env,
+                                     timeout=timeout))
+
+
+def run_suite(cases=None, isolate=True, target_wall=1.0, compile_time=True,
+              timeout=600, verbose=True):
+    """
+    运行基准用例。
+
+    Parameters
+    ----------
+    cases : sequence of dict, optional
+        用例（默认 default_cases()）
+    isolate : bool
+        每个用例在独立子进程中运行，使峰值 RSS 只反映该用例
+    target_wall : float
+        每个用例的目标墙钟时间 (s)
+    compile_time : bool
+        是否测量冷编译时间
+    timeout : float
+        每个子进程的超时 (s)
+    verbose : bool
+        是否打印进度
+
+    Returns
+    -------
+    report : dict
+        'machine'（machine_profile）、'created'、'compile_s' 与 'results'（每个用例一个 dict）
+    """
+    cases = list(cases if cases is not None else default_cases())
+    report = {
+        'machine': machine_profile(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'compile_s': measure_compile_time(timeout) if compile_time else None,
+        'results': [],
+    }
+    if verbose:
+        m = report['machine']
+        print(f"  {m['processor']} x{m['cpu_count']}, calibration {m['calibration']:.1f}")
+        if report['compile_s'] is not None:
+            print(f"  cold compile: {report['compile_s']:.1f} s")
+
+    for case in cases:
+        if isolate:
+            payload = json.dumps({'case': case, 'target_wall': target_wall})
+            result = json.loads(_run_subprocess(_WORKER.format(path=_TESTS_DIR), payload,
+                                                timeout=timeout))
+        else:
+            result = run_case(case, target_wall=target_wall)
+        report['results'].append(result)
+        if verbose:
+            rss = result['peak_rss_mb']
+            print(f"  {case_key(case):42s} {result['sim_per_wall']:8.3f} sim-s/s  "
+                  f"{result['node_steps_per_s'] / 1e6:7.2f} M node-steps/s  "
+                  f"peak {rss if rss is None else round(rss)} MB")
+    return report
+
+
+def save_baseline(report, path):
+    """把 run_suite 的结果保存为 JSON 基线。"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+
+
+def load_baseline(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare_to_baseline(report, baseline, speed_tol=0.2, memory_tol=0.25, normalize=True):
+    """
+    与基线比较，标记退化的用例。
+
+    Parameters
+    ----------
+    report, baseline : dict
+        run_suite 的结果（baseline 通常来自 load_baseline）
+    speed_tol : float
+        吞吐量下降超过该比例视为退化
+    memory_tol : float
+        峰值内存增加超过该比例视为退化
+    normalize : bool
+        吞吐量按两台机器的校准分数归一化
+
+    Returns
+    -------
+    comparison : list of dict
+        每个共同用例一项：'key', 'speed_ratio', 'memory_ratio', 'regression'（bool）,
+        'reasons'（list of str）
+    """
+    scale = 1.0
+    if normalize:
+        scale = baseline['machine']['calibration'] / report['machine']['calibration']
+    reference = {case_key(r): r for r in baseline['results']}
+
+    comparison = []
+    for r in report['results']:
+        key = case_key(r)
+        ref = reference.get(key)
+        if ref is None:
+            continue
+        speed = r['sim_per_wall'] * scale / ref['sim_per_wall']
+        memory = None
+        if r.get('peak_rss_mb') and ref.get('peak_rss_mb'):
+            memory = r['peak_rss_mb'] / ref['peak_rss_mb']
+        reasons = []
+        if speed < 1.0 - speed_tol:
+            reasons.append(f"throughput {speed:.2f}x of baseline")
+        if memory is not None and memory > 1.0 + memory_tol:
+            reasons.append(f"peak RSS {memory:.2f}x of baseline")
+        comparison.append({'key': key, 'speed_ratio': speed, 'memory_ratio': memory,
+                           'regression': bool(reasons), 'reasons': reasons})
+    return comparison
@@ -0,0 +1,409 @@
+"""
+单节点确定性分岔分析
+
+针对无噪声、无耦合的 Wendling 单节点方程：
+- 求全部不动点（平衡时所有状态都是 y0 的函数，化为一维求根）
+- 解析 Jacobian 与特征值
+- 沿一个参数追踪平衡点分支，检测 Hopf 与鞍结（saddle-node）分岔
+- 用确定性内核做往返扫描，检测极限环折叠（limit-cycle fold，双稳区的边界）
+- (B, G) 等二维参数平面的分岔图
+
+时间单位为秒（a, b, g 的单位为 1/s），特征值虚部 / 2π 即振荡频率 (Hz)。
+"""
+
+import numpy as np
+from scipy.optimize import brentq
+
+from .wendling_kernel import (ChunkedSimulation, DEFAULT_PARAMS, C_RATIOS,
+                              N_STATE_VARS)
+
+
+def node_constants(params=None):
+    """
+    单节点参数（标量），缺失项使用默认值。
+
+    Parameters
+    ----------
+    params : dict, optional
+        参数，例如 {'A': 5, 'B': 25, 'G': 15, 'p_mean': 90}
+
+    Returns
+    -------
+    c : dict
+        A, B, G, a, b, g, C1...C7, e0, v0, r, p
+    """
+    params = params or {}
+
+    def get(key):
+        val = params.get(key)
+        return float(DEFAULT_PARAMS[key] if val is None else np.ravel(val)[0])
+
+    c = {key: get(key) for key in ('A', 'B', 'G', 'a', 'b', 'g', 'e0', 'v0', 'r')}
+    C = get('C')
+    for i, ratio in enumerate(C_RATIOS):
+        val = params.get(f'C{i+1}')
+        c[f'C{i+1}'] = C * ratio if val is None else float(val)
+    c['p'] = get('p_mean')
+    return c
+
+
+def _sigm(v, c):
+    return 2.0 * c['e0'] / (1.0 + np.exp(c['r'] * (c['v0'] - v)))
+
+
+def _dsigm(v, c):
+    s = _sigm(v, c)
+    return c['r'] * s * (1.0 - s / (2.0 * c['e0']))
+
+
+def equilibrium_state(y0, c):
+    """
+    由 y0 构造平衡态（y5...y9 = 0，其余状态为 y0 的显式函数）。
+
+    Returns
+    -------
+    y : ndarray, shape (10,) 或 (10, len(y0))
+    """
+    y0 = np.asarray(y0, dtype=np.float64)
+    y1 = c['A'] / c['a'] * (c['C2'] * _sigm(c['C1'] * y0, c) + c['p'])
+    y2 = c['B'] / c['b'] * c['C4'] * _sigm(c['C3'] * y0, c)
+    y4 = c['B'] / c['b'] * _sigm(c['C3'] * y0, c)
+    y3 = c['G'] / c['g'] * c['C7'] * _sigm(c['C5'] * y0 - c['C6'] * y4, c)
+    zero = np.zeros_like(y0)
+    return np.array([y0, y1, y2, y3, y4, zero, zero, zero, zero, zero])
+
+
+def _residual(y0, c):
+    y = equilibrium_state(y0, c)
+    return y[0] - c['A'] / c['a'] * _sigm(y[1] - y[2] - y[3], c)
+
+
+def node_rhs(y, c):
+    """
+    单节点确定性向量场 dy/dt（p(t) = p_mean）。
+    """
+    y0_, y1, y2, y3, y4, y5, y6, y7, y8, y9 = y
+    A, B, G, a, b, g = c['A'], c['B'], c['G'], c['a'], c['b'], c['g']
+    return np.array([
+        y5, y6, y7, y8, y9,
+        A * a * _sigm(y1 - y2 - y3, c) - 2 * a * y5 - a * a * y0_,
+        A * a * (c['C2'] * _sigm(c['C1'] * y0_, c) + c['p']) - 2 * a * y6 - a * a * y1,
+        B * b * c['C4'] * _sigm(c['C3'] * y0_, c) - 2 * b * y7 - b * b * y2,
+        G * g * c['C7'] * _sigm(c['C5'] * y0_ - c['C6'] * y4, c) - 2 * g * y8 - g * g * y3,
+        B * b * _sigm(c['C3'] * y0_, c) - 2 * b * y9 - b * b * y4,
+    ])
+
+
+def jacobian(y, c):
+    """
+    单节点解析 Jacobian（10 × 10）。
+
+    参数与状态也可以是长度 N 的向量（N 个节点一次计算）。
+
+    Parameters
+    ----------
+    y : ndarray, shape (10,) 或 (10, N)
+        状态
+    c : dict
+        node_constants 的返回值（或逐节点向量）
+
+    Returns
+    -------
+    J : ndarray, shape (10, 10) 或 (10, 10, N)
+    """
+    A, B, G, a, b, g = c['A'], c['B'], c['G'], c['a'], c['b'], c['g']
+    C1, C2, C3, C4, C5, C6, C7 = (c[f'C{i}'] for i in range(1, 8))
+    y0_, y1, y2, y3, y4 = y[:5]
+
+    ds_v = _dsigm(y1 - y2 - y3, c)
+    ds_1 = _dsigm(C1 * y0_, c)
+    ds_3 = _dsigm(C3 * y0_, c)
+    ds_u = _dsigm(C5 * y0_ - C6 * y4, c)
+
+    J = np.zeros((N_STATE_VARS, N_STATE_VARS) + np.shape(ds_v))
+    for k in range(5):
+        J[k, k + 5] = 1.0
+
+    J[5, 1] = A * a * ds_v
+    J[5, 2] = -A * a * ds_v
+    J[5, 3] = -A * a * ds_v
+    J[5, 0] = -a * a
+    J[5, 5] = -2 * a
+
+    J[6, 0] = A * a * C2 * C1 * ds_1
+    J[6, 1] = -a * a
+    J[6, 6] = -2 * a
+
+    J[7, 0] = B * b * C4 * C3 * ds_3
+    J[7, 2] = -b * b
+    J[7, 7] = -2 * b
+
+    J[8, 0] = G * g * C7 * C5 * ds_u
+    J[8, 4] = -G * g * C7 * C6 * ds_u
+    J[8, 3] = -g * g
+    J[8, 8] = -2 * g
+
+    J[9, 0] = B * b * C3 * ds_3
+    J[9, 4] = -b * b
+    J[9, 9] = -2 * b
+    return J
+
+
+def fixed_points(params=None, n_grid=400):
+    """
+    求单节点的全部不动点及其稳定性。
+
+    平衡时 y0 ∈ [0, 2 e0 A / a]，在该区间上扫描一维残差的符号变化并用 brentq 精化。
+
+    Parameters
+    ----------
+    params : dict, optional
+        参数
+    n_grid : int
+        扫描网格点数
+
+    Returns
+    -------
+    points : list of dict
+        每个不动点：'y' (10,), 'v_pyr', 'eigenvalues', 'stable', 'max_real'
+    """
+    c = params if isinstance(params, dict) and 'p' in params else node_constants(params)
+    hi = 2.0 * c['e0'] * c['A'] / c['a']
+    grid = np.linspace(0.0, hi, n_grid)
+    res = _residual(grid, c)
+
+    roots = []
+    for i in np.where(np.sign(res[:-1]) * np.sign(res[1:]) <= 0)[0]:
+        if res[i] == 0.0:
+            roots.append(grid[i])
+        elif res[i + 1] != 0.0:
+            roots.append(brentq(_residual, grid[i], grid[i + 1], args=(c,), xtol=1e-14))
+
+    points = []
+    for y0 in roots:
+        y = equilibrium_state(y0, c)
+        eig = np.linalg.eigvals(jacobian(y, c))
+        points.append({
+            'y': y,
+            'v_pyr': y[1] - y[2] - y[3],
+            'eigenvalues': eig,
+            'max_real': float(np.max(eig.real)),
+            'stable': bool(np.all(eig.real < 0)),
+        })
+    return points
+
+
+def _leading_pair(point):
+    """实部最大的复特征值（无复特征值时为 None）。"""
+    eig = point['eigenvalues']
+    cplx = eig[np.abs(eig.imag) > 1e-9]
+    return cplx[np.argmax(cplx.real)] if len(cplx) else None
+
+
+def _hopf_indicator(point):
+    """复特征值对中最大的实部（无复特征值时为 -inf）。"""
+    lam = _leading_pair(point)
+    return -np.inf if lam is None else float(lam.real)
+
+
+def trace_branch(params, name, values, n_grid=400, refine=True):
+    """
+    沿一个参数追踪平衡点分支并检测分岔。
+
+    Parameters
+    ----------
+    params : dict
+        基础参数
+    name : str
+        扫描参数名（例如 'B'、'G'、'p_mean'）
+    values : array_like
+        扫描值（递增）
+    n_grid : int
+        每个参数值的不动点扫描网格
+    refine : bool
+        是否用二分法精化分岔点位置
+
+    Returns
+    -------
+    result : dict
+        'branch': list of (value, point) 记录；
+        'bifurcations': list of dict，'type' 为 'hopf' 或 'saddle-node'，
+        'value' 为参数值，Hopf 还包含 'freq' (Hz)
+    """
+    params = dict(params or {})
+
+    def points_at(val):
+        params[name] = val
+        return fixed_points(node_constants(params), n_grid=n_grid)
+
+    def bisect(lo, hi, pred, n_iter=30):
+        # pred(lo) != pred(hi)，收敛到分界处
+        p_lo = pred(lo)
+        for _ in range(n_iter):
+            mid = 0.5 * (lo + hi)
+            if pred(mid) == p_lo:
+                lo = mid
+            else:
+                hi = mid
+        return 0.5 * (lo + hi)
+
+    values = np.asarray(values, dtype=np.float64)
+    branch = []
+    bifurcations = []
+    prev = None
+
+    for val in values:
+        pts = points_at(val)
+        branch.extend((val, pt) for pt in pts)
+
+        if prev is not None:
+            prev_val, prev_pts = prev
+
+            # 鞍结：不动点个数改变
+            if len(pts) != len(prev_pts):
+                loc = bisect(prev_val, val, lambda v: len(points_at(v))) if refine \
+                    else 0.5 * (prev_val + val)
+                bifurcations.append({'type': 'saddle-node', 'value': loc})
+
+            # Hopf：沿分支（按 y0 最近匹配）复特征值对穿过虚轴；
+            # 不动点个数改变时分支无法一一对应，只记录鞍结
+            for pt in (pts if len(pts) == len(prev_pts) else ()):
+                match = min(prev_pts, key=lambda q: abs(q['y'][0] - pt['y'][0]))
+                h_prev, h_now = _hopf_indicator(match), _hopf_indicator(pt)
+                if np.isfinite(h_prev) and np.isfinite(h_now) and h_prev * h_now < 0:
+                    y0_ref = pt['y'][0]
+
+                    def sign_at(v):
+                        cand = points_at(v)
+                        q = min(cand, key=lambda q: abs(q['y'][0] - y0_ref))
+                        return _hopf_indicator(q) > 0
+
+                    loc = bisect(prev_val, val, sign_at) if refine else 0.5 * (prev_val + val)
+                    q = min(points_at(loc), key=lambda q: abs(q['y'][0] - y0_ref))
+                    lam = _leading_pair(q)
+                    bifurcations.append({'type': 'hopf', 'value': loc,
+                                         'freq': float(abs(lam.imag) / (2 * np.pi))})
+
+        prev = (val, pts)
+
+    return {'branch': branch, 'bifurcations': bifurcations}
+
+
+def limit_cycle_branch(params, name, values, settle=1000.0, record=1000.0,
+                       amp_tol=0.5):
+    """
+    用确定性内核（p_sigma = 0）往返扫描极限环振幅，检测极限环折叠。
+
+    正向与反向扫描从上一点的最终状态出发；两者振幅不同的区间即双稳区，
+    其边界对应极限环折叠（或亚临界 Hopf）。
+
+    Parameters
+    ----------
+    params : dict
+        基础参数
+    name : str
+        扫描参数名
+    values : array_like
+        扫描值（递增）
+    settle : float
+        每点的稳定时间 (ms)
+    record : float
+        每点的记录时间 (ms)
+    amp_tol : float
+        判定振荡 / 双稳的振幅阈值 (mV)
+
+    Returns
+    -------
+    result : dict
+        'values', 'amp_up', 'amp_down', 'period_up', 'period_down',
+        'folds'（双稳区边界的参数值列表）
+    """
+    values = np.asarray(values, dtype=np.float64)
+    base = dict(params or {})
+    base['p_sigma'] = 0.0
+    base['Cmat'] = np.zeros((1, 1))
+
+    def sweep(order):
+        amps = np.zeros(len(values))
+        periods = np.full(len(values), np.nan)
+        state = None
+        for i in order:
+            base[name] = values[i]
+            sim = ChunkedSimulation(base, state=state)
+            if state is None:
+                # 从平衡点附近的小扰动出发
+                sim.y[:, 1] += 1.0
+            sim.advance(settle)
+            _, v, _ = sim.advance(record)
+            x = v[0]
+            amps[i] = np.max(x) - np.min(x)
+            if amps[i] > amp_tol:
+                crossings = np.where((x[:-1] < x.mean()) & (x[1:] >= x.mean()))[0]
+                if len(crossings) > 1:
+                    periods[i] = np.mean(np.diff(crossings)) * sim.dt
+            state = sim.state
+        return amps, periods
+
+    amp_up, period_up = sweep(range(len(values)))
+    amp_down, period_down = sweep(range(len(values) - 1, -1, -1))
+
+    bistable = np.abs(amp_up - amp_down) > amp_tol
+    edges = np.where(np.diff(bistable.astype(int)) != 0)[0]
+    folds = [0.5 * (values[i] + values[i + 1]) for i in edges]
+
+    return {'values': values, 'amp_up': amp_up, 'amp_down': amp_down,
+            'period_up': period_up, 'period_down': period_down, 'folds': folds}
+
+
+def two_parameter_map(params, name_x, values_x, name_y, values_y, n_grid=200):
+    """
+    二维参数平面的平衡点分岔图（例如 B–G 平面）。
+
+    Parameters
+    ----------
+    params : dict
+        基础参数
+    name_x, name_y : str
+        横轴、纵轴参数名
+    values_x, values_y : array_like
+        取值
+    n_grid : int
+        不动点扫描网格
+
+    Returns
+    -------
+    result : dict
+        'n_fixed', 'n_stable': 不动点个数与稳定不动点个数 (len(y), len(x))；
+        'hopf': 复特征值对的最大实部（其 0 等值线即 Hopf 曲线）；
+        'freq': 主导复特征值对应的频率 (Hz)；
+        'regime': 0 = 单一稳定平衡，1 = 无稳定平衡（振荡），2 = 多稳定/共存
+    """
+    base = dict(params or {})
+    values_x = np.asarray(values_x, dtype=np.float64)
+    values_y = np.asarray(values_y, dtype=np.float64)
+    shape = (len(values_y), len(values_x))
+
+    n_fixed = np.zeros(shape, dtype=int)
+    n_stable = np.zeros(shape, dtype=int)
+    hopf = np.full(shape, -np.inf)
+    freq = np.full(shape, np.nan)
+
+    for iy, vy in enumerate(values_y):
+        for ix, vx in enumerate(values_x):
+            base[name_x] = vx
+            base[name_y] = vy
+            pts = fixed_points(node_constants(base), n_grid=n_grid)
+            n_fixed[iy, ix] = len(pts)
+            n_stable[iy, ix] = sum(pt['stable'] for pt in pts)
+
+            best = max(pts, key=_hopf_indicator)
+            hopf[iy, ix] = _hopf_indicator(best)
+            lam = _leading_pair(best)
+            if lam is not None:
+                freq[iy, ix] = abs(lam.imag) / (2 * np.pi)
+
+    regime = np.where(n_stable == 0, 1, np.where((n_fixed > 1) & (n_stable >= 1), 2, 0))
+
+    return {'x': values_x, 'y': values_y, 'name_x': name_x, 'name_y': name_y,
+            'n_fixed': n_fixed, 'n_stable': n_stable, 'hopf': hopf,
+            'freq': freq, 'regime': regime}
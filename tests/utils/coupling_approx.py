@@ -0,0 +1,253 @@
+"""
+近似耦合的精度评估
+
+延迟分箱（wendling_kernel.bin_coupling_delays）用少量代表延迟代替每条连接的精确延迟，
+以一定的 FC 误差换取更快的耦合计算。这里用相同的噪声种子分别运行精确与近似耦合，
+比较模拟 FC 的差异与运行时间，帮助选择满足误差要求的最小箱数。
+
+低秩耦合（wendling_kernel.low_rank_coupling）在分箱的基础上再把每个箱的连接矩阵截断为
+秩 r，用 low_rank_report 以同样的方式选择秩。
+"""
+
+import time
+
+import numpy as np
+
+from .wendling_kernel import (LOW_RANK_DELAY_BINS, ChunkedSimulation, _bin_matrices,
+                              bin_coupling_delays, initial_state_from_params,
+                              low_rank_coupling, prepare_kernel_params)
+
+
+def _bin_of_edge(kp):
+    """每条连接（按 kp 中的顺序）所属的箱号。"""
+    K = len(kp['bin_delay'])
+    return np.repeat(np.tile(np.arange(K), kp['N']), np.diff(kp['bin_ptr']))
+
+
+def delay_error(kp):
+    """
+    延迟分箱引入的延迟误差（按 |权重| 加权）。
+
+    Returns
+    -------
+    error : dict
+        'n_delays'（不同延迟值个数）、'rmse_ms'、'max_ms'
+    """
+    dt = kp['dt'] * 1000.0
+    exact = kp['csr_delay']
+    if len(exact) == 0:
+        return {'n_delays': 0, 'rmse_ms': 0.0, 'max_ms': 0.0}
+    if len(kp.get('bin_delay', ())) == 0:
+        return {'n_delays': len(np.unique(exact)), 'rmse_ms': 0.0, 'max_ms': 0.0}
+    err = (exact - kp['bin_delay'][_bin_of_edge(kp)]) * dt
+    w = np.abs(kp['csr_w'])
+    return {
+        'n_delays': len(kp['bin_delay']),
+        'rmse_ms': float(np.sqrt(np.sum(w * err ** 2) / np.sum(w))),
+        'max_ms': float(np.abs(err).max()),
+    }
+
+
+def _simulate_fc(params, kp, seed, duration, discard, decimate):
+    """用内核参数 kp 运行并返回 (FC, 记录阶段的墙钟时间)。"""
+    sim = ChunkedSimulation.from_kernel_params(
+        kp, seed=seed, state=initial_state_from_params(params, kp['N']))
+    sim.advance(discard)
+    t0 = time.perf_counter()
+    _, v, _ = sim.advance(duration, decimate=decimate)
+    return np.corrcoef(v), time.perf_counter() - t0
+
+
+def _fc_error(fc, fc_exact):
+    iu = np.triu_indices_from(fc, k=1)
+    diff = fc[iu] - fc_exact[iu]
+    return {
+        'fc_corr': float(np.corrcoef(fc[iu], fc_exact[iu])[0, 1]),
+        'fc_max_abs_err': float(np.abs(diff).max()),
+        'fc_rmse': float(np.sqrt(np.mean(diff ** 2))),
+    }
+
+
+def delay_binning_report(params, bins=(1, 2, 4, 8, 16), duration=10000.0, discard=2000.0,
+                         Cmat=None, Dmat=None, seed=0, decimate=10, method='kmeans',
+                         verbose=True):
+    """
+    比较不同箱数的延迟分箱与精确延迟：延迟误差、模拟 FC 误差与加速比。
+
+    所有运行使用相同的噪声种子与初始状态，FC 的差异只来自延迟的量化。作为参照，
+    另用 seed + 1 运行一次精确延迟，给出噪声实现之间的 FC 差异（'fc_seed_max_abs_err'）。
+
+    Parameters
+    ----------
+    params : dict
+        模型参数（例如 model.params）
+    bins : sequence of int
+        要比较的箱数
+    duration : float
+        记录时长 (ms)
+    discard : float
+        丢弃的暂态 (ms)
+    Cmat, Dmat : ndarray, optional
+        连接矩阵与距离矩阵（默认从 params 读取）
+    seed : int
+        噪声随机种子
+    decimate : int
+        计算 FC 前的降采样倍数
+    method : str
+        分箱方法（见 bin_coupling_delays）
+    verbose : bool
+        是否打印结果表
+
+    Returns
+    -------
+    report : list of dict
+        每个箱数一条：'bins'、'n_delays'、'delay_rmse_ms'、'delay_max_ms'、'fc_corr'、
+        'fc_max_abs_err'、'fc_rmse'、'wall_s'、'speedup'（相对精确延迟）；
+        第一条为精确延迟（'bins' 为 None，另含 'fc_seed_max_abs_err'）
+    """
+    exact_kp = prepare_kernel_params(params, Cmat, Dmat)
+    # 预热：编译或读取内核缓存，不计入计时
+    ChunkedSimulation.from_kernel_params(bin_coupling_delays(dict(exact_kp), 1)).advance(1.0)
+
+    fc_exact, wall_exact = _simulate_fc(params, exact_kp, seed, duration, discard, decimate)
+    fc_seed, _ = _simulate_fc(params, exact_kp, seed + 1, duration, discard, decimate)
+    report = [{'bins': None, 'n_delays': delay_error(exact_kp)['n_delays'],
+               'delay_rmse_ms': 0.0, 'delay_max_ms': 0.0, 'fc_corr': 1.0,
+               'fc_max_abs_err': 0.0, 'fc_rmse': 0.0, 'wall_s': wall_exact, 'speedup': 1.0,
+               'fc_seed_max_abs_err': _fc_error(fc_seed, fc_exact)['fc_max_abs_err']}]
+
+    for K in bins:
+        kp = bin_coupling_delays(prepare_kernel_params(params, Cmat, Dmat), K, method)
+        fc, wall = _simulate_fc(params, kp, seed, duration, discard, decimate)
+        err = delay_error(kp)
+        row = {'bins': K, 'n_delays': err['n_delays'], 'delay_rmse_ms': err['rmse_ms'],
+               'delay_max_ms': err['max_ms'], 'wall_s': wall, 'speedup': wall_exact / wall}
+        row.update(_fc_error(fc, fc_exact))
+        report.append(row)
+
+    if verbose:
+        print(format_report(report))
+    return report
+
+
+def format_report(report):
+    """把 delay_binning_report 的结果整理为文本表。"""
+    lines = [f"{'bins':>6s} {'delays':>7s} {'rmse ms':>8s} {'max ms':>7s} "
+             f"{'FC r':>7s} {'max|dFC|':>9s} {'speedup':>8s}"]
+    for row in report:
+        bins = 'exact' if row['bins'] is None else str(row['bins'])
+        lines.append(f"{bins:>6s} {row['n_delays']:7d} {row['delay_rmse_ms']:8.3f} "
+                     f"{row['delay_max_ms']:7.3f} {row['fc_corr']:7.4f} "
+                     f"{row['fc_max_abs_err']:9.4f} {row['speedup']:7.2f}x")
+    if 'fc_seed_max_abs_err' in report[0]:
+        lines.append(f"(another noise seed, exact delays: max|dFC| = "
+                     f"{report[0]['fc_seed_max_abs_err']:.4f})")
+    return '\n'.join(lines)
+
+
+def select_delay_bins(report, max_fc_error=0.05):
+    """
+    满足 FC 误差要求（max|dFC| <= max_fc_error）的最小箱数；都不满足时为 None。
+    """
+    ok = [row['bins'] for row in report
+          if row['bins'] is not None and row['fc_max_abs_err'] <= max_fc_error]
+    return min(ok) if ok else None
+
+
+def low_rank_error(kp):
+    """
+    低秩耦合的矩阵近似误差 ||W - W_r||_F / ||W||_F（W 为全部延迟箱的连接）。
+    """
+    W = _bin_matrices(kp)
+    approx = np.einsum('knr,krm->knm', kp['lr_U'], kp['lr_Vt'])
+    norm = np.linalg.norm(W)
+    return float(np.linalg.norm(W - approx) / norm) if norm > 0 else 0.0
+
+
+def low_rank_report(params, ranks=(4, 8, 16, 32, 64), delay_bins=LOW_RANK_DELAY_BINS,
+                    duration=10000.0, discard=2000.0, Cmat=None, Dmat=None, seed=0,
+                    decimate=10, verbose=True):
+    """
+    比较不同秩的低秩耦合与精确耦合：矩阵近似误差、模拟 FC 误差与加速比。
+
+    第一条为精确延迟与精确连接，第二条为只做延迟分箱（'rank' 为 None），分开给出
+    分箱与截断各自引入的误差；之后每个秩一条。所有运行使用相同的噪声种子与初始状态。
+
+    Parameters
+    ----------
+    params : dict
+        模型参数（例如 model.params）
+    ranks : sequence of int
+        要比较的秩
+    delay_bins : int
+        延迟箱数（见 bin_coupling_delays）
+    duration : float
+        记录时长 (ms)
+    discard : float
+        丢弃的暂态 (ms)
+    Cmat, Dmat : ndarray, optional
+        连接矩阵与距离矩阵（默认从 params 读取）
+    seed : int
+        噪声随机种子
+    decimate : int
+        计算 FC 前的降采样倍数
+    verbose : bool
+        是否打印结果表
+
+    Returns
+    -------
+    report : list of dict
+        每条：'rank'、'bins'、'svd_rel_error'、'fc_corr'、'fc_max_abs_err'、'fc_rmse'、
+        'wall_s'、'speedup'（相对精确耦合）；第一条的 'bins' 与 'rank' 均为 None，
+        另含 'fc_seed_max_abs_err'（另一噪声种子的 FC 差异）
+    """
+    exact_kp = prepare_kernel_params(params, Cmat, Dmat)
+    # 预热：编译或读取内核缓存，不计入计时
+    ChunkedSimulation.from_kernel_params(low_rank_coupling(dict(exact_kp), 1, 1)).advance(1.0)
+
+    fc_exact, wall_exact = _simulate_fc(params, exact_kp, seed, duration, discard, decimate)
+    fc_seed, _ = _simulate_fc(params, exact_kp, seed + 1, duration, discard, decimate)
+    report = [{'rank': None, 'bins': None, 'svd_rel_error': 0.0, 'fc_corr': 1.0,
+               'fc_max_abs_err': 0.0, 'fc_rmse': 0.0, 'wall_s': wall_exact, 'speedup': 1.0,
+               'fc_seed_max_abs_err': _fc_error(fc_seed, fc_exact)['fc_max_abs_err']}]
+
+    binned = bin_coupling_delays(prepare_kernel_params(params, Cmat, Dmat), delay_bins)
+    variants = [(None, binned)]
+    variants += [(r, low_rank_coupling(dict(binned), r)) for r in ranks]
+    for r, kp in variants:
+        fc, wall = _simulate_fc(params, kp, seed, duration, discard, decimate)
+        row = {'rank': r, 'bins': len(kp['bin_delay']),
+               'svd_rel_error': 0.0 if r is None else low_rank_error(kp),
+               'wall_s': wall, 'speedup': wall_exact / wall}
+        row.update(_fc_error(fc, fc_exact))
+        report.append(row)
+
+    if verbose:
+        print(format_low_rank_report(report))
+    return report
+
+
+def format_low_rank_report(report):
+    """把 low_rank_report 的结果整理为文本表。"""
+    lines = [f"{'rank':>6s} {'bins':>5s} {'|dW|/|W|':>9s} {'FC r':>7s} "
+             f"{'max|dFC|':>9s} {'speedup':>8s}"]
+    for row in report:
+        rank = 'exact' if row['bins'] is None else 'full' if row['rank'] is None \
+            else str(row['rank'])
+        bins = '-' if row['bins'] is None else str(row['bins'])
+        lines.append(f"{rank:>6s} {bins:>5s} {row['svd_rel_error']:9.4f} "
+                     f"{row['fc_corr']:7.4f} {row['fc_max_abs_err']:9.4f} "
+                     f"{row['speedup']:7.2f}x")
+    if 'fc_seed_max_abs_err' in report[0]:
+        lines.append(f"(another noise seed, exact coupling: max|dFC| = "
+                     f"{report[0]['fc_seed_max_abs_err']:.4f})")
+    return '\n'.join(lines)
+
+
+def select_coupling_rank(report, max_fc_error=0.05):
+    """
+    满足 FC 误差要求（max|dFC| <= max_fc_error）的最小秩；都不满足时为 None。
+    """
+    ok = [row['rank'] for row in report
+          if row['rank'] is not None and row['fc_max_abs_err'] <= max_fc_error]
+    return min(ok) if ok else None
@@ -0,0 +1,334 @@
+"""
+单节点特征图谱
+
+在 (A, B, G, p_mean, p_sigma) 的规则网格上预先模拟孤立节点并保存特征
+（峰值频率、频带比例、尖波率、RMS 等）与六类标签。之后任意参数组合的特征
+用多线性插值查询，标签取最近网格点，标注整个异质网络不需要额外模拟。
+
+构建（默认网格约 4680 个点，需要数分钟到数十分钟）：
+    python -m utils.feature_atlas 4_hcp_data/feature_atlas.npz --n-seeds 3
+"""
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import numpy as np
+from scipy.interpolate import RegularGridInterpolator
+
+from .features import label_node, type_centroids
+from .wendling_kernel import DEFAULT_PARAMS
+
+
+# 保存并插值的特征
+ATLAS_FEATURES = ('f_star', 'P_star', 'RMS', 'std', 'max_amplitude',
+                  'delta_ratio', 'theta_ratio', 'alpha_ratio', 'beta_ratio',
+                  'gamma_ratio', 'spike_rate', 'cv_isi', 'N_peaks')
+
+# 默认网格（覆盖 ACTIVITY_TYPES 与 loadDefaultParams 异质性的常用范围）
+DEFAULT_GRID = {
+    'A': np.array([3.0, 4.0, 5.0, 6.0, 7.0]),
+    'B': np.arange(0.0, 60.0 + 1e-9, 5.0),
+    'G': np.arange(0.0, 40.0 + 1e-9, 5.0),
+    'p_mean': np.array([60.0, 90.0, 120.0, 150.0]),
+    'p_sigma': np.array([2.0, 30.0]),
+}
+
+
+class FeatureAtlas:
+    """
+    规则网格上的单节点特征表。
+
+    Parameters
+    ----------
+    grid : dict
+        参数名 -> 递增的网格值（只有一个值的坐标轴视为固定参数）
+    values : ndarray, shape grid_shape + (len(features),)
+        特征值
+    labels : ndarray of int, shape grid_shape
+        类型索引（对应 type_names）
+    type_names : sequence of str
+        类型名
+    features : sequence of str
+        特征名（默认 ATLAS_FEATURES）
+    """
+
+    def __init__(self, grid, values, labels, type_names, features=ATLAS_FEATURES):
+        self.grid = {name: np.asarray(axis, dtype=np.float64) for name, axis in grid.items()}
+        self.values = np.asarray(values, dtype=np.float64)
+        self.labels = np.asarray(labels, dtype=np.int64)
+        self.type_names = list(type_names)
+        self.features = tuple(features)
+
+        # 插值只在长度 > 1 的坐标轴上进行
+        self._axes = [name for name, axis in self.grid.items() if len(axis) > 1]
+        squeeze = tuple(i for i, axis in enumerate(self.grid.values()) if len(axis) == 1)
+        self._values = self.values.squeeze(axis=squeeze) if squeeze else self.values
+        self._labels = self.labels.squeeze(axis=squeeze) if squeeze else self.labels
+        self._interp = RegularGridInterpolator(
+            [self.grid[name] for name in self._axes], self._values,
+            method='linear', bounds_error=False, fill_value=None)
+
+    @classmethod
+    def build(cls, grid=None, duration=10000.0, discard=2000.0, seed=0, n_seeds=1,
+              n_jobs=None, verbose=True):
+        """
+        模拟网格上的全部节点并构建图谱。
+
+        Parameters
+        ----------
+        grid : dict, optional
+            网格（默认 DEFAULT_GRID）
+        duration, discard : float
+            每个样本的记录时长与丢弃暂态 (ms)
+        seed : int
+            噪声随机种子
+        n_seeds : int
+            每个网格点的噪声实现数（seed, seed+1, ...）；特征取平均，标签取众数，
+            可减小噪声驱动区域（背景活动）中峰值频率的随机性
+        n_jobs : int, optional
+            并行进程数（默认 os.cpu_count()）
+
+        Returns
+        -------
+        atlas : FeatureAtlas
+        """
+        grid = {name: np.asarray(axis, dtype=np.float64)
+                for name, axis in (grid or DEFAULT_GRID).items()}
+        names = list(grid.keys())
+        shape = tuple(len(axis) for axis in grid.values())
+        mesh = np.stack(np.meshgrid(*grid.values(), indexing='ij'), axis=-1).reshape(-1, len(names))
+        params_list = [dict(zip(names, map(float, row))) for row in mesh]
+        seeds = [seed + k for k in range(n_seeds)]
+
+        centroids = type_centroids()
+        type_names = list(centroids.keys())
+        n_jobs = n_jobs or os.cpu_count() or 1
+        if verbose:
+            print(f"  building feature atlas: {len(params_list)} nodes x {n_seeds} seeds, "
+                  f"{n_jobs} workers")
+
+        jobs = [(p, s) for p in params_list for s in seeds]
+        args = ([p for p, _ in jobs], repeat(duration), repeat(discard),
+                [s for _, s in jobs], repeat(centroids))
+        if n_jobs == 1:
+            results = list(map(label_node, *args))
+        else:
+            with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+                results = list(pool.map(label_node, *args, chunksize=16))
+
+        values = np.array([[feat[key] for key in ATLAS_FEATURES] for _, feat in results])
+        values = values.reshape(len(params_list), n_seeds, -1).mean(axis=1)
+        votes = np.array([type_names.index(label) for label, _ in results])
+        votes = votes.reshape(len(params_list), n_seeds)
+        labels = np.array([np.bincount(v, minlength=len(type_names)).argmax() for v in votes])
+        return cls(grid, values.reshape(shape + (len(ATLAS_FEATURES),)),
+                   labels.reshape(shape), type_names)
+
+    def save(self, path):
+        """保存为 npz。"""
+        np.savez_compressed(
+            path, values=self.values, labels=self.labels,
+            grid_names=np.array(list(self.grid.keys())),
+            type_names=np.array(self.type_names), features=np.array(self.features),
+            **{f'grid_{name}': axis for name, axis in self.grid.items()})
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        grid = {str(name): data[f'grid_{name}'] for name in data['grid_names']}
+        return cls(grid, data['values'], data['labels'],
+                   [str(s) for s in data['type_names']],
+                   [str(s) for s in data['features']])
+
+    @classmethod
+    def load_or_build(cls, path, **build_kwargs):
+        """存在则读取，否则构建并保存。"""
+        if os.path.exists(path):
+            return cls.load(path)
+        atlas = cls.build(**build_kwargs)
+        atlas.save(path)
+        return atlas
+
+    def _points(self, params, N=None):
+        """从参数字典取出插值坐标 (N, n_axes)，超出网格的值截断到边界。"""
+        cols = []
+        for name in self._axes:
+            val = params.get(name) if hasattr(params, 'get') else None
+            cols.append(np.atleast_1d(np.asarray(DEFAULT_PARAMS[name] if val is None else val,
+                                                 dtype=np.float64)))
+        N = N or max(len(c) for c in cols)
+        pts = np.stack([np.broadcast_to(c, (N,)) for c in cols], axis=1)
+        lo = np.array([self.grid[name][0] for name in self._axes])
+        hi = np.array([self.grid[name][-1] for name in self._axes])
+        return np.clip(pts, lo, hi)
+
+    def lookup(self, params, features=None):
+        """
+        插值查询特征。
+
+        Parameters
+        ----------
+        params : dict
+            参数（标量或长度 N 的向量，例如 model.params）；缺失的参数取默认值
+        features : sequence of str, optional
+            需要的特征（默认全部）
+
+        Returns
+        -------
+        result : dict
+            特征名 -> ndarray, shape (N,)
+        """
+        vals = self._interp(self._points(params))
+        keys = features or self.features
+        return {key: vals[:, self.features.index(key)] for key in keys}
+
+    def spread(self, params, key='f_star'):
+        """
+        特征在所在网格单元各角点上的极差（max - min）。
+
+        极差大说明单元跨越了类型边界，插值结果不可靠。
+
+        Returns
+        -------
+        spread : ndarray, shape (N,)
+        """
+        pts = self._points(params)
+        lower = []
+        for k, name in enumerate(self._axes):
+            axis = self.grid[name]
+            lower.append(np.clip(np.searchsorted(axis, pts[:, k], side='right') - 1,
+                                 0, len(axis) - 2))
+        vals = self._values[..., self.features.index(key)]
+        corners = np.stack([vals[tuple(lo + off for lo, off in zip(lower, offsets))]
+                            for offsets in np.ndindex(*(2,) * len(lower))])
+        return corners.max(axis=0) - corners.min(axis=0)
+
+    def label(self, params):
+        """
+        每个节点的类型（最近网格点的标签）。
+
+        Returns
+        -------
+        labels : ndarray of str, shape (N,)
+        """
+        pts = self._points(params)
+        idx = []
+        for k, name in enumerate(self._axes):
+            axis = self.grid[name]
+            pos = np.interp(pts[:, k], axis, np.arange(len(axis)))
+            idx.append(np.rint(pos).astype(np.int64))
+        return np.array(self.type_names)[self._labels[tuple(idx)]]
+
+
+def params_for_targets(atlas, target_freq, target_ratios=None, base_params=None,
+                       free=('B', 'G'), resolution=101, freq_scale=1.0, ratio_scale=0.1,
+                       allowed_types=None, max_spread=3.0, tolerance=0.0, seed=None):
+    """
+    反查特征图谱：为每个节点选择使峰值频率（和频带比例）接近目标的参数。
+
+    在 free 参数的密集候选网格上插值图谱特征，计算每个节点与每个候选的距离，
+    一次向量化取最小值；不需要“模拟 - 调整”的迭代。
+
+    Parameters
+    ----------
+    atlas : FeatureAtlas
+        特征图谱
+    target_freq : array_like, shape (N,)
+        目标峰值频率 (Hz)，例如经验 MEG/EEG 的脑区峰值频率图
+    target_ratios : dict, optional
+        频带比例目标，例如 {'alpha_ratio': (N,) 数组}
+    base_params : dict, optional
+        其余参数（标量），默认取图谱/模型默认值
+    free : sequence of str
+        需要确定的参数
+    resolution : int
+        每个 free 参数的候选点数
+    freq_scale : float
+        频率误差的尺度 (Hz)
+    ratio_scale : float
+        频带比例误差的尺度
+    allowed_types : sequence of str, optional
+        只在这些类型中选择（例如排除 'Type3' 以避免癫痫样节点）
+    max_spread : float
+        排除所在单元角点峰值频率极差超过该值 (Hz) 的候选
+    tolerance : float
+        距离在最优值 + tolerance 以内的候选中随机选择（增加参数多样性）
+    seed : int, optional
+        随机种子
+
+    Returns
+    -------
+    params : dict
+        free 参数名 -> ndarray, shape (N,)，可直接写入 model.params
+    achieved : dict
+        所选参数处的图谱特征（含 'label'）
+
+    Raises
+    ------
+    ValueError
+        某些节点的全部候选都被 allowed_types / max_spread 排除
+    """
+    target_freq = np.asarray(target_freq, dtype=np.float64)
+    N = len(target_freq)
+    base_params = dict(base_params or {})
+
+    axes = [np.linspace(atlas.grid[name][0], atlas.grid[name][-1], resolution) for name in free]
+    mesh = np.stack(np.meshgrid(*axes, indexing='ij'), axis=-1).reshape(-1, len(free))
+    cand = dict(base_params)
+    cand.update({name: mesh[:, k] for k, name in enumerate(free)})
+    M = len(mesh)
+
+    feats = atlas.lookup(cand)
+    labels = atlas.label(cand)
+    # 跨越类型边界的单元插值不可靠
+    unreliable = atlas.spread(cand, 'f_star') > max_spread
+
+    cost = ((feats['f_star'][None, :] - target_freq[:, None]) / freq_scale) ** 2
+    for key, target in (target_ratios or {}).items():
+        target = np.asarray(target, dtype=np.float64)
+        cost += ((feats[key][None, :] - target[:, None]) / ratio_scale) ** 2
+    cost[:, unreliable] = np.inf
+    if allowed_types is not None:
+        cost[:, ~np.isin(labels, list(allowed_types))] = np.inf
+
+    infeasible = np.flatnonzero(~np.isfinite(cost).any(axis=1))
+    if len(infeasible):
+        raise ValueError(f"{len(infeasible)} 个节点（例如 {infeasible[:10].tolist()}）没有满足 "
+                         "allowed_types / max_spread 的候选；放宽约束或扩大图谱范围")
+
+    best = np.argmin(cost, axis=1)
+    if tolerance > 0:
+        rng = np.random.default_rng(seed)
+        ok = np.isfinite(cost) & (cost <= cost[np.arange(N), best][:, None] + tolerance)
+        # 每行在可接受候选中均匀随机选择
+        r = rng.random((N, M)) * ok
+        best = np.argmax(r, axis=1)
+
+    params = {name: mesh[best, k] for k, name in enumerate(free)}
+    achieved = {key: val[best] for key, val in feats.items()}
+    achieved['label'] = labels[best]
+    return params, achieved
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the single-node feature atlas")
+    parser.add_argument('path', help="output .npz path")
+    parser.add_argument('--n-seeds', type=int, default=1,
+                        help="noise realizations per grid point")
+    parser.add_argument('--duration', type=float, default=10000.0, help="recording length (ms)")
+    parser.add_argument('--jobs', type=int, default=None, help="worker processes")
+    parser.add_argument('--force', action='store_true', help="rebuild if the file exists")
+    args = parser.parse_args(argv)
+
+    if os.path.exists(args.path) and not args.force:
+        print(f"  {args.path} exists (use --force to rebuild)")
+        return
+    atlas = FeatureAtlas.build(duration=args.duration, n_seeds=args.n_seeds, n_jobs=args.jobs)
+    atlas.save(args.path)
+    print(f"  saved {args.path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,387 @@
+"""
+单节点波形特征与六类活动分类
+
+特征定义与 Validation_for_single_node/test_six_types_strict.py 中的 extract_features
+相同（spike_rate 以 1/s 计）。所有特征按批计算：输入 (batch, T) 数组，Welch 在整批上
+一次完成，频带比例是一次矩阵乘法，峰检测与尖波 / ISI 统计在 numba 中逐行完成。
+分类采用最近质心：六种类型的参考特征由 ACTIVITY_TYPES 的参数模拟得到（每个进程只计算一次）。
+"""
+
+import numpy as np
+from numba import njit
+from scipy.signal import welch
+
+from .activity_types import ACTIVITY_TYPES
+from .wendling_kernel import ChunkedSimulation
+
+
+# 频带 (Hz)
+BANDS = {
+    'delta': (1, 4),
+    'theta': (4, 8),
+    'alpha': (8, 13),
+    'beta': (13, 30),
+    'gamma': (30, 50),
+}
+
+# 参与分类的特征（'std' 取对数）
+CLASSIFY_KEYS = ('std', 'f_star', 'delta_ratio', 'theta_ratio', 'alpha_ratio',
+                 'beta_ratio', 'gamma_ratio', 'spike_rate', 'cv_isi')
+
+_CENTROID_CACHE = {}
+
+
+@njit(cache=True)
+def _local_maxima(x):
+    """局部极大值（平台取中点，与 find_peaks 相同）。"""
+    n = len(x)
+    peaks = np.empty(n, dtype=np.int64)
+    n_peaks = 0
+    i = 1
+    while i < n - 1:
+        if x[i - 1] < x[i]:
+            # 平台取中点
+            j = i + 1
+            while j < n - 1 and x[j] == x[i]:
+                j += 1
+            if x[j] < x[i]:
+                peaks[n_peaks] = (i + j - 1) // 2
+                n_peaks += 1
+            i = j
+        else:
+            i += 1
+    return peaks[:n_peaks]
+
+
+@njit(cache=True)
+def _count_selected_peaks(x, peaks, order, distance, prominence):
+    """按 order（高度升序）从高到低做距离筛选，再按突出度计数。"""
+    n = len(x)
+    n_peaks = len(peaks)
+    keep = np.ones(n_peaks, dtype=np.bool_)
+    if distance > 1:
+        for i in range(n_peaks - 1, -1, -1):
+            k = order[i]
+            if not keep[k]:
+                continue
+            j = k - 1
+            while j >= 0 and peaks[k] - peaks[j] < distance:
+                keep[j] = False
+                j -= 1
+            j = k + 1
+            while j < n_peaks and peaks[j] - peaks[k] < distance:
+                keep[j] = False
+                j += 1
+
+    count = 0
+    for k in range(n_peaks):
+        if not keep[k]:
+            continue
+        p = peaks[k]
+        left_min = x[p]
+        j = p - 1
+        while j >= 0 and x[j] <= x[p]:
+            if x[j] < left_min:
+                left_min = x[j]
+            j -= 1
+        right_min = x[p]
+        j = p + 1
+        while j < n and x[j] <= x[p]:
+            if x[j] < right_min:
+                right_min = x[j]
+            j += 1
+        if x[p] - max(left_min, right_min) >= prominence:
+            count += 1
+    return count
+
+
+def _count_peaks(x, distance, prominence):
+    """
+    与 len(scipy.signal.find_peaks(x, prominence=..., distance=...)[0]) 相同的峰计数
+    （局部极大值 → 按高度优先的距离筛选 → 突出度筛选）。
+
+    等高峰的处理顺序由排序决定：find_peaks 用 numpy 默认（不稳定）的 np.argsort，
+    numba 的排序对等高元素给出不同的顺序，因此排序在 numpy 中完成，两端的循环在 numba 中。
+    """
+    peaks = _local_maxima(x)
+    order = np.argsort(x[peaks])
+    return _count_selected_peaks(x, peaks, order, distance, prominence)
+
+
+@njit(cache=True)
+def _moments(v):
+    """逐行一次遍历计算 mean, std, RMS 与最大绝对值。"""
+    batch, T = v.shape
+    out = np.empty((4, batch))
+    for b in range(batch):
+        s1 = 0.0
+        s2 = 0.0
+        m = 0.0
+        for k in range(T):
+            x = v[b, k]
+            s1 += x
+            s2 += x * x
+            if abs(x) > m:
+                m = abs(x)
+        mean = s1 / T
+        # 两遍法计算方差（与 np.std 的数值一致）
+        var = 0.0
+        for k in range(T):
+            d = v[b, k] - mean
+            var += d * d
+        out[0, b] = mean
+        out[1, b] = np.sqrt(var / T)
+        out[2, b] = np.sqrt(s2 / T)
+        out[3, b] = m
+    return out
+
+
+@njit(cache=True)
+def _spike_stats(v, threshold):
+    """
+    逐行统计超过阈值的采样点数与相邻超阈值采样点间隔的 CV。
+    """
+    batch, T = v.shape
+    counts = np.zeros(batch, dtype=np.int64)
+    cv = np.zeros(batch)
+    for b in range(batch):
+        last = -1
+        s1 = 0.0
+        s2 = 0.0
+        n = 0
+        for k in range(T):
+            if v[b, k] > threshold[b]:
+                counts[b] += 1
+                if last >= 0:
+                    d = float(k - last)
+                    s1 += d
+                    s2 += d * d
+                    n += 1
+                last = k
+        if counts[b] > 2:
+            mean = s1 / n
+            var = max(s2 / n - mean * mean, 0.0)
+            cv[b] = np.sqrt(var) / (mean + 1e-12)
+    return counts, cv
+
+
+def _spectral_features(freqs, psd):
+    """批量频域特征，psd 形状 (batch, F)。"""
+    freq_mask = (freqs >= 1) & (freqs <= 50)
+    freqs_band = freqs[freq_mask]
+    psd_band = psd[:, freq_mask]
+    psd_db = 10 * np.log10(psd_band + 1e-12)
+
+    peak_idx = np.argmax(psd_band, axis=1)
+    rows = np.arange(psd.shape[0])
+    features = {
+        'f_star': freqs_band[peak_idx],
+        'P_star': psd_db[rows, peak_idx],
+    }
+
+    distance_val = max(1, int(0.5 * psd_db.shape[1] / 50))
+    features['N_peaks'] = np.array([_count_peaks(np.ascontiguousarray(row), distance_val, 3.0)
+                                    for row in psd_db])
+
+    total_power = psd_band.sum(axis=1) + 1e-12
+    masks = np.stack([(freqs >= lo) & (freqs <= hi) for lo, hi in BANDS.values()], axis=1)
+    band_power = psd @ masks.astype(np.float64)
+    for k, band in enumerate(BANDS):
+        features[f'{band}_ratio'] = band_power[:, k] / total_power
+    return features
+
+
+def extract_features_batch(v, fs=10000.0, nperseg=8192, freqs=None, psd=None):
+    """
+    批量提取 v_pyr 的定量特征。
+
+    Parameters
+    ----------
+    v : ndarray, shape (batch, T)
+        信号（例如网络的全部节点，或多个单节点模拟）
+    fs : float
+        采样频率 (Hz)
+    nperseg : int
+        Welch 窗口长度上限
+    freqs, psd : ndarray, optional
+        已计算的功率谱，psd 形状 (batch, F)
+
+    Returns
+    -------
+    features : dict
+        特征名 -> ndarray, shape (batch,)；特征与 extract_features 相同
+    """
+    v = np.atleast_2d(np.asarray(v, dtype=np.float64))
+    T = v.shape[1]
+    if psd is None:
+        freqs, psd = welch(v, fs=fs, nperseg=min(nperseg, T // 4), axis=-1)
+    psd = np.atleast_2d(psd)
+
+    v = np.ascontiguousarray(v)
+    mean, std, rms, max_abs = _moments(v)
+    features = {'RMS': rms, 'max_amplitude': max_abs, 'mean': mean, 'std': std}
+    features.update(_spectral_features(freqs, psd))
+
+    # 尖波检测（超过 mean + 3 std 的采样点）
+    threshold = features['mean'] + 3 * features['std']
+    counts, cv = _spike_stats(v, threshold)
+    features['spike_count'] = counts
+    features['spike_rate'] = counts / ((T - 1) / fs)
+    features['cv_isi'] = cv
+    return features
+
+
+def extract_features(t, v_pyr, freqs=None, psd=None, fs=10000.0):
+    """
+    提取单条 v_pyr 的定量特征（extract_features_batch 的单条版本）。
+
+    Parameters
+    ----------
+    t : ndarray, shape (T,)
+        时间 (ms)，用于确定采样频率
+    v_pyr : ndarray, shape (T,)
+        信号
+    freqs, psd : ndarray, optional
+        功率谱（默认用 Welch 计算）
+    fs : float
+        采样频率 (Hz)（t 给出时以 t 为准）
+
+    Returns
+    -------
+    features : dict
+        RMS, max_amplitude, mean, std, f_star, P_star, N_peaks,
+        {band}_ratio, spike_count, spike_rate, cv_isi
+    """
+    if t is not None and len(t) > 1:
+        fs = 1000.0 / (t[1] - t[0])
+    batch = extract_features_batch(v_pyr[None, :], fs=fs, freqs=freqs,
+                                   psd=None if psd is None else psd[None, :])
+    return {key: val[0].item() for key, val in batch.items()}
+
+
+def simulate_node(params, duration=10000.0, discard=2000.0, seed=None):
+    """
+    用分块内核模拟单个孤立节点。
+
+    Parameters
+    ----------
+    params : dict
+        节点参数（缺失项用默认值）
+    duration : float
+        记录时长 (ms)
+    discard : float
+        丢弃的暂态 (ms)
+    seed : int, optional
+        噪声随机种子
+
+    Returns
+    -------
+    t : ndarray, shape (T,)
+        时间 (ms)，从 0 开始
+    v : ndarray, shape (T,)
+        v_pyr
+    """
+    p = dict(params)
+    p['Cmat'] = np.zeros((1, 1))
+    sim = ChunkedSimulation(p, seed=seed)
+    sim.advance(discard)
+    t, v, _ = sim.advance(duration)
+    return t - t[0], v[0]
+
+
+def node_features(params, duration=10000.0, discard=2000.0, seed=None):
+    """模拟孤立节点并提取特征。"""
+    t, v = simulate_node(params, duration=duration, discard=discard, seed=seed)
+    return extract_features(t, v, fs=1000.0 / (t[1] - t[0]))
+
+
+def label_node(params, duration=10000.0, discard=2000.0, seed=None, centroids=None):
+    """
+    模拟孤立节点、提取特征并分类。
+
+    Returns
+    -------
+    label : str
+        类型名
+    features : dict
+        extract_features 的返回值
+    """
+    features = node_features(params, duration=duration, discard=discard, seed=seed)
+    return classify_activity(features, centroids), features
+
+
+def _feature_vector(features):
+    return _feature_matrix({key: np.atleast_1d(features[key]) for key in CLASSIFY_KEYS})[0]
+
+
+def type_centroids(types=ACTIVITY_TYPES, duration=10000.0, discard=2000.0, seed=0):
+    """
+    六种类型的参考特征（最近质心分类器的质心）。
+
+    Returns
+    -------
+    centroids : dict
+        类型名 -> 特征向量（CLASSIFY_KEYS 顺序）
+    """
+    key = (tuple(types), duration, discard, seed)
+    if key not in _CENTROID_CACHE:
+        _CENTROID_CACHE[key] = {
+            name: _feature_vector(node_features(spec['params'], duration=duration,
+                                                discard=discard, seed=seed))
+            for name, spec in types.items()
+        }
+    return _CENTROID_CACHE[key]
+
+
+def _feature_matrix(features):
+    """批量特征字典 -> (batch, len(CLASSIFY_KEYS))。"""
+    X = np.stack([np.asarray(features[key], dtype=np.float64) for key in CLASSIFY_KEYS], axis=-1)
+    X[..., 0] = np.log10(X[..., 0] + 1e-6)
+    return X
+
+
+def classify_batch(features, centroids=None):
+    """
+    批量最近质心分类。
+
+    Parameters
+    ----------
+    features : dict
+        extract_features_batch 的返回值
+    centroids : dict, optional
+        type_centroids 的返回值
+
+    Returns
+    -------
+    labels : ndarray of str, shape (batch,)
+    """
+    if centroids is None:
+        centroids = type_centroids()
+    names = list(centroids.keys())
+    C = np.stack([centroids[name] for name in names])
+    scale = np.std(C, axis=0) + 1e-9
+    X = _feature_matrix(features)
+    dist = (((X[:, None, :] - C[None, :, :]) / scale) ** 2).sum(axis=2)
+    return np.array(names)[np.argmin(dist, axis=1)]
+
+
+def classify_activity(features, centroids=None):
+    """
+    按最近质心把特征分为六类之一。
+
+    特征先按质心间的标准差归一化，使不同量纲的特征权重相当。
+
+    Parameters
+    ----------
+    features : dict
+        extract_features 的返回值
+    centroids : dict, optional
+        type_centroids 的返回值（默认使用 ACTIVITY_TYPES）
+
+    Returns
+    -------
+    label : str
+        类型名（例如 'Type3'）
+    """
+    batch = {key: np.atleast_1d(features[key]) for key in CLASSIFY_KEYS}
+    return str(classify_batch(batch, centroids)[0])
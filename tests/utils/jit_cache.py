@@ -0,0 +1,168 @@
+"""
+numba 编译缓存与预编译内核
+
+新进程第一次调用 numba 函数时要初始化 LLVM（约 0.3-0.5 s），缓存缺失时还要编译
+内核（数秒）。这里提供：
+- prime_jit_cache()：用小算例调用 utils 中全部 njit 函数，把规范签名写入磁盘缓存；
+- build_aot()：用 numba.pycc 把 Wendling 内核按 KERNEL_SIGNATURE 预编译为扩展模块
+  utils/_wendling_aot，wendling_kernel 导入时自动使用（源码修改后自动失效回退到 JIT），
+  新进程不需要 JIT 即可开始积分；
+- cold_start_time()：在新的子进程中测量导入到第一个输出采样的时间。
+
+命令行（在 tests/ 目录下）：
+    python -m utils.jit_cache            # 预热 JIT 缓存
+    python -m utils.jit_cache --aot      # 另外构建 AOT 内核（需要 C 编译器）
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from . import wendling_kernel
+from .wendling_kernel import (ChunkedSimulation, KERNEL_SIGNATURE, _integrate_chunk,
+                              _seed_kernel, _sigm, kernel_source_hash, load_default_params)
+
+_UTILS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 冷启动测量：导入内核并取得第一个输出采样
+_COLD_START = ("import sys, time; t0 = time.perf_counter(); sys.path.insert(0, {path!r}); "
+               "from utils.wendling_kernel import ChunkedSimulation, KERNEL_BACKEND; "
+               "sim = ChunkedSimulation({{'p_sigma': 30.0}}, seed=0); sim.advance(0.1); "
+               "print(KERNEL_BACKEND, time.perf_counter() - t0)")
+
+
+def _njit_functions():
+    """utils 中全部 njit 函数（名称 -> dispatcher）。"""
+    from . import benchmark, ensemble, features, observers
+    return {
+        'wendling_kernel._sigm': _sigm,
+        'wendling_kernel._seed_kernel': _seed_kernel,
+        'wendling_kernel._integrate_chunk': _integrate_chunk,
+        'ensemble._integrate_ensemble': ensemble._integrate_ensemble,
+        'features._local_maxima': features._local_maxima,
+        'features._count_selected_peaks': features._count_selected_peaks,
+        'features._moments': features._moments,
+        'features._spike_stats': features._spike_stats,
+        'observers._balloon_steps': observers._balloon_steps,
+        'benchmark._calibration_loop': benchmark._calibration_loop,
+    }
+
+
+def prime_jit_cache(verbose=True):
+    """
+    用小算例调用全部 njit 函数，使它们的规范签名写入（或读取自）磁盘缓存。
+
+    内核覆盖：单节点 / 网络、记录 / 不记录状态、有 / 无参数时间表（同一签名）。
+
+    Returns
+    -------
+    status : dict
+        函数名 -> {'signatures', 'cache_hits', 'cache_misses'}
+    """
+    from .features import extract_features_batch
+    from .observers import BOLDObserver
+    from .schedules import ParameterSchedule
+    from .benchmark import _calibration_loop
+    from .ensemble import simulate_ensemble
+    from .profiling import jit_cache_info
+
+    t0 = time.perf_counter()
+    rng = np.random.default_rng(0)
+    for N in (1, 3):
+        Cmat = rng.random((N, N)) if N > 1 else None
+        params = load_default_params(Cmat, seed=0)
+        sim = ChunkedSimulation(params, seed=0)
+        sim.advance(1.0)
+        sim.advance(1.0, decimate=2, record_states=True)
+        sim.set_schedule(ParameterSchedule().ramp('B', 20.0, 30.0, 0.0, 1.0))
+        sim.advance(1.0)
+        # pipeline 的积分线程总是使用 JIT 内核（nogil）
+        sim.use_nogil_kernel()
+        sim.advance(1.0)
+
+    simulate_ensemble(load_default_params(rng.random((3, 3)), seed=0), 2, duration=1.0,
+                      discard=1.0)
+    extract_features_batch(rng.standard_normal((2, 4000)), fs=1000.0)
+    bold = BOLDObserver(2, dt_in=0.1)
+    bold.update(np.arange(1, 101) * 0.1, rng.standard_normal((2, 100)))
+    _calibration_loop(10)
+
+    status = {name: jit_cache_info(func) for name, func in _njit_functions().items()}
+    if verbose:
+        print(f"  primed {len(status)} functions in {time.perf_counter() - t0:.1f} s "
+              f"(kernel backend: {wendling_kernel.KERNEL_BACKEND})")
+        for name, info in status.items():
+            print(f"    {name:36s} {info['signatures']} signature(s), "
+                  f"{info['cache_hits']} cache hit(s), {info['cache_misses']} miss(es)")
+    return status
+
+
+def build_aot(output_dir=_UTILS_DIR, verbose=True):
+    """
+    预编译 Wendling 内核为扩展模块 _wendling_aot（numba.pycc，需要 C 编译器）。
+
+    导出 integrate_chunk（签名 KERNEL_SIGNATURE）、seed_kernel 与 source_hash；
+    wendling_kernel 导入时核对 source_hash，内核源码修改后自动回退到 JIT。
+
+    Returns
+    -------
+    path : str
+        生成的扩展模块路径
+    """
+    from numba.pycc import CC
+
+    source_hash = kernel_source_hash()
+    cc = CC('_wendling_aot')
+    cc.output_dir = output_dir
+
+    def _source_hash():
+        return source_hash
+
+    cc.export('integrate_chunk', KERNEL_SIGNATURE)(_integrate_chunk.py_func)
+    cc.export('seed_kernel', 'void(i8)')(_seed_kernel.py_func)
+    cc.export('source_hash', 'i8()')(_source_hash)
+
+    t0 = time.perf_counter()
+    cc.compile()
+    if verbose:
+        print(f"  built {cc.output_file} in {time.perf_counter() - t0:.1f} s")
+    return cc.output_file
+
+
+def cold_start_time(env=None, timeout=120):
+    """
+    新子进程从启动到第一个输出采样的时间 (s)。
+
+    Returns
+    -------
+    backend : str
+        'aot' 或 'jit'
+    seconds : float
+    """
+    out = subprocess.run([sys.executable, '-c', _COLD_START.format(path=os.path.dirname(_UTILS_DIR))],
+                         capture_output=True, text=True, env=env, timeout=timeout, check=True)
+    backend, seconds = out.stdout.strip().splitlines()[-1].split()
+    return backend, float(seconds)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prime numba caches for the Wendling tools")
+    parser.add_argument('--aot', action='store_true',
+                        help="also build the ahead-of-time compiled kernel")
+    parser.add_argument('--no-prime', action='store_true', help="skip JIT cache priming")
+    args = parser.parse_args(argv)
+
+    if args.aot:
+        build_aot()
+    if not args.no_prime:
+        prime_jit_cache()
+    backend, seconds = cold_start_time()
+    print(f"  cold start to first sample: {seconds:.2f} s ({backend} kernel)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,467 @@
+"""
+线性响应（解析功率谱）
+
+在工作点（不动点）附近线性化 Wendling 方程，噪声 p(t) 到 v_pyr 的传递函数是
+几个二阶 PSP 核 h_X(s) = X x / (s + x)^2 的有理组合，功率谱可以直接写出，
+不需要模拟和 Welch 估计。网络在频域中处理：延迟耦合只是相位因子 e^{-iωτ}。
+
+只在不动点稳定（噪声驱动的背景活动）时有意义；振荡区（极限环）请用模拟。
+
+噪声强度与内核一致：内核每步 p_t = p_mean + p_sigma ξ sqrt(dt)，
+等价于强度 p_sigma · dt 的白噪声（dt 以秒计）。
+"""
+
+import warnings
+
+import numpy as np
+
+from .wendling_kernel import prepare_kernel_params
+
+
+def _sigm(v, kp):
+    return 2.0 * kp['e0'] / (1.0 + np.exp(kp['r'] * (kp['v0'] - v)))
+
+
+def _dsigm(v, kp):
+    s = _sigm(v, kp)
+    return kp['r'] * s * (1.0 - s / (2.0 * kp['e0']))
+
+
+def _node_state(y0, kp):
+    """由 y0 得到平衡时的 (v_pyr, 各 sigmoid 的自变量)。"""
+    y1 = kp['A'] / kp['a'] * (kp['C2'] * _sigm(kp['C1'] * y0, kp) + kp['p_mean'])
+    y2 = kp['B'] / kp['b'] * kp['C4'] * _sigm(kp['C3'] * y0, kp)
+    y4 = kp['B'] / kp['b'] * _sigm(kp['C3'] * y0, kp)
+    y3 = kp['G'] / kp['g'] * kp['C7'] * _sigm(kp['C5'] * y0 - kp['C6'] * y4, kp)
+    return y1 - y2 - y3, kp['C5'] * y0 - kp['C6'] * y4
+
+
+def _broadcast(kp, shape):
+    """把逐节点向量整形为可与 shape 广播的形式。"""
+    out = dict(kp)
+    for key in ('A', 'B', 'G', 'a', 'b', 'g', 'e0', 'v0', 'r', 'p_mean', 'p_sigma',
+                'K_gl', 'C1', 'C2', 'C3', 'C4', 'C5', 'C6', 'C7'):
+        out[key] = np.reshape(kp[key], shape)
+    return out
+
+
+def network_fixed_point(kp, n_grid=400, n_iter=40, n_homotopy=20):
+    """
+    求网络的不动点（每个节点取 y0 最小的平衡点，再沿耦合强度同伦延拓）。
+
+    Parameters
+    ----------
+    kp : dict
+        prepare_kernel_params 的返回值
+    n_grid : int
+        单节点求根的扫描网格
+    n_iter : int
+        二分 / Newton 迭代次数
+    n_homotopy : int
+        耦合强度的同伦步数
+
+    Returns
+    -------
+    y0 : ndarray, shape (N,)
+        各节点平衡时的 y0
+    v : ndarray, shape (N,)
+        各节点平衡时的 v_pyr
+    """
+    N = kp['N']
+    kpc = _broadcast(kp, (N, 1))
+
+    # 无耦合：每个节点扫描 y0 ∈ [0, 2 e0 A / a]，取第一个变号区间并二分
+    hi = 2.0 * kpc['e0'] * kpc['A'] / kpc['a']
+    grid = np.linspace(0.0, 1.0, n_grid)[None, :] * hi
+    res = grid - kpc['A'] / kpc['a'] * _sigm(_node_state(grid, kpc)[0], kpc)
+    first = np.argmax(res[:, 1:] >= 0, axis=1)
+    rows = np.arange(N)
+    lo, up = grid[rows, first], grid[rows, first + 1]
+
+    kpv = _broadcast(kp, (N,))
+    for _ in range(n_iter):
+        mid = 0.5 * (lo + up)
+        f = mid - kpv['A'] / kpv['a'] * _sigm(_node_state(mid, kpv)[0], kpv)
+        neg = f < 0
+        lo = np.where(neg, mid, lo)
+        up = np.where(neg, up, mid)
+    y0 = 0.5 * (lo + up)
+
+    Cmat = kp['Cmat']
+    if np.any(Cmat != 0) and np.any(kpv['K_gl'] != 0):
+        # 耦合：F(y0) = y0 - A/a (S(v) + λ K Σ C S(v_j)) = 0；
+        # λ 从 0 逐步增加到 1（同伦延拓），每步 Newton，保证停留在无耦合时的最低分支上
+        gain = kpv['A'] / kpv['a']
+        for lam in np.linspace(0.0, 1.0, n_homotopy + 1)[1:]:
+            K = lam * kpv['K_gl']
+            for _ in range(n_iter):
+                v, _ = _node_state(y0, kpv)
+                s = _sigm(v, kpv)
+                F = y0 - gain * (s + K * (Cmat @ s))
+
+                h = 1e-7
+                dv = (_node_state(y0 + h, kpv)[0] - v) / h
+                ds = _dsigm(v, kpv) * dv
+                J = np.eye(N) - gain[:, None] * (np.diag(ds) + K[:, None] * Cmat * ds[None, :])
+                step = np.linalg.solve(J, F)
+                y0 = y0 - step
+                if np.max(np.abs(step)) < 1e-12:
+                    break
+
+    v, _ = _node_state(y0, kpv)
+    return y0, v
+
+
+def node_transfer(kp, y0, freqs):
+    """
+    线性化节点的传递函数。
+
+    Parameters
+    ----------
+    kp : dict
+        prepare_kernel_params 的返回值
+    y0 : ndarray, shape (N,)
+        工作点
+    freqs : ndarray, shape (F,)
+        频率 (Hz)
+
+    Returns
+    -------
+    H_p : ndarray, shape (N, F)
+        噪声输入 p → v_pyr
+    H_u : ndarray, shape (N, F)
+        耦合输入（与 S(v) 同单位，进入 y5 方程）→ v_pyr
+    ds_v : ndarray, shape (N,)
+        工作点处输出 sigmoid 的斜率 S'(v)
+    """
+    N = kp['N']
+    kpv = _broadcast(kp, (N,))
+    kpc = _broadcast(kp, (N, 1))
+    y0 = np.asarray(y0, dtype=np.float64)
+
+    v, u_arg = _node_state(y0, kpv)
+    ds_v = _dsigm(v, kpv)[:, None]
+    ds_1 = _dsigm(kpv['C1'] * y0, kpv)[:, None]
+    ds_3 = _dsigm(kpv['C3'] * y0, kpv)[:, None]
+    ds_u = _dsigm(u_arg, kpv)[:, None]
+
+    s = 2j * np.pi * np.asarray(freqs, dtype=np.float64)[None, :]
+    h_a = kpc['A'] * kpc['a'] / (s + kpc['a']) ** 2
+    h_b = kpc['B'] * kpc['b'] / (s + kpc['b']) ** 2
+    h_g = kpc['G'] * kpc['g'] / (s + kpc['g']) ** 2
+
+    # v = h_a p + L y0，y0 = h_a (S'(v) v + u)
+    L = h_a * kpc['C2'] * kpc['C1'] * ds_1 \
+        - h_b * kpc['C4'] * kpc['C3'] * ds_3 \
+        - h_g * kpc['C7'] * ds_u * (kpc['C5'] - kpc['C6'] * h_b * kpc['C3'] * ds_3)
+    denom = 1.0 - L * h_a * ds_v
+
+    return h_a / denom, L * h_a / denom, ds_v[:, 0]
+
+
+def analytic_psd(params, freqs=None, Cmat=None, Dmat=None, cross=False):
+    """
+    线性化模型的 v_pyr 功率谱密度（单边，与 compute_psd / Welch 的 density 同单位）。
+
+    Parameters
+    ----------
+    params : dict
+        模型参数（model.params 或单节点参数字典）
+    freqs : ndarray, optional
+        频率 (Hz)，默认 0.5–100 Hz 步长 0.5 Hz
+    Cmat, Dmat : ndarray, optional
+        连接矩阵与距离矩阵（默认从 params 读取；无连接时按独立节点计算）
+    cross : bool
+        是否返回完整的互谱矩阵
+
+    Returns
+    -------
+    freqs : ndarray, shape (F,)
+    psd : ndarray, shape (N, F)
+        功率谱密度 (mV^2/Hz)；cross=True 时为互谱 (F, N, N)
+    """
+    if freqs is None:
+        freqs = np.arange(0.5, 100.0 + 1e-9, 0.5)
+    freqs = np.asarray(freqs, dtype=np.float64)
+
+    kp = prepare_kernel_params(params, Cmat=Cmat, Dmat=Dmat)
+    y0, _ = network_fixed_point(kp)
+    H_p, H_u, ds_v = node_transfer(kp, y0, freqs)
+    # 单边谱：2 × 噪声强度^2 × |H|^2
+    noise = 2.0 * (kp['p_sigma'] * kp['dt']) ** 2
+
+    coupled = np.any(kp['Cmat'] != 0) and np.any(kp['K_gl'] != 0)
+    if not coupled and not cross:
+        return freqs, noise[:, None] * np.abs(H_p) ** 2
+
+    T = network_transfer(kp, H_p, H_u, ds_v, freqs)
+    if cross:
+        return freqs, (T * noise[None, None, :]) @ T.conj().transpose(0, 2, 1)
+    return freqs, (np.abs(T) ** 2 @ noise).T
+
+
+def network_transfer(kp, H_p, H_u, ds_v, freqs):
+    """
+    网络的噪声 → v_pyr 传递矩阵 T(ω) = (I - diag(H_u) W(ω))^{-1} diag(H_p)。
+
+    W_ij(ω) = K_i C_ij S'_j e^{-iωτ_ij}，τ_ij 与内核相同（取整到积分步长）。
+
+    Returns
+    -------
+    T : ndarray, shape (F, N, N)
+    """
+    N = kp['N']
+    tau = kp['Dmat_ndt'] * kp['dt']
+    W0 = kp['K_gl'][:, None] * kp['Cmat'] * ds_v[None, :]
+    omega = 2.0 * np.pi * np.asarray(freqs)
+
+    W = W0[None, :, :] * np.exp(-1j * omega[:, None, None] * tau[None, :, :])
+    M = np.eye(N)[None, :, :] - H_u.T[:, :, None] * W
+    rhs = np.eye(N)[None, :, :] * H_p.T[:, None, :]
+    return np.linalg.solve(M, rhs)
+
+
+def analytic_peak_frequency(params, freq_range=(1, 50), resolution=0.1, Cmat=None,
+                            Dmat=None):
+    """
+    线性化模型的峰值频率（与 extract_peak_frequency 的返回值对应）。
+
+    Parameters
+    ----------
+    params : dict
+        模型参数
+    freq_range : tuple
+        频率范围 (Hz)
+    resolution : float
+        频率分辨率 (Hz)
+
+    Returns
+    -------
+    peak_freq : ndarray, shape (N,)
+        峰值频率 (Hz)
+    peak_power : ndarray, shape (N,)
+        峰值功率 (dB)
+    """
+    freqs = np.arange(freq_range[0], freq_range[1] + 1e-9, resolution)
+    freqs, psd = analytic_psd(params, freqs=freqs, Cmat=Cmat, Dmat=Dmat)
+    idx = np.argmax(psd, axis=1)
+    rows = np.arange(psd.shape[0])
+    return freqs[idx], 10 * np.log10(psd[rows, idx] + 1e-12)
+
+
+_NODE_KEYS = ('A', 'B', 'G', 'a', 'b', 'g', 'e0', 'v0', 'r',
+              'C1', 'C2', 'C3', 'C4', 'C5', 'C6', 'C7')
+
+# 状态维数不超过该值时用稠密特征值，否则用稀疏 Arnoldi（ARPACK）
+_DENSE_EIG_MAX = 400
+
+
+def _node_blocks(kp, y0):
+    """全部节点的平衡态 (10, N) 与单节点 Jacobian (10, 10, N)（向量化）。"""
+    from .bifurcation import equilibrium_state, jacobian
+
+    c = {key: np.ravel(kp[key]) for key in _NODE_KEYS}
+    c['p'] = np.ravel(kp['p_mean'])
+    y = equilibrium_state(y0, c)
+    return y, jacobian(y, c), c
+
+
+def node_stability(kp, y0):
+    """
+    各节点（无耦合）线性化 Jacobian 特征值的最大实部 (1/s)；< 0 表示稳定。
+    """
+    _, blocks, _ = _node_blocks(kp, y0)
+    return np.linalg.eigvals(np.moveaxis(blocks, -1, 0)).real.max(axis=1)
+
+
+def _coupled_jacobian(kp, y0):
+    """
+    忽略延迟的 10N 维耦合 Jacobian（scipy.sparse CSR）与各状态的噪声强度 q。
+
+    节点块只有约 20 个非零元，耦合只进入 y5 方程，非零元共 O(N + nnz(Cmat))。
+    """
+    from scipy import sparse
+
+    N = kp['N']
+    n = 10 * N
+    y, blocks, c = _node_blocks(kp, y0)
+    ds_v = _dsigm(y[1] - y[2] - y[3], c)
+    base = 10 * np.arange(N)
+
+    r, col = np.nonzero(np.any(blocks != 0, axis=2))
+    rows = [(base[None, :] + r[:, None]).ravel()]
+    cols = [(base[None, :] + col[:, None]).ravel()]
+    data = [blocks[r, col, :].ravel()]
+
+    # 耦合进入 y5 方程：A_i a_i K_i C_ij S'_j (y1_j - y2_j - y3_j)
+    i, j = np.nonzero(kp['Cmat'])
+    w = (kp['A'] * kp['a'] * kp['K_gl'])[i] * kp['Cmat'][i, j] * ds_v[j]
+    for k, sign in ((1, 1.0), (2, -1.0), (3, -1.0)):
+        rows.append(base[i] + 5)
+        cols.append(base[j] + k)
+        data.append(sign * w)
+
+    J = sparse.coo_matrix((np.concatenate(data), (np.concatenate(rows), np.concatenate(cols))),
+                          shape=(n, n)).tocsr()
+    q = np.zeros(n)
+    q[base + 6] = kp['A'] * kp['a'] * kp['p_sigma'] * kp['dt']
+    return J, q
+
+
+def network_stability(kp, y0):
+    """
+    耦合网络在不动点 y0 处（忽略延迟的）Jacobian 特征值的最大实部 (1/s)；< 0 表示稳定。
+
+    与 node_stability 不同，这里包含耦合项：单个节点都稳定时，足够强的耦合仍可使
+    网络失稳，此时线性响应的协方差没有意义。10N > _DENSE_EIG_MAX 时用稀疏 Arnoldi
+    （ARPACK，which='LR'）只求最右侧的特征值；极少数不收敛的情况才做稠密分解。
+    不稳定时返回值可能只是某个正实部特征值（最大实部的下界）。
+    """
+    from scipy.sparse.linalg import ArpackNoConvergence, eigs
+
+    J, _ = _coupled_jacobian(kp, y0)
+    n = J.shape[0]
+    if n > _DENSE_EIG_MAX:
+        # 只求最右侧的少数特征值（k 越大越难收敛）；不收敛时增大 k 与 Krylov
+        # 子空间再试，仍不收敛才做稠密分解
+        for k, ncv in ((1, 20), (2, 40), (4, 120)):
+            try:
+                vals = eigs(J, k=k, which='LR', ncv=min(n - 1, ncv),
+                            return_eigenvectors=False, tol=1e-8, maxiter=300)
+                return float(np.max(vals.real))
+            except ArpackNoConvergence as exc:
+                # 已收敛的 Ritz 值是真实特征值：有实部 >= 0 的即可判定不稳定
+                if len(exc.eigenvalues) and np.max(exc.eigenvalues.real) >= 0:
+                    return float(np.max(exc.eigenvalues.real))
+    return float(np.max(np.linalg.eigvals(J.toarray()).real))
+
+
+def _lyapunov_covariance(kp, y0):
+    """
+    忽略延迟的 10N 维状态空间 Lyapunov 方程 J P + P J^T + Q = 0，返回 v_pyr 的协方差。
+    """
+    from scipy.linalg import solve_continuous_lyapunov
+
+    N = kp['N']
+    J, q = _coupled_jacobian(kp, y0)
+    P = solve_continuous_lyapunov(J.toarray(), -np.diag(q ** 2))
+    out = np.zeros((N, 10 * N))
+    for k, sign in ((1, 1.0), (2, -1.0), (3, -1.0)):
+        out[np.arange(N), 10 * np.arange(N) + k] = sign
+    return out @ P @ out.T
+
+
+def _predict_fc(kp, y0, method, f_max, n_freqs, block):
+    if method == 'lyapunov':
+        cov = _lyapunov_covariance(kp, y0)
+    elif method == 'spectral':
+        freqs = f_max * np.linspace(0.0, 1.0, n_freqs) ** 2
+        weights = np.gradient(freqs)
+        H_p, H_u, ds_v = node_transfer(kp, y0, freqs)
+        scale = kp['p_sigma'] * kp['dt']
+
+        # 逐频率累积 Re(T diag(σ²) T^H)，避免保存 (F, N, N) 的互谱
+        cov = np.zeros((kp['N'], kp['N']))
+        for k in range(0, n_freqs, block):
+            sl = slice(k, k + block)
+            T = network_transfer(kp, H_p[:, sl], H_u[:, sl], ds_v, freqs[sl])
+            X = T * scale[None, None, :]
+            for w, Xf in zip(weights[sl], X):
+                cov += w * (Xf @ Xf.conj().T).real
+    else:
+        raise NotImplementedError(f"Method {method} not implemented")
+
+    std = np.sqrt(np.diag(cov))
+    return cov / np.outer(std, std)
+
+
+def predict_fc(params, Cmat=None, Dmat=None, method='spectral', f_max=200.0,
+               n_freqs=96, block=16):
+    """
+    线性化网络的 v_pyr 功能连接预测（零延迟相关，与 compute_fc 的 Pearson FC 对应）。
+
+    协方差是 Lyapunov 方程的解；'spectral' 在频域求它（互谱积分，延迟作为相位因子
+    保留，只需每个频率一次 N × N 求解），'lyapunov' 直接解 10N 维状态空间的
+    Lyapunov 方程（忽略延迟，适合小网络或作为对照）。
+
+    线性化网络不稳定（network_stability >= 0）时协方差不存在：发出 RuntimeWarning
+    并返回全 NaN 的矩阵。
+
+    Parameters
+    ----------
+    params : dict
+        模型参数
+    Cmat, Dmat : ndarray, optional
+        连接矩阵与距离矩阵（默认从 params 读取）
+    method : str
+        'spectral' 或 'lyapunov'
+    f_max : float
+        频域积分上限 (Hz)；v_pyr 谱按 f^-4 衰减，200 Hz 以上可以忽略
+    n_freqs : int
+        频率点数（在低频加密）
+    block : int
+        每次批量求解的频率数（控制内存）
+
+    Returns
+    -------
+    fc : ndarray, shape (N, N)
+        预测的功能连接矩阵（不稳定时为 NaN）
+    """
+    if method not in ('spectral', 'lyapunov'):
+        raise NotImplementedError(f"Method {method} not implemented")
+    kp = prepare_kernel_params(params, Cmat=Cmat, Dmat=Dmat)
+    y0, _ = network_fixed_point(kp)
+    max_real = network_stability(kp, y0)
+    if max_real >= 0:
+        warnings.warn(f"线性化网络不稳定（最大特征值实部 {max_real:.3g} 1/s >= 0），"
+                      "线性响应 FC 无意义，返回 NaN", RuntimeWarning, stacklevel=2)
+        return np.full((kp['N'], kp['N']), np.nan)
+    return _predict_fc(kp, y0, method, f_max, n_freqs, block)
+
+
+def screen_coupling(params, K_values, Cmat=None, Dmat=None, target=(0.3, 0.7),
+                    method='spectral'):
+    """
+    用 predict_fc 筛选全局耦合强度：返回每个 K_gl 的预测 Mean |FC|（非对角）。
+
+    不动点不稳定（振荡）的节点或耦合后不稳定的网络使线性化失效，对应的 K_gl
+    标记为无效，不计算 FC（'mean_abs_fc' 为 NaN）。
+
+    Parameters
+    ----------
+    params : dict
+        模型参数
+    K_values : array_like
+        候选 K_gl
+    Cmat, Dmat : ndarray, optional
+        连接矩阵与距离矩阵
+    target : tuple
+        Mean |FC| 目标范围
+
+    Returns
+    -------
+    result : dict
+        'K_gl', 'mean_abs_fc', 'max_real_eig'（耦合 Jacobian 特征值的最大实部，1/s）,
+        'stable'（耦合网络稳定）, 'valid'（节点与网络都稳定，线性化有效）, 'in_target'
+    """
+    K_values = np.asarray(K_values, dtype=np.float64)
+    mean_fc = np.full(len(K_values), np.nan)
+    max_real = np.full(len(K_values), np.nan)
+    valid = np.zeros(len(K_values), dtype=bool)
+
+    for k, K in enumerate(K_values):
+        p = dict(params)
+        p['K_gl'] = K
+        kp = prepare_kernel_params(p, Cmat=Cmat, Dmat=Dmat)
+        y0, _ = network_fixed_point(kp)
+        max_real[k] = network_stability(kp, y0)
+        valid[k] = max_real[k] < 0 and np.all(node_stability(kp, y0) < 0)
+        if not valid[k]:
+            continue
+        fc = _predict_fc(kp, y0, method, 200.0, 96, 16)
+        mask = ~np.eye(kp['N'], dtype=bool)
+        mean_fc[k] = np.mean(np.abs(fc[mask]))
+
+    in_target = valid & (mean_fc >= target[0]) & (mean_fc <= target[1])
+    return {'K_gl': K_values, 'mean_abs_fc': mean_fc, 'max_real_eig': max_real,
+            'stable': max_real < 0, 'valid': valid, 'in_target': in_target}
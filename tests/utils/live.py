@@ -0,0 +1,180 @@
+"""
+单节点实时流式探索
+
+内核以短块（默认 20 ms）推进；块之间应用参数修改，每块把降采样的 v_pyr 和滚动窗口
+的功率谱推送给使用者（回调函数或生成器）。不必为每次调参重新运行 5-20 s 的模拟：
+参数修改在下一个块边界生效（实时节奏下延迟不超过一个块长）。
+
+用法（notebook 中用控件回调 session.set_params）：
+    session = LiveSession(ACTIVITY_TYPES['Type2']['params'], seed=0)
+    session.start(callback)              # 后台线程，按实时节奏推送帧
+    session.set_params(B=40.0)           # 任意线程中调用
+    session.stop()
+"""
+
+import threading
+import time
+
+import numpy as np
+from scipy.signal import welch
+
+from .wendling_kernel import ChunkedSimulation, load_default_params
+
+
+class LiveSession:
+    """
+    可交互修改参数的单节点流式模拟。
+
+    Parameters
+    ----------
+    params : dict
+        节点参数（缺失项使用默认值）
+    seed : int, optional
+        噪声随机种子
+    chunk : float
+        每块时长 (ms)，即参数修改生效的最大模拟时间延迟
+    decimate : int
+        输出降采样倍数（dt=0.1 ms 时 10 -> 1 kHz）
+    window : float
+        滚动功率谱的窗口 (ms)
+    psd_every : float
+        每隔多少模拟时间 (ms) 更新一次功率谱
+    nperseg : int
+        Welch 窗口长度上限
+    speed : float or None
+        相对实时的速度（1.0 为实时）；None 表示尽快运行
+    """
+
+    def __init__(self, params, seed=None, chunk=20.0, decimate=10, window=4000.0,
+                 psd_every=250.0, nperseg=2048, speed=1.0):
+        p = load_default_params(seed=seed, random_init=False)
+        p.update(params)
+        p['Cmat'] = np.zeros((1, 1))
+        self.sim = ChunkedSimulation(p, seed=seed)
+        self.params = {key: p[key] for key in ('A', 'B', 'G', 'p_mean', 'p_sigma')}
+        self.chunk = chunk
+        self.decimate = decimate
+        self.fs = 1000.0 / (self.sim.dt * decimate)
+        self.nperseg = nperseg
+        self.speed = speed
+        self.psd_every = psd_every
+
+        self._buffer = np.zeros(int(round(window * self.fs / 1000.0)))
+        self._filled = 0
+        self._next_psd = psd_every
+        self._psd = None
+        self._pending = {}
+        self._requested = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def set_params(self, **values):
+        """
+        修改参数（线程安全），在下一个块之前生效。
+
+        记录调用时刻，下一帧的 'latency_ms' 给出从调用到生效的墙钟时间。
+        """
+        with self._lock:
+            self._pending.update(values)
+            self._requested = time.perf_counter()
+
+    def _apply_pending(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            requested = self._requested
+        if not pending:
+            return None, None
+        self.sim.set_params(**pending)
+        self.params.update(pending)
+        return pending, (time.perf_counter() - requested) * 1000.0
+
+    def _push(self, v):
+        n = len(v)
+        buf = self._buffer
+        if n >= len(buf):
+            buf[:] = v[-len(buf):]
+        else:
+            buf[:-n] = buf[n:]
+            buf[-n:] = v
+        self._filled = min(len(buf), self._filled + n)
+
+    def _update_psd(self):
+        data = self._buffer[len(self._buffer) - self._filled:]
+        if len(data) < 64:
+            return
+        freqs, psd = welch(data, fs=self.fs, nperseg=min(self.nperseg, len(data) // 2))
+        band = (freqs >= 0.5) & (freqs <= 50.0)
+        f_star = float(freqs[band][np.argmax(psd[band])]) if band.any() else float('nan')
+        self._psd = (freqs, psd, f_star)
+
+    def step(self):
+        """
+        推进一个块并返回一帧。
+
+        Returns
+        -------
+        frame : dict
+            't' (T,)、'v' (T,)：本块降采样的时间 (ms) 与 v_pyr；
+            'freqs'、'psd'、'f_star'：最近一次滚动功率谱（窗口未满前为 None）；
+            'params'：当前参数；'applied'：本块前生效的修改（或 None）；
+            'latency_ms'：修改从请求到生效的墙钟时间；'wall_ms'：本块的计算时间
+        """
+        t0 = time.perf_counter()
+        applied, latency = self._apply_pending()
+        t, v, _ = self.sim.advance(self.chunk, decimate=self.decimate)
+        v = v[0]
+        self._push(v)
+        if self.sim.t >= self._next_psd:
+            self._update_psd()
+            self._next_psd += self.psd_every
+
+        freqs, psd, f_star = self._psd if self._psd is not None else (None, None, None)
+        return {
+            't': t, 'v': v, 'freqs': freqs, 'psd': psd, 'f_star': f_star,
+            'params': dict(self.params), 'applied': applied, 'latency_ms': latency,
+            'wall_ms': (time.perf_counter() - t0) * 1000.0,
+        }
+
+    def frames(self, duration=None):
+        """
+        帧生成器；speed 不为 None 时按实时节奏推送。
+
+        Parameters
+        ----------
+        duration : float, optional
+            模拟时长 (ms)；None 表示直到 stop()
+        """
+        if self._thread is None:
+            self._stop.clear()
+        t_start = self.sim.t
+        wall0 = time.perf_counter()
+        while not self._stop.is_set():
+            if duration is not None and self.sim.t - t_start >= duration:
+                return
+            yield self.step()
+            if self.speed is not None:
+                target = wall0 + (self.sim.t - t_start) / 1000.0 / self.speed
+                delay = target - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+
+    def run(self, callback, duration=None):
+        """把每一帧交给 callback(frame)；callback 返回 False 时停止。"""
+        for frame in self.frames(duration):
+            if callback(frame) is False:
+                break
+
+    def start(self, callback, duration=None):
+        """在后台线程中运行 run()，主线程（或控件回调）可继续调用 set_params。"""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, args=(callback, duration), daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self, timeout=1.0):
+        """停止流式运行。"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
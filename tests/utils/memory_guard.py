@@ -0,0 +1,288 @@
+"""
+运行前的内存估计与保护
+
+在分配数组之前根据 N、时长、dt、记录选项与最大延迟估算所需字节数，并与内存预算
+（默认取可用内存的一半，可用环境变量 WENDLING_MEMORY_BUDGET 设置，例如 '8G'）比较。
+超出预算时按策略拒绝运行、提高降采样倍数，或改为分块流式写盘并选择合适的块长。
+"""
+
+import os
+
+import numpy as np
+
+from .output_store import run_to_disk
+from .wendling_kernel import N_STATE_VARS, prepare_kernel_params, run_model
+
+
+# 可用内存中默认允许使用的比例
+DEFAULT_BUDGET_FRACTION = 0.5
+
+# 自动降采样的上限（dt=0.1 ms 时保留 1 kHz）
+MAX_AUTO_DECIMATE = 10
+
+_UNITS = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+
+_BYTES = 8
+
+
+class MemoryBudgetError(MemoryError):
+    """预计内存超过预算时抛出（在任何大数组分配之前）。"""
+
+
+def parse_bytes(value):
+    """'512M'、'8G'、'1.5G' 或整数 -> 字节数。"""
+    if isinstance(value, (int, float)):
+        return int(value)
+    text = str(value).strip().upper().rstrip('B')
+    if text and text[-1] in _UNITS:
+        return int(float(text[:-1]) * _UNITS[text[-1]])
+    return int(float(text))
+
+
+def available_memory():
+    """
+    当前可用内存（字节）；无法获取时为 None。
+
+    依次尝试 /proc/meminfo 的 MemAvailable 与 psutil。
+    """
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return int(psutil.virtual_memory().available)
+
+
+def memory_budget(budget=None):
+    """
+    内存预算（字节）。
+
+    优先级：参数 budget > 环境变量 WENDLING_MEMORY_BUDGET >
+    DEFAULT_BUDGET_FRACTION x 可用内存；都无法确定时为 None（不检查）。
+    """
+    if budget is not None:
+        return parse_bytes(budget)
+    env = os.environ.get('WENDLING_MEMORY_BUDGET')
+    if env:
+        return parse_bytes(env)
+    avail = available_memory()
+    return None if avail is None else int(DEFAULT_BUDGET_FRACTION * avail)
+
+
+def estimate_run_memory(N, duration, dt=0.1, record_states=True, decimate=1, max_delay=0.0,
+                        nnz=None, chunk_duration=None, backend='chunked'):
+    """
+    估算一次运行所需的内存。
+
+    Parameters
+    ----------
+    N : int
+        节点数
+    duration : float
+        时长 (ms)
+    dt : float
+        积分步长 (ms)
+    record_states : bool
+        是否保存全部 10 个状态变量（否则只有 v_pyr）
+    decimate : int
+        输出降采样倍数
+    max_delay : float
+        最大传导延迟 (ms)，决定延迟历史的长度
+    nnz : int, optional
+        非零连接数（默认 N*N）
+    chunk_duration : float, optional
+        分块流式运行时的块长 (ms)；None 表示整段输出留在内存中
+    backend : str
+        'chunked'（ChunkedSimulation / run_model）或 'model'
+        （neurolib 的 model.run()：全分辨率保存 10 个状态变量加延迟历史，
+        不支持降采样，属于下限估计）
+
+    Returns
+    -------
+    estimate : dict
+        各部分字节数与 'total'
+    """
+    n_hist = int(np.ceil(max_delay / dt)) + 1
+    nnz = N * N if nnz is None else nnz
+
+    if backend == 'model':
+        n_t = int(round(duration / dt))
+        out = {
+            'states': N_STATE_VARS * N * (n_t + n_hist) * _BYTES,
+            'time': n_t * _BYTES,
+            'connectivity': 2 * N * N * _BYTES,
+        }
+    else:
+        span = duration if chunk_duration is None else min(chunk_duration, duration)
+        n_out = int(round(span / dt)) // decimate
+        n_vars = 1 + (N_STATE_VARS if record_states else 0)
+        out = {
+            'state': 2 * N_STATE_VARS * N * _BYTES,
+            'history': N * n_hist * _BYTES,
+            # 稠密 Cmat 与 Dmat_ndt，以及 CSR（权重、列号、延迟）
+            'connectivity': 2 * N * N * _BYTES + 3 * nnz * _BYTES,
+            'output': n_vars * N * n_out * _BYTES + n_out * _BYTES,
+        }
+    out['total'] = sum(out.values())
+    return out
+
+
+def _describe(params, Cmat=None, Dmat=None):
+    kp = prepare_kernel_params(params, Cmat, Dmat)
+    dt = kp['dt'] * 1000.0
+    delay = kp['csr_delay']
+    return {
+        'N': kp['N'],
+        'dt': dt,
+        'max_delay': float(delay.max()) * dt if len(delay) else 0.0,
+        'nnz': len(kp['csr_idx']),
+    }
+
+
+def plan_run(params, duration=None, record_states=True, decimate=1, budget=None,
+             policy='auto', Cmat=None, Dmat=None, max_decimate=MAX_AUTO_DECIMATE,
+             min_chunk=10.0):
+    """
+    根据内存预算决定如何运行。
+
+    Parameters
+    ----------
+    params : dict
+        模型参数（例如 model.params）
+    duration : float, optional
+        时长 (ms)（默认 params['duration']）
+    record_states : bool
+        是否需要全部状态变量
+    decimate : int
+        期望的输出降采样倍数
+    budget : int or str, optional
+        内存预算（见 memory_budget）
+    policy : str
+        超出预算时的处理：
+        'refuse'   抛出 MemoryBudgetError；
+        'decimate' 提高降采样倍数（最多 max_decimate），仍超出则拒绝；
+        'stream'   改为分块流式写盘，块长按预算确定；
+        'auto'     先尝试 'decimate'，再 'stream'
+    Cmat, Dmat : ndarray, optional
+        连接矩阵与距离矩阵（默认从 params 读取）
+    max_decimate : int
+        自动降采样的上限
+    min_chunk : float
+        流式运行的最小块长 (ms)；连这一块都放不下时拒绝
+
+    Returns
+    -------
+    plan : dict
+        'mode'（'memory' 或 'stream'）、'decimate'、'chunk_duration'（stream 时）、
+        'estimate'（所选方式的估计）、'requested'（原始请求的估计）、'budget'
+    """
+    if duration is None:
+        duration = params['duration']
+    info = _describe(params, Cmat, Dmat)
+    budget = memory_budget(budget)
+
+    def estimate(dec, chunk=None):
+        return estimate_run_memory(info['N'], duration, info['dt'], record_states, dec,
+                                   info['max_delay'], info['nnz'], chunk)
+
+    requested = estimate(decimate)
+    plan = {'mode': 'memory', 'decimate': decimate, 'chunk_duration': None,
+            'estimate': requested, 'requested': requested, 'budget': budget}
+    if budget is None or requested['total'] <= budget:
+        return plan
+
+    if policy in ('decimate', 'auto'):
+        for dec in range(decimate + 1, max(max_decimate, decimate) + 1):
+            est = estimate(dec)
+            if est['total'] <= budget:
+                plan.update(decimate=dec, estimate=est)
+                return plan
+
+    if policy in ('stream', 'auto'):
+        # 固定开销之外的预算全部给一个输出块
+        fixed = estimate(decimate, chunk=0.0)['total']
+        per_ms = (estimate(decimate, chunk=1000.0)['total'] - fixed) / 1000.0
+        chunk = (budget - fixed) / per_ms if per_ms > 0 else duration
+        if chunk >= min_chunk:
+            chunk = float(min(duration, np.floor(chunk)))
+            plan.update(mode='stream', chunk_duration=chunk,
+                        estimate=estimate(decimate, chunk))
+            return plan
+
+    raise MemoryBudgetError(
+        f"run needs ~{requested['total'] / 1024 ** 3:.2f} GB "
+        f"(N={info['N']}, {duration:g} ms, dt={info['dt']:g} ms) but the budget is "
+        f"{budget / 1024 ** 3:.2f} GB (policy={policy!r})")
+
+
+def check_model_memory(model, duration=None, budget=None, verbose=True):
+    """
+    在 model.run() 之前检查 neurolib 模型的内存需求，超出预算时抛出 MemoryBudgetError。
+
+    model.run() 无法分块或降采样，因此这里只能拒绝；需要更长的运行时改用
+    guarded_run（分块内核）。
+
+    Returns
+    -------
+    estimate : dict
+        estimate_run_memory(backend='model') 的结果
+    """
+    params = model.params
+    if duration is None:
+        duration = params['duration']
+    info = _describe(params)
+    est = estimate_run_memory(info['N'], duration, info['dt'], max_delay=info['max_delay'],
+                              backend='model')
+    budget = memory_budget(budget)
+    if verbose:
+        limit = 'unknown' if budget is None else f"{budget / 1024 ** 3:.2f} GB"
+        print(f"  Memory estimate: {est['total'] / 1024 ** 3:.2f} GB (budget {limit})")
+    if budget is not None and est['total'] > budget:
+        raise MemoryBudgetError(
+            f"model.run() needs ~{est['total'] / 1024 ** 3:.2f} GB for N={info['N']}, "
+            f"{duration:g} ms at dt={info['dt']:g} ms; budget is {budget / 1024 ** 3:.2f} GB. "
+            f"Shorten the run or use guarded_run / run_to_disk.")
+    return est
+
+
+def guarded_run(model, duration=None, record_states=True, decimate=1, budget=None,
+                policy='auto', path=None, seed=None):
+    """
+    按 plan_run 的结果运行模型：放得下就在内存中运行（必要时降采样），
+    否则分块流式写入 HDF5。
+
+    Parameters
+    ----------
+    model : object
+        模型（读取 model.params）
+    duration, record_states, decimate, budget, policy
+        见 plan_run
+    path : str, optional
+        流式运行的 HDF5 路径（需要 stream 时必须给出）
+    seed : int, optional
+        噪声随机种子
+
+    Returns
+    -------
+    plan : dict
+        plan_run 的结果
+    result : dict or OutputReader
+        内存运行时为 run_model 的输出，流式运行时为 run_to_disk 的读取器
+    """
+    plan = plan_run(model.params, duration, record_states, decimate, budget, policy)
+    if plan['mode'] == 'memory':
+        return plan, run_model(model, duration, decimate=plan['decimate'],
+                               record_states=record_states, seed=seed)
+    if path is None:
+        raise MemoryBudgetError(
+            f"run does not fit in memory; pass path= to stream it to disk "
+            f"in {plan['chunk_duration']:g} ms chunks")
+    return plan, run_to_disk(model, path, duration, chunk_duration=plan['chunk_duration'],
+                             decimate=plan['decimate'], record_states=record_states,
+                             seed=seed)
@@ -0,0 +1,507 @@
+"""
+在线观察器
+
+在分块内核运行过程中把 PSP 流转换为可与实验数据直接比较的信号，
+只保留观测量本身而不保存 10 kHz 的源信号。
+
+- BOLDObserver: Balloon–Windkessel 血流动力学模型，输出按 TR 采样的 BOLD 与 BOLD FC
+- SensorObserver: 导联场（lead-field）前向投影到 EEG/SEEG 传感器空间（可选双极导联）
+- FCObserver / PSDObserver / EventObserver: 流式计算 FC、Welch 功率谱与阈值事件，
+  结果与对整段信号计算相同
+"""
+
+import numpy as np
+from numba import njit
+from scipy.signal import welch
+
+from .wendling_kernel import ChunkedSimulation, DEFAULT_PARAMS
+
+
+# Balloon–Windkessel 参数（Friston et al. 2003，与 neurolib BOLD 模型相同）
+BALLOON_PARAMS = {
+    'kappa': 0.65,   # 信号衰减率 (1/s)
+    'gamma': 0.41,   # 自调节反馈率 (1/s)
+    'tau': 0.98,     # 血液通过时间 (s)
+    'alpha': 0.32,   # Grubb 指数
+    'rho': 0.34,     # 静息氧摄取率
+    'V0': 0.02,      # 静息血容量比例
+}
+
+
+@njit(cache=True)
+def _balloon_steps(x, s, f, v, q, dt, kappa, gamma, tau, alpha, rho):
+    """
+    对每个 BOLD 步长积分 Balloon 方程（Euler），x 形状为 (N, n_steps)。
+    状态 s, f, v, q 原地更新；返回每步结束时的 (v, q)。
+    """
+    N, n_steps = x.shape
+    v_out = np.empty((N, n_steps))
+    q_out = np.empty((N, n_steps))
+    inv_alpha = 1.0 / alpha
+
+    for k in range(n_steps):
+        for i in range(N):
+            f_i = f[i]
+            v_i = v[i]
+            q_i = q[i]
+            v_pow = v_i ** inv_alpha
+
+            ds = x[i, k] - kappa * s[i] - gamma * (f_i - 1.0)
+            dv = (f_i - v_pow) / tau
+            dq = (f_i / rho * (1.0 - (1.0 - rho) ** (1.0 / f_i)) - q_i * v_pow / v_i) / tau
+
+            s[i] += dt * ds
+            f[i] += dt * s[i]
+            v[i] += dt * dv
+            q[i] += dt * dq
+
+            v_out[i, k] = v[i]
+            q_out[i, k] = q[i]
+
+    return v_out, q_out
+
+
+class BOLDObserver:
+    """
+    Balloon–Windkessel BOLD 观察器。
+
+    驱动信号为节点的突触活动（锥体细胞群发放率 S(v_pyr)，乘以 input_scale）。
+    PSP 流先按 dt_bold 分箱平均，再以粗步长积分血流动力学方程，每个 TR 采样一次。
+    内存只与 TR 采样点数成正比。
+
+    Parameters
+    ----------
+    N : int
+        节点数
+    dt_in : float
+        输入 PSP 的采样间隔 (ms)
+    TR : float
+        BOLD 采样间隔 (ms)，HCP 为 720
+    dt_bold : float
+        血流动力学积分步长 (ms)，需整除 TR
+    input_scale : float
+        发放率 (1/s) 到神经活动驱动的缩放
+    sigmoid : tuple, optional
+        (e0, v0, r)，默认与内核相同
+    """
+
+    def __init__(self, N, dt_in, TR=720.0, dt_bold=10.0, input_scale=0.05,
+                 sigmoid=None):
+        self.N = N
+        self.dt_in = dt_in
+        self.TR = TR
+        self.dt_bold = dt_bold
+        self.input_scale = input_scale
+        if sigmoid is None:
+            sigmoid = (DEFAULT_PARAMS['e0'], DEFAULT_PARAMS['v0'], DEFAULT_PARAMS['r'])
+        # 标量或长度 N 的向量（每节点 sigmoid）
+        self.e0, self.v0, self.r = (np.reshape(np.asarray(x, dtype=np.float64), (-1, 1))
+                                    for x in sigmoid)
+
+        self.n_bin = max(1, int(round(dt_bold / dt_in)))
+        self.steps_per_TR = max(1, int(round(TR / dt_bold)))
+
+        # Balloon 状态（静息态）
+        self.s = np.zeros(N)
+        self.f = np.ones(N)
+        self.v = np.ones(N)
+        self.q = np.ones(N)
+
+        self._pending = np.zeros((N, 0))
+        self._step = 0
+        self._bold = []
+        self._t_bold = []
+
+    def _rate(self, v_pyr):
+        return 2.0 * self.e0 / (1.0 + np.exp(self.r * (self.v0 - v_pyr)))
+
+    def update(self, t, v, ys=None):
+        rate = self._rate(v) * self.input_scale
+        buf = np.concatenate([self._pending, rate], axis=1)
+
+        n_steps = buf.shape[1] // self.n_bin
+        used = n_steps * self.n_bin
+        self._pending = buf[:, used:]
+        if n_steps == 0:
+            return
+
+        x = buf[:, :used].reshape(self.N, n_steps, self.n_bin).mean(axis=2)
+        p = BALLOON_PARAMS
+        v_out, q_out = _balloon_steps(
+            np.ascontiguousarray(x), self.s, self.f, self.v, self.q,
+            self.dt_bold / 1000.0, p['kappa'], p['gamma'], p['tau'], p['alpha'], p['rho'])
+
+        # 每个 TR 的最后一步采样
+        steps = self._step + np.arange(1, n_steps + 1)
+        sample = np.where(steps % self.steps_per_TR == 0)[0]
+        if len(sample):
+            self._bold.append(self._bold_signal(v_out[:, sample], q_out[:, sample]))
+            self._t_bold.append(steps[sample] * self.dt_bold)
+        self._step += n_steps
+
+    @staticmethod
+    def _bold_signal(v, q):
+        rho, V0 = BALLOON_PARAMS['rho'], BALLOON_PARAMS['V0']
+        k1, k2, k3 = 7.0 * rho, 2.0, 2.0 * rho - 0.2
+        return V0 * (k1 * (1.0 - q) + k2 * (1.0 - q / v) + k3 * (1.0 - v))
+
+    @property
+    def bold(self):
+        """BOLD 时间序列 (N, n_TR)。"""
+        if not self._bold:
+            return np.zeros((self.N, 0))
+        return np.concatenate(self._bold, axis=1)
+
+    @property
+    def t_bold(self):
+        """BOLD 采样时间 (ms)。"""
+        if not self._t_bold:
+            return np.zeros(0)
+        return np.concatenate(self._t_bold)
+
+    def fc(self, discard=10000.0):
+        """
+        BOLD 功能连接矩阵。
+
+        Parameters
+        ----------
+        discard : float
+            丢弃开头的血流动力学暂态 (ms)
+
+        Returns
+        -------
+        fc : ndarray, shape (N, N)
+        """
+        keep = self.t_bold > discard
+        return np.corrcoef(self.bold[:, keep])
+
+
+def bipolar_montage(pairs, n_sensors):
+    """
+    构建双极导联矩阵。
+
+    Parameters
+    ----------
+    pairs : sequence of (int, int)
+        (正极, 负极) 传感器索引，例如 SEEG 相邻触点 [(0, 1), (1, 2), ...]
+    n_sensors : int
+        传感器数
+
+    Returns
+    -------
+    M : ndarray, shape (n_pairs, n_sensors)
+        导联矩阵（每行 +1 / -1）
+    """
+    M = np.zeros((len(pairs), n_sensors))
+    for row, (anode, cathode) in enumerate(pairs):
+        M[row, anode] = 1.0
+        M[row, cathode] = -1.0
+    return M
+
+
+class SensorObserver:
+    """
+    传感器空间前向投影观察器。
+
+    每块 PSP 先按 decimate 做块平均（抗混叠 + 降采样），再乘以导联场
+    （传感器 × 脑区）。投影是线性的，因此先降采样再投影结果相同而计算量更小。
+    只保存传感器信号；也可把每块结果转发给另一个观察器（例如 HDF5Writer）。
+
+    Parameters
+    ----------
+    leadfield : ndarray, shape (n_sensors, N)
+        导联场矩阵
+    decimate : int
+        相对输入采样的降采样倍数
+    montage : ndarray, shape (n_channels, n_sensors), optional
+        导联矩阵（例如 bipolar_montage 的返回值），与导联场预先相乘
+    sink : observer, optional
+        接收传感器信号块的下游观察器（提供时不在内存中累积）
+    """
+
+    def __init__(self, leadfield, decimate=10, montage=None, sink=None):
+        leadfield = np.asarray(leadfield, dtype=np.float64)
+        if montage is not None:
+            leadfield = np.asarray(montage, dtype=np.float64) @ leadfield
+        self.gain = np.ascontiguousarray(leadfield)
+        self.n_channels, self.N = self.gain.shape
+        self.decimate = decimate
+        self.sink = sink
+
+        self._pending_v = np.zeros((self.N, 0))
+        self._pending_t = np.zeros(0)
+        self._chunks = []
+        self._t = []
+
+    def update(self, t, v, ys=None):
+        if v.shape[0] != self.N:
+            raise ValueError(f"导联场有 {self.N} 个脑区，输入有 {v.shape[0]} 个节点")
+
+        v = np.concatenate([self._pending_v, v], axis=1)
+        t = np.concatenate([self._pending_t, t])
+
+        n_out = v.shape[1] // self.decimate
+        used = n_out * self.decimate
+        self._pending_v = v[:, used:]
+        self._pending_t = t[used:]
+        if n_out == 0:
+            return
+
+        v_dec = v[:, :used].reshape(self.N, n_out, self.decimate).mean(axis=2)
+        t_dec = t[self.decimate - 1:used:self.decimate]
+        sensors = self.gain @ v_dec
+
+        if self.sink is not None:
+            self.sink.update(t_dec, sensors, None)
+        else:
+            self._chunks.append(sensors)
+            self._t.append(t_dec)
+
+    def finalize(self):
+        if self.sink is not None and hasattr(self.sink, 'finalize'):
+            self.sink.finalize()
+
+    @property
+    def signals(self):
+        """传感器信号 (n_channels, T)。"""
+        if not self._chunks:
+            return np.zeros((self.n_channels, 0))
+        return np.concatenate(self._chunks, axis=1)
+
+    @property
+    def t(self):
+        """采样时间 (ms)。"""
+        if not self._t:
+            return np.zeros(0)
+        return np.concatenate(self._t)
+
+
+class FCObserver:
+    """
+    流式 Pearson 功能连接：逐块累加一阶、二阶矩，不保存信号。
+
+    累加前减去第一块的均值，避免长时间累加时的数值抵消。
+
+    Parameters
+    ----------
+    discard : float
+        丢弃 t <= discard (ms) 的采样（暂态）
+    """
+
+    def __init__(self, discard=0.0):
+        self.discard = discard
+        self.n = 0
+        self._shift = None
+        self._sum = None
+        self._cross = None
+
+    def update(self, t, v, ys=None):
+        v = v[:, t > self.discard]
+        if v.shape[1] == 0:
+            return
+        if self._shift is None:
+            self._shift = v.mean(axis=1, keepdims=True)
+            self._sum = np.zeros(v.shape[0])
+            self._cross = np.zeros((v.shape[0], v.shape[0]))
+        x = v - self._shift
+        self._sum += x.sum(axis=1)
+        self._cross += x @ x.T
+        self.n += x.shape[1]
+
+    @property
+    def fc(self):
+        """FC 矩阵 (N, N)。"""
+        if self.n == 0:
+            raise ValueError(f"FCObserver 没有收到 t > discard ({self.discard} ms) 的采样")
+        mean = self._sum / self.n
+        cov = self._cross / self.n - np.outer(mean, mean)
+        std = np.sqrt(np.diag(cov))
+        return cov / np.outer(std, std)
+
+
+class PSDObserver:
+    """
+    流式 Welch 功率谱。
+
+    段长 nperseg、重叠一半；块之间保留不足一段的尾部，因此跨块的段也被计入，
+    结果与 scipy.signal.welch 对整段（丢弃暂态后）信号的结果相同。
+
+    Parameters
+    ----------
+    dt_in : float
+        输入采样间隔 (ms)
+    nperseg : int
+        Welch 段长
+    discard : float
+        丢弃 t <= discard (ms) 的采样
+    """
+
+    def __init__(self, dt_in, nperseg=4096, discard=0.0):
+        self.fs = 1000.0 / dt_in
+        self.nperseg = nperseg
+        self.step = nperseg - nperseg // 2
+        self.discard = discard
+        self.n_segments = 0
+        self.freqs = None
+        self._carry = None
+        self._sum = None
+
+    def update(self, t, v, ys=None):
+        v = v[:, t > self.discard]
+        buf = v if self._carry is None else np.concatenate([self._carry, v], axis=1)
+        if buf.shape[1] < self.nperseg:
+            self._carry = buf
+            return
+        n_seg = (buf.shape[1] - self.nperseg) // self.step + 1
+        used = self.nperseg + (n_seg - 1) * self.step
+        freqs, psd = welch(buf[:, :used], fs=self.fs, nperseg=self.nperseg, axis=-1)
+        if self._sum is None:
+            self.freqs = freqs
+            self._sum = np.zeros_like(psd)
+        self._sum += psd * n_seg
+        self.n_segments += n_seg
+        self._carry = buf[:, n_seg * self.step:]
+
+    @property
+    def psd(self):
+        """功率谱 (N, F)，频率见 .freqs。"""
+        if self.n_segments == 0:
+            raise ValueError(f"PSDObserver 没有收到完整的 Welch 段（t > discard 的采样少于 "
+                             f"nperseg={self.nperseg}）")
+        return self._sum / self.n_segments
+
+
+class EventObserver:
+    """
+    流式阈值事件检测：记录每个节点 v_pyr 向上越过阈值的时刻。
+
+    Parameters
+    ----------
+    threshold : float or ndarray, shape (N,)
+        阈值 (mV)
+    refractory : float
+        同一节点两次事件的最小间隔 (ms)
+    discard : float
+        忽略 t <= discard (ms) 的事件
+    """
+
+    def __init__(self, threshold, refractory=20.0, discard=0.0):
+        self.threshold = threshold
+        self.refractory = refractory
+        self.discard = discard
+        self._span = None
+        self._prev = None
+        self._last = None
+        self._times = []
+        self._nodes = []
+
+    def update(self, t, v, ys=None):
+        thr = np.reshape(np.asarray(self.threshold, dtype=np.float64), (-1, 1))
+        above = v > thr
+        if self._prev is None:
+            self._prev = above[:, 0].copy()
+            self._last = np.full(v.shape[0], -np.inf)
+        rising = above & ~np.concatenate([self._prev[:, None], above[:, :-1]], axis=1)
+        self._prev = above[:, -1].copy()
+        keep = t > self.discard
+        rising &= keep[None, :]
+        if keep.any():
+            t_keep = t[keep]
+            start = t_keep[0] if self._span is None else self._span[0]
+            self._span = (start, t_keep[-1])
+
+        nodes, idx = np.nonzero(rising)
+        for node, time in zip(nodes, t[idx]):
+            if time - self._last[node] >= self.refractory:
+                self._times.append(time)
+                self._nodes.append(node)
+                self._last[node] = time
+
+    @property
+    def times(self):
+        """事件时刻 (ms)。"""
+        return np.asarray(self._times, dtype=np.float64)
+
+    @property
+    def nodes(self):
+        """事件所在节点。"""
+        return np.asarray(self._nodes, dtype=np.int64)
+
+    def rate(self, N):
+        """每个节点的事件率 (Hz)。"""
+        counts = np.bincount(self.nodes, minlength=N).astype(np.float64)
+        if self._span is None or self._span[1] <= self._span[0]:
+            return counts * 0.0
+        return counts / ((self._span[1] - self._span[0]) / 1000.0)
+
+
+def run_sensors(model, duration, leadfield, decimate=10, montage=None, sink=None,
+                chunk_duration=1000.0, seed=None):
+    """
+    运行模型并只输出传感器空间信号。
+
+    Parameters
+    ----------
+    model : WendlingModel
+        模型（只读取 model.params）
+    duration : float
+        时长 (ms)
+    leadfield : ndarray, shape (n_sensors, N)
+        导联场矩阵
+    decimate : int
+        降采样倍数（dt=0.1 ms 时 decimate=10 对应 1 kHz）
+    montage : ndarray, optional
+        导联矩阵
+    sink : observer, optional
+        下游观察器
+    chunk_duration : float
+        内核每块时长 (ms)
+    seed : int, optional
+        噪声随机种子
+
+    Returns
+    -------
+    observer : SensorObserver
+        .signals, .t
+    """
+    sim = ChunkedSimulation(model.params, seed=seed)
+    observer = SensorObserver(leadfield, decimate=decimate, montage=montage, sink=sink)
+    sim.run(duration, observers=[observer], chunk_duration=chunk_duration)
+    return observer
+
+
+def run_bold(model, duration, TR=720.0, dt_bold=10.0, input_scale=0.05,
+             chunk_duration=1000.0, seed=None):
+    """
+    运行模型并只输出 BOLD（不保存 PSP）。
+
+    Parameters
+    ----------
+    model : WendlingModel
+        模型（只读取 model.params）
+    duration : float
+        时长 (ms)，BOLD FC 通常需要数分钟
+    TR : float
+        BOLD 采样间隔 (ms)
+    dt_bold : float
+        血流动力学积分步长 (ms)
+    input_scale : float
+        发放率到驱动信号的缩放
+    chunk_duration : float
+        内核每块时长 (ms)
+    seed : int, optional
+        噪声随机种子
+
+    Returns
+    -------
+    observer : BOLDObserver
+        .bold, .t_bold, .fc()
+    """
+    params = model.params
+    sim = ChunkedSimulation(params, seed=seed)
+    kp = sim.kp
+    observer = BOLDObserver(sim.N, sim.dt, TR=TR, dt_bold=dt_bold,
+                            input_scale=input_scale,
+                            sigmoid=(kp['e0'], kp['v0'], kp['r']))
+    sim.run(duration, observers=[observer], chunk_duration=chunk_duration)
+    return observer
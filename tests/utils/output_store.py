@@ -0,0 +1,261 @@
+"""
+磁盘输出存储
+
+把分块内核的输出直接写入压缩、分块（时间 × 节点）的 HDF5 数组，并提供按节点和
+时间窗口切片的惰性读取接口。模拟时长只受磁盘空间限制，而不是内存。
+"""
+
+import numpy as np
+
+from .wendling_kernel import ChunkedSimulation, N_STATE_VARS
+
+
+class HDF5Writer:
+    """
+    HDF5 流式写入观察器（配合 ChunkedSimulation.run 使用）。
+
+    'v_pyr' 与 'y' 以 float32 存储（内核输出为 float64，写入时舍入到约 7 位有效数字，
+    文件大小减半）；时间 't' 保持 float64。
+
+    Parameters
+    ----------
+    path : str
+        HDF5 文件路径
+    N : int
+        节点数
+    dt_out : float
+        输出采样间隔 (ms)
+    record_states : bool
+        是否同时写入全部 10 个状态变量（数据集 'y'）
+    node_chunk : int
+        每个 HDF5 块的节点数
+    time_chunk : int
+        每个 HDF5 块的时间点数
+    compression : str
+        压缩方式（'gzip'、'lzf' 或 None）
+    attrs : dict, optional
+        写入文件属性的元数据
+    """
+
+    def __init__(self, path, N, dt_out, record_states=False, node_chunk=64,
+                 time_chunk=4096, compression='gzip', attrs=None):
+        import h5py
+
+        self.path = path
+        self.N = N
+        self.record_states = record_states
+        self.n_written = 0
+
+        self.file = h5py.File(path, 'w')
+        node_chunk = min(node_chunk, N)
+
+        self.v_pyr = self.file.create_dataset(
+            'v_pyr', shape=(N, 0), maxshape=(N, None), dtype='f4',
+            chunks=(node_chunk, time_chunk), compression=compression)
+        self.t = self.file.create_dataset(
+            't', shape=(0,), maxshape=(None,), dtype='f8',
+            chunks=(time_chunk,), compression=compression)
+        self.y = None
+        if record_states:
+            self.y = self.file.create_dataset(
+                'y', shape=(N_STATE_VARS, N, 0), maxshape=(N_STATE_VARS, N, None),
+                dtype='f4', chunks=(1, node_chunk, time_chunk), compression=compression)
+
+        self.file.attrs['dt'] = dt_out
+        self.file.attrs['N'] = N
+        for key, val in (attrs or {}).items():
+            self.file.attrs[key] = val
+
+    def update(self, t, v, ys=None):
+        n = len(t)
+        start, stop = self.n_written, self.n_written + n
+
+        self.v_pyr.resize(stop, axis=1)
+        self.v_pyr[:, start:stop] = v
+        self.t.resize(stop, axis=0)
+        self.t[start:stop] = t
+        if self.y is not None and ys is not None:
+            self.y.resize(stop, axis=2)
+            self.y[:, :, start:stop] = ys
+
+        self.n_written = stop
+
+    def finalize(self):
+        if self.file:
+            self.file.attrs['n_samples'] = self.n_written
+            self.file.close()
+            self.file = None
+
+    def close(self):
+        """关闭文件但不标记完成（运行中断时使用；没有 'n_samples' 属性）。"""
+        if self.file:
+            self.file.close()
+            self.file = None
+
+
+class OutputReader:
+    """
+    HDF5 输出的惰性读取器（只读取请求的节点和时间窗口）。
+
+    Parameters
+    ----------
+    path : str
+        HDF5 文件路径
+    """
+
+    def __init__(self, path):
+        import h5py
+
+        self.path = path
+        self.file = h5py.File(path, 'r')
+        self.dt = float(self.file.attrs['dt'])
+        self.N = int(self.file.attrs['N'])
+
+    @property
+    def n_samples(self):
+        return self.file['v_pyr'].shape[1]
+
+    @property
+    def duration(self):
+        return self.n_samples * self.dt
+
+    @property
+    def has_states(self):
+        return 'y' in self.file
+
+    def _time_slice(self, t_start=None, t_stop=None):
+        t0 = self.file['t'][0] if self.n_samples else 0.0
+        start = 0 if t_start is None else max(0, int(np.ceil((t_start - t0) / self.dt - 1e-9)))
+        stop = self.n_samples if t_stop is None else \
+            min(self.n_samples, int(np.floor((t_stop - t0) / self.dt + 1e-9)) + 1)
+        return slice(start, max(start, stop))
+
+    @staticmethod
+    def _node_index(nodes):
+        """
+        (读取用的索引, 还原为请求顺序的索引)。
+
+        h5py 的花式索引要求严格递增，因此读取去重排序后的节点，再按 inverse 还原
+        请求的顺序（与 numpy 一样允许重复）；不需要还原时 inverse 为 None。
+        """
+        if nodes is None:
+            return slice(None), None
+        if isinstance(nodes, (int, np.integer)):
+            return [int(nodes)], None
+        unique, inverse = np.unique(np.asarray(nodes, dtype=np.int64).ravel(),
+                                    return_inverse=True)
+        return unique.tolist(), inverse
+
+    @staticmethod
+    def _reorder(data, inverse):
+        return data if inverse is None else data[inverse]
+
+    def get_time(self, t_start=None, t_stop=None):
+        """返回时间窗口内的时间点 (ms)。"""
+        return self.file['t'][self._time_slice(t_start, t_stop)]
+
+    def get_output_signal(self, nodes=None, t_start=None, t_stop=None):
+        """
+        读取 v_pyr（与 model.get_output_signal 对应）。
+
+        Parameters
+        ----------
+        nodes : int or sequence, optional
+            节点索引（默认全部）
+        t_start, t_stop : float, optional
+            时间窗口 (ms)
+
+        Returns
+        -------
+        v : ndarray, shape (n_nodes, T)
+        """
+        tsl = self._time_slice(t_start, t_stop)
+        idx, inverse = self._node_index(nodes)
+        return self._reorder(self.file['v_pyr'][idx, tsl].astype(np.float64), inverse)
+
+    def get_state(self, k, nodes=None, t_start=None, t_stop=None):
+        """
+        读取状态变量 y_k（需 record_states=True）。
+
+        Returns
+        -------
+        y : ndarray, shape (n_nodes, T)
+        """
+        if not self.has_states:
+            raise KeyError("文件中没有状态变量（运行时 record_states=False）")
+        tsl = self._time_slice(t_start, t_stop)
+        idx, inverse = self._node_index(nodes)
+        return self._reorder(self.file['y'][k, idx, tsl].astype(np.float64), inverse)
+
+    def iter_chunks(self, chunk_duration=1000.0, nodes=None):
+        """
+        按时间块迭代 (t, v)，用于在不载入全部数据的情况下做分析。
+        """
+        n_chunk = max(1, int(round(chunk_duration / self.dt)))
+        idx, inverse = self._node_index(nodes)
+        for start in range(0, self.n_samples, n_chunk):
+            stop = min(start + n_chunk, self.n_samples)
+            yield (self.file['t'][start:stop],
+                   self._reorder(self.file['v_pyr'][idx, start:stop].astype(np.float64),
+                                 inverse))
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def run_to_disk(model, path, duration=None, chunk_duration=1000.0, decimate=1,
+                record_states=False, seed=None, **writer_kwargs):
+    """
+    用分块内核运行模型参数，并把输出流式写入 HDF5。
+
+    运行结束后，读取器挂在 model.output_store 上：
+    model.output_store.get_output_signal(nodes=[0, 5], t_start=2000, t_stop=3000)
+
+    信号以 float32 写入（见 HDF5Writer），读回的值与内核的 float64 输出相差约 1e-7 相对误差。
+    运行中断时文件被关闭但不标记完成（没有 'n_samples' 属性）。
+
+    Parameters
+    ----------
+    model : WendlingModel
+        模型（只读取 model.params）
+    path : str
+        HDF5 文件路径
+    duration : float, optional
+        时长 (ms)（默认 model.params['duration']）
+    chunk_duration : float
+        每块时长 (ms)
+    decimate : int
+        输出降采样倍数
+    record_states : bool
+        是否写入全部状态变量
+    seed : int, optional
+        噪声随机种子（默认 model.params['seed']）
+
+    Returns
+    -------
+    reader : OutputReader
+        惰性读取器
+    """
+    params = model.params
+    if duration is None:
+        duration = params['duration']
+
+    sim = ChunkedSimulation(params, seed=seed)
+    writer = HDF5Writer(path, sim.N, sim.dt * decimate, record_states=record_states,
+                        **writer_kwargs)
+    try:
+        sim.run(duration, observers=[writer], chunk_duration=chunk_duration,
+                decimate=decimate, record_states=record_states)
+    finally:
+        writer.close()
+
+    model.output_store = OutputReader(path)
+    return model.output_store
@@ -0,0 +1,209 @@
+"""
+模拟与分析重叠的生产者 / 消费者流水线
+
+积分线程（nogil 的 JIT 内核）把输出块放入有界队列，分析消费者（FC、功率谱、
+事件检测、写盘等观察器）各在一个线程中处理之前的块。内核和 numpy / scipy 的
+大部分计算都释放 GIL，因此总墙钟时间接近 max(模拟, 分析) 而不是两者之和；
+队列满时积分线程等待（背压），内存上限约为 (maxsize + 2) 个块。
+
+消费者即观察器：实现 update(t, v, ys)，可选 finalize() 与 close()（运行中断时代替
+finalize 调用，释放文件等资源）；同一块的数组被所有消费者共享，消费者不能原地修改。
+"""
+
+import queue
+import threading
+import time
+
+from .observers import EventObserver, FCObserver, PSDObserver
+from .output_store import HDF5Writer
+from .wendling_kernel import ChunkedSimulation, _seed_kernel
+
+# 队列结束标记
+_DONE = object()
+
+
+def _put(q, item, stop):
+    """放入队列；队列满时等待，直到有空位或 stop 被设置。"""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def run_pipeline(sim, duration, consumers, chunk_duration=1000.0, decimate=1,
+                 record_states=False, maxsize=4):
+    """
+    在后台线程中推进模拟，同时由消费者线程处理已完成的块。
+
+    积分线程使用 nogil 的 JIT 内核（sim.use_nogil_kernel()），并在该线程内用 sim.seed
+    重新设定随机数种子：对新建的 sim，结果与 sim.run(duration, consumers, ...)
+    逐位一致。
+
+    Parameters
+    ----------
+    sim : ChunkedSimulation
+        模拟（从当前状态继续推进）
+    duration : float
+        时长 (ms)
+    consumers : sequence
+        观察器列表
+    chunk_duration : float
+        每块时长 (ms)
+    decimate : int
+        输出降采样倍数
+    record_states : bool
+        是否把全部状态交给消费者
+    maxsize : int
+        每个消费者队列中最多等待的块数
+
+    Returns
+    -------
+    consumers : sequence
+        传入的消费者
+    timing : dict
+        'wall_s'（总墙钟时间）、'sim_s'（积分线程忙碌时间）、
+        'consumer_s'（每个消费者的忙碌时间）、'producer_wait_s'（因背压等待的时间）
+    """
+    sim.use_nogil_kernel()
+    queues = [queue.Queue(maxsize) for _ in consumers]
+    stop = threading.Event()
+    errors = []
+    timing = {'sim_s': 0.0, 'producer_wait_s': 0.0, 'consumer_s': [0.0] * len(consumers)}
+
+    remaining = int(round(duration / sim.dt)) // decimate
+    chunk_out = max(1, int(round(chunk_duration / sim.dt)) // decimate)
+
+    def produce():
+        nonlocal remaining
+        try:
+            if sim.seed is not None:
+                _seed_kernel(int(sim.seed))
+            while remaining > 0 and not stop.is_set():
+                n_out = min(chunk_out, remaining)
+                t0 = time.perf_counter()
+                item = sim._advance(n_out, decimate, record_states)
+                t1 = time.perf_counter()
+                for q in queues:
+                    _put(q, item, stop)
+                timing['sim_s'] += t1 - t0
+                timing['producer_wait_s'] += time.perf_counter() - t1
+                remaining -= n_out
+        except BaseException as exc:
+            errors.append(exc)
+            stop.set()
+        finally:
+            for q in queues:
+                _put(q, _DONE, stop)
+
+    def consume(k, obs, q):
+        finished = False
+        try:
+            while True:
+                try:
+                    item = q.get(timeout=0.1)
+                except queue.Empty:
+                    if stop.is_set():
+                        return
+                    continue
+                if item is _DONE:
+                    break
+                t0 = time.perf_counter()
+                obs.update(*item)
+                timing['consumer_s'][k] += time.perf_counter() - t0
+            if hasattr(obs, 'finalize') and not stop.is_set():
+                t0 = time.perf_counter()
+                obs.finalize()
+                timing['consumer_s'][k] += time.perf_counter() - t0
+            finished = not stop.is_set()
+        except BaseException as exc:
+            errors.append(exc)
+            stop.set()
+        finally:
+            # 中断时释放资源（例如 HDF5Writer 的文件句柄）
+            if not finished and hasattr(obs, 'close'):
+                obs.close()
+
+    wall0 = time.perf_counter()
+    threads = [threading.Thread(target=produce, name='wendling-sim', daemon=True)]
+    threads += [threading.Thread(target=consume, args=(k, obs, q), daemon=True,
+                                 name=f'wendling-consumer-{k}')
+                for k, (obs, q) in enumerate(zip(consumers, queues))]
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+    timing['wall_s'] = time.perf_counter() - wall0
+
+    if errors:
+        raise errors[0]
+    sim._finish_run()
+    return consumers, timing
+
+
+def analyze_model(model, duration, discard=0.0, fc=True, psd=True, event_threshold=None,
+                  path=None, decimate=1, nperseg=4096, chunk_duration=1000.0, seed=None,
+                  maxsize=4):
+    """
+    运行模型并同时计算 FC、功率谱、事件和（可选）写盘，不保存整段信号。
+
+    Parameters
+    ----------
+    model : object
+        模型（读取 model.params）
+    duration : float
+        时长 (ms)
+    discard : float
+        分析时丢弃的暂态 (ms)；写盘保存全部采样
+    fc, psd : bool
+        是否计算 FC / 功率谱
+    event_threshold : float or ndarray, optional
+        事件检测阈值 (mV)；None 表示不检测
+    path : str, optional
+        HDF5 输出路径（见 output_store.HDF5Writer）
+    decimate : int
+        输出降采样倍数
+    nperseg : int
+        Welch 段长
+    chunk_duration : float
+        每块时长 (ms)
+    seed : int, optional
+        噪声随机种子（默认 model.params['seed']）
+    maxsize : int
+        每个消费者队列中最多等待的块数
+
+    Returns
+    -------
+    results : dict
+        'fc' (N, N)、'freqs'、'psd' (N, F)、'event_times'、'event_nodes'、'event_rate'
+        （按所选分析给出），以及 'timing'（见 run_pipeline）
+    """
+    sim = ChunkedSimulation(model.params, seed=seed)
+    dt_out = sim.dt * decimate
+    consumers = {}
+    if fc:
+        consumers['fc'] = FCObserver(discard)
+    if psd:
+        consumers['psd'] = PSDObserver(dt_out, nperseg=nperseg, discard=discard)
+    if event_threshold is not None:
+        consumers['events'] = EventObserver(event_threshold, discard=discard)
+    if path is not None:
+        consumers['writer'] = HDF5Writer(path, sim.N, dt_out)
+
+    _, timing = run_pipeline(sim, duration, list(consumers.values()),
+                             chunk_duration=chunk_duration, decimate=decimate, maxsize=maxsize)
+
+    results = {'timing': timing}
+    if fc:
+        results['fc'] = consumers['fc'].fc
+    if psd:
+        results['freqs'] = consumers['psd'].freqs
+        results['psd'] = consumers['psd'].psd
+    if event_threshold is not None:
+        events = consumers['events']
+        results['event_times'] = events.times
+        results['event_nodes'] = events.nodes
+        results['event_rate'] = events.rate(sim.N)
+    return results
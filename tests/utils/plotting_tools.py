@@ -155,3 +155,42 @@ def plot_sc_fc_comparison(sc_matrix, fc_matrix, ax=None):
             bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.5))
     
     return ax
+
+
+def plot_bifurcation_map(result, ax=None, title='Bifurcation Map'):
+    """
+    绘制二维参数平面的分岔图（two_parameter_map 的返回值）。
+    
+    Parameters
+    ----------
+    result : dict
+        two_parameter_map 的返回值
+    ax : matplotlib.axes.Axes, optional
+        绘图轴
+    title : str
+        标题
+    """
+    if ax is None:
+        fig, ax = plt.subplots(figsize=(8, 6))
+    
+    x, y = result['x'], result['y']
+    extent = (x[0], x[-1], y[0], y[-1])
+    
+    # 区域：0 = 单一稳定平衡，1 = 振荡，2 = 多稳定
+    im = ax.imshow(result['regime'], origin='lower', extent=extent, aspect='auto',
+                   cmap='Pastel1', vmin=0, vmax=8, interpolation='nearest')
+    
+    # Hopf 曲线（复特征值对实部的 0 等值线）
+    hopf = np.where(np.isfinite(result['hopf']), result['hopf'], np.nan)
+    if np.nanmin(hopf) < 0 < np.nanmax(hopf):
+        ax.contour(x, y, hopf, levels=[0], colors='k', linewidths=1.5)
+    # 鞍结曲线（不动点个数改变）
+    if result['n_fixed'].min() != result['n_fixed'].max():
+        ax.contour(x, y, result['n_fixed'], levels=[1.5], colors='r',
+                   linewidths=1.5, linestyles='--')
+    
+    ax.set_xlabel(result['name_x'], fontsize=10)
+    ax.set_ylabel(result['name_y'], fontsize=10)
+    ax.set_title(title, fontsize=12, fontweight='bold')
+    
+    return ax
@@ -0,0 +1,137 @@
+"""
+运行阶段的计时与内存统计
+
+RunStats 按阶段（参数预处理、numba 编译 / 缓存读取、积分、观察器、输出整理）
+记录墙钟时间与分配的字节数（tracemalloc），并记录内核步数与 JIT 缓存命中情况。
+结果可以写成 JSON lines，一次扫描的所有运行追加到同一个文件中汇总。
+"""
+
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+def jit_cache_info(dispatcher):
+    """
+    numba 函数当前的编译状态。
+
+    Returns
+    -------
+    info : dict
+        'signatures'（已加载的签名数）、'cache_hits'、'cache_misses'（磁盘缓存计数）
+    """
+    stats = dispatcher.stats
+    return {
+        'signatures': len(dispatcher.signatures),
+        'cache_hits': sum(stats.cache_hits.values()),
+        'cache_misses': sum(stats.cache_misses.values()),
+    }
+
+
+class RunStats:
+    """
+    分阶段的运行统计。
+
+    Parameters
+    ----------
+    trace_memory : bool
+        是否用 tracemalloc 统计每个阶段分配的字节数（有少量开销）
+    """
+
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.phases = {}
+        self.counters = {}
+        self._started_tracing = False
+
+    @contextmanager
+    def phase(self, name):
+        """
+        计时一个阶段；同名阶段多次进入时累加。
+
+        记录 'wall_s'、'calls'，以及（trace_memory 时）'alloc_bytes'（阶段结束时仍持有的
+        新增内存）与 'peak_bytes'（阶段内相对起点的峰值）。
+        """
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        if self.trace_memory:
+            mem0 = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            entry = self.phases.setdefault(name, {'wall_s': 0.0, 'calls': 0})
+            entry['wall_s'] += time.perf_counter() - t0
+            entry['calls'] += 1
+            if self.trace_memory:
+                current, peak = tracemalloc.get_traced_memory()
+                entry['alloc_bytes'] = entry.get('alloc_bytes', 0) + current - mem0
+                entry['peak_bytes'] = max(entry.get('peak_bytes', 0), peak - mem0)
+
+    def add(self, **counters):
+        """累加计数器（例如 steps=..., node_steps=...）。"""
+        for key, val in counters.items():
+            self.counters[key] = self.counters.get(key, 0) + val
+
+    def close(self):
+        """停止由本对象启动的 tracemalloc。"""
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def to_dict(self):
+        """
+        汇总为 dict：'phases'、'counters'、'total_s'，有积分阶段时另含
+        'steps_per_s' 与 'node_steps_per_s'。
+        """
+        out = {
+            'phases': {name: dict(entry) for name, entry in self.phases.items()},
+            'counters': dict(self.counters),
+            'total_s': sum(entry['wall_s'] for entry in self.phases.values()),
+        }
+        integrate = self.phases.get('integrate', {}).get('wall_s', 0.0)
+        if integrate > 0:
+            out['steps_per_s'] = self.counters.get('steps', 0) / integrate
+            out['node_steps_per_s'] = self.counters.get('node_steps', 0) / integrate
+        return out
+
+
+def append_jsonl(path, record):
+    """把一条记录追加到 JSON lines 文件。"""
+    with open(path, 'a') as f:
+        f.write(json.dumps(record, default=float) + '\n')
+
+
+def read_jsonl(path):
+    """读取 JSON lines 文件（例如一次扫描的全部 last_run_stats）。"""
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def summarize_phases(records):
+    """
+    汇总多次运行的阶段耗时。
+
+    Parameters
+    ----------
+    records : sequence of dict
+        last_run_stats（或 read_jsonl 的结果）
+
+    Returns
+    -------
+    summary : dict
+        阶段名 -> {'wall_s': 总耗时, 'fraction': 占总耗时的比例, 'runs': 出现次数}
+    """
+    summary = {}
+    for rec in records:
+        for name, entry in rec['phases'].items():
+            s = summary.setdefault(name, {'wall_s': 0.0, 'runs': 0})
+            s['wall_s'] += entry['wall_s']
+            s['runs'] += 1
+    total = sum(s['wall_s'] for s in summary.values()) or 1.0
+    for s in summary.values():
+        s['fraction'] = s['wall_s'] / total
+    return summary
@@ -0,0 +1,221 @@
+"""
+自适应活动类型图谱
+
+在 (B, G) 或 (B, G, p_sigma) 空间上先用粗网格采样，用六类分类器标注每个样本，
+然后只细分角点标签不一致的单元（即类型边界所在的单元），递归直到最大深度。
+每一层的新样本并行模拟。结果保存为 RegimeAtlas（npz + json），可以查询或栅格化绘图。
+"""
+
+import os
+import json
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import numpy as np
+
+from .features import label_node, type_centroids
+
+
+class RegimeAtlas:
+    """
+    活动类型图谱（自适应网格的全部样本）。
+
+    Parameters
+    ----------
+    names : sequence of str
+        坐标轴参数名，例如 ('B', 'G')
+    bounds : sequence of (float, float)
+        每个坐标轴的范围
+    base_params : dict, optional
+        其余固定参数
+    """
+
+    def __init__(self, names, bounds, base_params=None):
+        self.names = tuple(names)
+        self.bounds = [tuple(map(float, b)) for b in bounds]
+        self.base_params = dict(base_params or {})
+        self.points = np.zeros((0, len(self.names)))
+        self.labels = []
+        self.features = []
+
+    def __len__(self):
+        return len(self.labels)
+
+    def add(self, points, labels, features):
+        self.points = np.vstack([self.points, np.asarray(points, dtype=np.float64)])
+        self.labels.extend(labels)
+        self.features.extend(features)
+
+    def label_at(self, point):
+        """
+        查询任意点的类型（最近样本，坐标按范围归一化）。
+
+        Parameters
+        ----------
+        point : sequence of float
+            坐标（与 names 对应）
+
+        Returns
+        -------
+        label : str
+        """
+        span = np.array([hi - lo for lo, hi in self.bounds])
+        dist = np.sum(((self.points - np.asarray(point, dtype=np.float64)) / span) ** 2, axis=1)
+        return self.labels[int(np.argmin(dist))]
+
+    def to_grid(self, resolution=100, fixed=None):
+        """
+        把图谱栅格化为二维标签图（用于绘图）。
+
+        Parameters
+        ----------
+        resolution : int
+            每个坐标轴的栅格数
+        fixed : dict, optional
+            三维图谱时第三个坐标的取值，例如 {'p_sigma': 30}
+
+        Returns
+        -------
+        x, y : ndarray
+            前两个坐标轴的栅格
+        labels : ndarray of str, shape (len(y), len(x))
+        """
+        x = np.linspace(*self.bounds[0], resolution)
+        y = np.linspace(*self.bounds[1], resolution)
+        extra = [fixed[name] for name in self.names[2:]] if len(self.names) > 2 else []
+        labels = np.array([[self.label_at([xi, yi] + extra) for xi in x] for yi in y])
+        return x, y, labels
+
+    def save(self, path):
+        """保存为 path.npz（样本坐标与特征）和 path.json（元数据与标签）。"""
+        keys = sorted(self.features[0].keys()) if self.features else []
+        feat = np.array([[f[key] for key in keys] for f in self.features], dtype=np.float64)
+        np.savez_compressed(path + '.npz', points=self.points, features=feat)
+        meta = {
+            'names': list(self.names),
+            'bounds': self.bounds,
+            'base_params': {k: v for k, v in self.base_params.items()
+                            if isinstance(v, (int, float, str))},
+            'labels': self.labels,
+            'feature_keys': keys,
+        }
+        with open(path + '.json', 'w') as f:
+            json.dump(meta, f, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        with open(path + '.json') as f:
+            meta = json.load(f)
+        atlas = cls(meta['names'], meta['bounds'], meta['base_params'])
+        data = np.load(path + '.npz')
+        features = [dict(zip(meta['feature_keys'], row)) for row in data['features']]
+        atlas.add(data['points'], meta['labels'], features)
+        return atlas
+
+
+def explore_regimes(axes, base_params=None, initial=5, max_depth=4, duration=10000.0,
+                    discard=2000.0, seed=0, n_jobs=None, path=None, verbose=True):
+    """
+    自适应细分的活动类型图谱。
+
+    Parameters
+    ----------
+    axes : dict
+        参数名 -> (min, max)，例如 {'B': (0, 60), 'G': (0, 40)}，
+        或再加 'p_sigma': (2, 30)
+    base_params : dict, optional
+        其余固定参数
+    initial : int
+        每个坐标轴的初始网格点数
+    max_depth : int
+        最大细分层数（每层把边长减半）
+    duration, discard : float
+        每个样本的记录时长与丢弃暂态 (ms)
+    seed : int
+        噪声随机种子（所有样本相同，边界不受噪声实现影响）
+    n_jobs : int, optional
+        并行进程数（默认 os.cpu_count()；1 表示串行）
+    path : str, optional
+        保存路径（不含扩展名）
+    verbose : bool
+        是否打印进度
+
+    Returns
+    -------
+    atlas : RegimeAtlas
+    """
+    names = list(axes.keys())
+    bounds = [axes[name] for name in names]
+    dim = len(names)
+    base_params = dict(base_params or {})
+    atlas = RegimeAtlas(names, bounds, base_params)
+
+    # 在整数格点上工作：最细层的格距为 1，避免浮点坐标的重复
+    fine = (initial - 1) * 2 ** max_depth
+    lo = np.array([b[0] for b in bounds], dtype=np.float64)
+    step = np.array([b[1] - b[0] for b in bounds], dtype=np.float64) / fine
+
+    labels = {}
+    n_jobs = n_jobs or os.cpu_count() or 1
+    centroids = type_centroids()
+
+    def evaluate(keys):
+        keys = [k for k in dict.fromkeys(keys) if k not in labels]
+        if not keys:
+            return
+        coords = [lo + np.array(k) * step for k in keys]
+        jobs = []
+        for c in coords:
+            p = dict(base_params)
+            p.update({name: float(val) for name, val in zip(names, c)})
+            jobs.append(p)
+
+        args = (jobs, repeat(duration), repeat(discard), repeat(seed), repeat(centroids))
+        if n_jobs == 1:
+            results = list(map(label_node, *args))
+        else:
+            with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+                results = list(pool.map(label_node, *args))
+
+        for key, (label, features) in zip(keys, results):
+            labels[key] = label
+        atlas.add(coords, [r[0] for r in results], [r[1] for r in results])
+
+    # 初始粗网格
+    h = 2 ** max_depth
+    axis_idx = [range(0, fine + 1, h)] * dim
+    evaluate(itertools.product(*axis_idx))
+    cells = [tuple(c) for c in itertools.product(*[range(0, fine, h)] * dim)]
+    corners = list(itertools.product((0, 1), repeat=dim))
+
+    for depth in range(max_depth):
+        # 角点标签不一致的单元需要细分
+        split = [c for c in cells
+                 if len({labels[tuple(ci + oi * h for ci, oi in zip(c, o))] for o in corners}) > 1]
+        if verbose:
+            print(f"  depth {depth}: {len(split)}/{len(cells)} cells on boundaries, "
+                  f"{len(atlas)} samples")
+        if not split:
+            break
+
+        half = h // 2
+        children = []
+        new_keys = []
+        for c in split:
+            for o in itertools.product((0, 1), repeat=dim):
+                child = tuple(ci + oi * half for ci, oi in zip(c, o))
+                children.append(child)
+                new_keys.extend(tuple(ci + oi * half for ci, oi in zip(child, q))
+                                for q in corners)
+        evaluate(new_keys)
+        cells, h = children, half
+
+    if verbose:
+        uniform = (fine + 1) ** dim
+        print(f"  {len(atlas)} samples ({len(atlas) / uniform:.1%} of a uniform "
+              f"{fine + 1}^{dim} grid)")
+
+    if path is not None:
+        atlas.save(path)
+    return atlas
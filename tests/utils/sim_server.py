@@ -0,0 +1,437 @@
+"""
+常驻模拟服务
+
+一个长期运行的本地进程：已编译的内核、已加载的连接组和热启动状态常驻内存，
+通过本地套接字（Unix 套接字，或 127.0.0.1 上的 TCP 端口）接受 JSON 任务，
+并以 JSON lines 流式返回结果。脚本和 notebook 不再为每次运行付出导入、JIT 和
+burn-in 的开销。
+
+协议：客户端发送一行 JSON 任务；服务端逐行返回记录，最后一行为
+{"done": true, ...}，出错时为 {"error": "..."}。
+
+任务（'op'）：
+    ping       服务状态（内核后端、常驻连接组、热启动状态数、已完成任务数）
+    load       常驻一个连接组：{'name', 'Cmat', 'Dmat'} 或 {'name', 'path'}（.npz）
+    simulate   单次模拟：可分块流式返回 v_pyr，结束时返回特征 / FC
+    sweep      参数网格（蛇形路径、逐点延拓）：每个点返回一条特征记录
+    shutdown   停止服务
+
+命令行（在 tests/ 目录下）：
+    python -m utils.sim_server                       # 默认 Unix 套接字
+    python -m utils.sim_server --port 8765           # 127.0.0.1:8765
+    python -m utils.sim_server --warm-dir results/warm_start
+"""
+
+import argparse
+import json
+import os
+import socket
+import socketserver
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from . import wendling_kernel
+from .features import classify_batch, extract_features_batch
+from .sweeps import order_grid_path
+from .warm_start import WarmStartStore
+from .wendling_kernel import ChunkedSimulation, load_default_params
+
+
+# 默认地址：支持 Unix 套接字时用临时目录下的套接字文件，否则用本机 TCP 端口
+DEFAULT_SOCKET = os.path.join(tempfile.gettempdir(), 'wendling_sim.sock')
+DEFAULT_PORT = 8765
+
+# 热启动命中时仍保留的短 burn-in (ms)
+WARM_DISCARD = 250.0
+
+
+def default_address():
+    """平台默认的服务地址：Unix 套接字路径，或 ('127.0.0.1', DEFAULT_PORT)。"""
+    if hasattr(socket, 'AF_UNIX'):
+        return DEFAULT_SOCKET
+    return ('127.0.0.1', DEFAULT_PORT)
+
+
+def _to_json(obj):
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"{type(obj).__name__} is not JSON serializable")
+
+
+def _encode(record):
+    return (json.dumps(record, default=_to_json) + '\n').encode()
+
+
+def _as_param(value):
+    """JSON 中的列表参数 -> ndarray（节点向量）。"""
+    return np.asarray(value, dtype=np.float64) if isinstance(value, list) else value
+
+
+def _features_record(v, fs, classify):
+    """v (N, T) 的特征；单节点时为标量，网络时为长度 N 的列表。"""
+    features = extract_features_batch(v, fs=fs)
+    if classify:
+        features['label'] = classify_batch(features)
+    if v.shape[0] == 1:
+        return {key: val[0].item() for key, val in features.items()}
+    return {key: val.tolist() for key, val in features.items()}
+
+
+class SimulationService:
+    """
+    任务处理（与传输层无关，可以直接在进程内调用）。
+
+    Parameters
+    ----------
+    warm_dir : str, optional
+        热启动状态库目录（见 warm_start.WarmStartStore）；None 时只在内存中保存
+    warm_up : bool
+        构造时是否运行一次短模拟，使内核在第一个任务之前完成编译或缓存读取
+    """
+
+    def __init__(self, warm_dir=None, warm_up=True):
+        self.connectomes = {}
+        self.warm_states = {}
+        self.store = WarmStartStore(warm_dir) if warm_dir is not None else None
+        self.started = time.time()
+        self.jobs_done = 0
+        # numba 的全局随机数发生器与内核状态不能被并发任务共享
+        self.lock = threading.Lock()
+        if warm_up:
+            ChunkedSimulation({'p_sigma': 30.0}, seed=0).advance(1.0)
+
+    def handle(self, job):
+        """
+        执行一个任务。
+
+        Parameters
+        ----------
+        job : dict
+            任务，'op' 为任务类型
+
+        Yields
+        ------
+        record : dict
+            结果记录；最后一条包含 'done': True
+        """
+        op = job.get('op')
+        handler = getattr(self, f'_op_{op}', None)
+        if handler is None:
+            raise ValueError(f"unknown op {op!r}")
+        if op == 'ping':
+            yield from handler(job)
+            return
+        with self.lock:
+            yield from handler(job)
+            self.jobs_done += 1
+
+    # ------------------------------------------------------------------
+    # 常驻资源
+
+    def _op_ping(self, job):
+        yield {
+            'done': True,
+            'backend': wendling_kernel.KERNEL_BACKEND,
+            'uptime_s': time.time() - self.started,
+            'jobs_done': self.jobs_done,
+            'connectomes': {name: int(c[0].shape[0]) for name, c in self.connectomes.items()},
+            'warm_states': len(self.warm_states),
+            'stored_states': len(self.store) if self.store is not None else 0,
+        }
+
+    def _op_load(self, job):
+        name = job['name']
+        if 'path' in job:
+            data = np.load(job['path'])
+            Cmat, Dmat = data['Cmat'], (data['Dmat'] if 'Dmat' in data else None)
+        else:
+            Cmat, Dmat = job['Cmat'], job.get('Dmat')
+        Cmat = np.atleast_2d(np.asarray(Cmat, dtype=np.float64))
+        if Dmat is not None:
+            Dmat = np.atleast_2d(np.asarray(Dmat, dtype=np.float64))
+        self.connectomes[name] = (Cmat, Dmat)
+        yield {'done': True, 'name': name, 'N': int(Cmat.shape[0])}
+
+    def _op_shutdown(self, job):
+        yield {'done': True, 'shutdown': True}
+
+    def _params(self, job, overrides=None):
+        """连接组 + 默认参数 + 任务中的参数覆盖。"""
+        Cmat, Dmat = None, None
+        if job.get('connectome') is not None:
+            Cmat, Dmat = self.connectomes[job['connectome']]
+        seed = job.get('seed')
+        params = load_default_params(Cmat, Dmat, seed=seed,
+                                     heterogeneity=job.get('heterogeneity', 0.0))
+        for key, val in dict(job.get('params', {}), **(overrides or {})).items():
+            params[key] = _as_param(val)
+        return params
+
+    def _warm_state(self, params, seed_family):
+        """内存中（精确键）或状态库中（相近参数）的热启动状态。"""
+        key = WarmStartStore.make_key(params, params['Cmat'], seed_family)
+        if key in self.warm_states:
+            return self.warm_states[key]
+        if self.store is not None:
+            state, _ = self.store.lookup(params, params['Cmat'], seed_family)
+            return state
+        return None
+
+    def _save_warm(self, params, seed_family, state, burn_in):
+        key = WarmStartStore.make_key(params, params['Cmat'], seed_family)
+        self.warm_states[key] = state
+        if self.store is not None:
+            self.store.save(params, params['Cmat'], state, seed_family, burn_in=burn_in)
+
+    # ------------------------------------------------------------------
+    # 模拟
+
+    def _op_simulate(self, job):
+        """
+        任务字段：params、connectome、seed、heterogeneity、duration (ms，默认 2000)、
+        discard (ms，默认 1000)、decimate（默认 10）、warm_start（默认 True）、
+        outputs（'v'、'features'、'fc' 的子集，默认 ['features']）、
+        chunk (ms，给出且 outputs 含 'v' 时分块流式返回 v_pyr)、classify。
+        """
+        t0 = time.perf_counter()
+        params = self._params(job)
+        seed = job.get('seed')
+        duration = float(job.get('duration', 2000.0))
+        discard = float(job.get('discard', 1000.0))
+        decimate = int(job.get('decimate', 10))
+        outputs = set(job.get('outputs', ['features']))
+
+        state = self._warm_state(params, seed) if job.get('warm_start', True) else None
+        sim = ChunkedSimulation(params, seed=seed, state=state)
+        burn_in = min(discard, WARM_DISCARD) if state is not None else discard
+        sim.advance(burn_in)
+        if job.get('warm_start', True) and state is None:
+            self._save_warm(params, seed, sim.state, burn_in)
+
+        chunk = float(job.get('chunk') or duration)
+        pieces = []
+        elapsed = 0.0
+        while elapsed < duration:
+            span = min(chunk, duration - elapsed)
+            t, v, _ = sim.advance(span, decimate=decimate)
+            elapsed += span
+            if v.shape[1] == 0:
+                break
+            pieces.append(v)
+            if 'v' in outputs and job.get('chunk'):
+                yield {'t0': float(t[0]) - burn_in, 'dt': sim.dt * decimate, 'v': v}
+
+        v = np.concatenate(pieces, axis=1)
+        fs = 1000.0 / (sim.dt * decimate)
+        result = {'done': True, 'N': sim.N, 'fs': fs, 'warm_start': state is not None,
+                  'burn_in': burn_in}
+        if 'v' in outputs and not job.get('chunk'):
+            result['v'] = v
+        if 'features' in outputs:
+            result['features'] = _features_record(v, fs, job.get('classify', False))
+        if 'fc' in outputs and sim.N > 1:
+            result['fc'] = np.corrcoef(v)
+        result['elapsed_s'] = time.perf_counter() - t0
+        yield result
+
+    def _op_sweep(self, job):
+        """
+        任务字段：grid（参数名 -> 取值列表），以及 simulate 的 params、connectome、seed、
+        duration、discard、decimate、classify。
+
+        网格按蛇形路径排列，每个点从上一个点的最终状态出发，只保留 WARM_DISCARD 的
+        burn-in；第一个点先查热启动状态。每个点返回一条
+        {'point': {...}, 'features': {...}} 记录。
+        """
+        t0 = time.perf_counter()
+        seed = job.get('seed')
+        duration = float(job.get('duration', 2000.0))
+        discard = float(job.get('discard', 1000.0))
+        decimate = int(job.get('decimate', 10))
+
+        state = None
+        path = order_grid_path(job['grid'])
+        for i, point in enumerate(path):
+            params = self._params(job, point)
+            if state is None:
+                state = self._warm_state(params, seed)
+            sim = ChunkedSimulation(params, seed=seed, state=state)
+            sim.advance(discard if state is None else min(discard, WARM_DISCARD))
+            _, v, _ = sim.advance(duration, decimate=decimate)
+            state = sim.state
+            yield {'index': i, 'point': point,
+                   'features': _features_record(v, 1000.0 / (sim.dt * decimate),
+                                                job.get('classify', False))}
+        yield {'done': True, 'points': len(path), 'elapsed_s': time.perf_counter() - t0}
+
+
+class _JobHandler(socketserver.StreamRequestHandler):
+    """每个连接处理一行 JSON 任务，并逐行写回结果。"""
+
+    def handle(self):
+        line = self.rfile.readline()
+        if not line.strip():
+            return
+        job = None
+        try:
+            job = json.loads(line)
+            for record in self.server.service.handle(job):
+                self.wfile.write(_encode(record))
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            return
+        except Exception as exc:
+            self.wfile.write(_encode({'error': f"{type(exc).__name__}: {exc}"}))
+        if job is not None and job.get('op') == 'shutdown':
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+
+
+class _TCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+if hasattr(socketserver, 'UnixStreamServer'):
+    class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+
+def make_server(address=None, service=None):
+    """
+    创建服务（尚未开始监听循环）。
+
+    Parameters
+    ----------
+    address : str or (host, port), optional
+        Unix 套接字路径或 TCP 地址（默认 default_address()）；
+        TCP 只应绑定到本机地址，服务没有鉴权
+    service : SimulationService, optional
+        任务处理对象（默认新建）
+
+    Returns
+    -------
+    server : socketserver.BaseServer
+        调用 server.serve_forever() 开始服务
+    """
+    if address is None:
+        address = default_address()
+    if isinstance(address, str):
+        if os.path.exists(address):
+            os.unlink(address)
+        server = _UnixServer(address, _JobHandler)
+    else:
+        server = _TCPServer(tuple(address), _JobHandler)
+    server.service = service if service is not None else SimulationService()
+    return server
+
+
+class SimulationClient:
+    """
+    常驻模拟服务的客户端。
+
+    Parameters
+    ----------
+    address : str or (host, port), optional
+        服务地址（默认 default_address()）
+    timeout : float, optional
+        套接字超时 (s)
+    """
+
+    def __init__(self, address=None, timeout=None):
+        self.address = default_address() if address is None else address
+        self.timeout = timeout
+
+    def _connect(self):
+        if isinstance(self.address, str):
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.address if isinstance(self.address, str) else tuple(self.address))
+        return sock
+
+    def stream(self, op, **job):
+        """
+        发送任务并逐条产出结果记录（包括最后的 'done' 记录）。
+
+        服务端返回错误记录时抛出 RuntimeError。
+        """
+        job['op'] = op
+        with self._connect() as sock:
+            sock.sendall(_encode(job))
+            with sock.makefile('r') as f:
+                for line in f:
+                    record = json.loads(line)
+                    if 'error' in record:
+                        raise RuntimeError(record['error'])
+                    yield record
+                    if record.get('done'):
+                        return
+
+    def request(self, op, **job):
+        """发送任务并返回全部结果记录。"""
+        return list(self.stream(op, **job))
+
+    def ping(self):
+        return self.request('ping')[-1]
+
+    def load(self, name, Cmat=None, Dmat=None, path=None):
+        """常驻一个连接组（数组或服务端可读的 .npz 路径）。"""
+        if path is not None:
+            return self.request('load', name=name, path=str(path))[-1]
+        return self.request('load', name=name, Cmat=np.asarray(Cmat),
+                            Dmat=None if Dmat is None else np.asarray(Dmat))[-1]
+
+    def simulate(self, **job):
+        """单次模拟，返回最后的结果记录（'v' / 'fc' 转为 ndarray）。"""
+        result = self.request('simulate', **job)[-1]
+        for key in ('v', 'fc'):
+            if key in result:
+                result[key] = np.asarray(result[key])
+        return result
+
+    def sweep(self, grid, **job):
+        """参数网格，逐点产出特征记录。"""
+        for record in self.stream('sweep', grid=grid, **job):
+            if not record.get('done'):
+                yield record
+
+    def shutdown(self):
+        return self.request('shutdown')[-1]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Resident Wendling simulation server")
+    parser.add_argument('--socket', default=None, help="Unix socket path")
+    parser.add_argument('--port', type=int, default=None,
+                        help="serve on 127.0.0.1:PORT instead of a Unix socket")
+    parser.add_argument('--warm-dir', default=None,
+                        help="persist warm-start states in this directory")
+    args = parser.parse_args(argv)
+
+    if args.port is not None:
+        address = ('127.0.0.1', args.port)
+    else:
+        address = args.socket or default_address()
+
+    t0 = time.perf_counter()
+    server = make_server(address, SimulationService(warm_dir=args.warm_dir))
+    print(f"  serving on {address} ({wendling_kernel.KERNEL_BACKEND} kernel, "
+          f"ready in {time.perf_counter() - t0:.2f} s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if isinstance(address, str) and os.path.exists(address):
+            os.unlink(address)
+
+
+if __name__ == '__main__':
+    main()
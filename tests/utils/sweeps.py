@@ -0,0 +1,137 @@
+"""
+参数扫描工具
+
+参数延拓（continuation）扫描：将网格点排成一条路径，每个点以上一个点的最终状态
+作为初始条件，只需很短的 burn-in；可选往返扫描（up/down）以显示滞后（hysteresis）。
+"""
+
+import itertools
+
+import numpy as np
+
+from .warm_start import get_final_state, set_initial_state
+
+
+def order_grid_path(grid):
+    """
+    将参数网格排成蛇形路径（相邻点只有一个参数改变一个网格步长）。
+
+    Parameters
+    ----------
+    grid : dict
+        参数名 -> 取值列表，例如 {'K_gl': [...], 'heterogeneity': [...]}
+
+    Returns
+    -------
+    path : list of dict
+        按路径顺序排列的参数点
+    """
+    names = list(grid.keys())
+    values = [list(grid[name]) for name in names]
+
+    def _snake(level):
+        if level == len(names) - 1:
+            return [[v] for v in values[level]]
+        inner = _snake(level + 1)
+        path = []
+        for i, v in enumerate(values[level]):
+            block = inner if i % 2 == 0 else inner[::-1]
+            path.extend([[v] + rest for rest in block])
+        return path
+
+    if not names:
+        return []
+    return [dict(zip(names, point)) for point in _snake(0)]
+
+
+def continuation_sweep(model, grid, evaluate, record=1000.0,
+                       burn_in_first=2000.0, burn_in=250.0,
+                       hysteresis=False, verbose=False):
+    """
+    参数延拓扫描。
+
+    第一个点从模型当前初始条件出发并使用完整的 burn-in；之后每个点都从
+    上一个点的最终状态出发，只需较短的 burn-in。
+
+    Parameters
+    ----------
+    model : WendlingModel
+        模型（会被原地修改参数与初始条件）
+    grid : dict
+        参数名 -> 取值列表（按 order_grid_path 排成路径）
+    evaluate : callable
+        evaluate(model, start_idx) -> dict，start_idx 为 burn-in 之后的第一个采样点
+    record : float
+        每个点的记录时长 (ms)
+    burn_in_first : float
+        第一个点的 burn-in (ms)
+    burn_in : float
+        延拓点的 burn-in (ms)
+    hysteresis : bool
+        是否沿路径返回扫描一次（down pass）
+    verbose : bool
+        是否打印进度
+
+    Returns
+    -------
+    results : list of dict
+        每个点的参数、'direction'（'up' 或 'down'）以及 evaluate 的返回值
+    """
+    path = order_grid_path(grid)
+    passes = [('up', path)]
+    if hysteresis:
+        passes.append(('down', path[::-1]))
+
+    dt = model.params['dt']
+    results = []
+    state = None
+
+    for direction, points in passes:
+        for i, point in enumerate(points):
+            for key, val in point.items():
+                model.params[key] = val
+
+            if state is None:
+                current_burn_in = burn_in_first
+            else:
+                set_initial_state(model, state)
+                current_burn_in = burn_in
+
+            model.params['duration'] = current_burn_in + record
+            model.run()
+
+            start_idx = int(round(current_burn_in / dt))
+            entry = dict(point)
+            entry['direction'] = direction
+            entry.update(evaluate(model, start_idx))
+            results.append(entry)
+
+            state = get_final_state(model)
+
+            if verbose and (i + 1) % 10 == 0:
+                print(f"  [{direction}] Progress: {i+1}/{len(points)}")
+
+    return results
+
+
+def split_hysteresis(results, param):
+    """
+    将往返扫描结果按方向拆分，并按参数值排序。
+
+    Parameters
+    ----------
+    results : list of dict
+        continuation_sweep 的返回值
+    param : str
+        横轴参数名
+
+    Returns
+    -------
+    branches : dict
+        'up' / 'down' -> (参数值数组, 结果列表)
+    """
+    branches = {}
+    for direction, group in itertools.groupby(results, key=lambda r: r['direction']):
+        group = sorted(group, key=lambda r: r[param])
+        branches[direction] = (np.array([r[param] for r in group]), group)
+    return branches
@@ -0,0 +1,367 @@
+"""
+热启动工具
+
+保存去除暂态后的网络状态，并在之后参数相同（或相近）的模拟中作为初始条件复用；
+同时提供平稳性检测，自动确定最短的安全 burn-in 长度。
+"""
+
+import os
+import json
+import hashlib
+
+import numpy as np
+
+
+# 参与键值计算的参数（影响稳态吸引子的参数；连接与距离矩阵另以摘要计入）
+WARM_START_KEYS = ('A', 'B', 'G', 'a', 'b', 'g', 'C',
+                   'C1', 'C2', 'C3', 'C4', 'C5', 'C6', 'C7', 'e0', 'v0', 'r',
+                   'p_mean', 'p_sigma', 'K_gl', 'signalV', 'dt')
+
+# 只接受精确匹配的参数：决定动力学类型（Wendling 六类）的参数与数值设置
+EXACT_MATCH_KEYS = ('A', 'B', 'G', 'p_mean', 'dt')
+
+# Wendling 模型的 10 个状态变量
+N_STATE_VARS = 10
+
+
+def cmat_digest(Cmat):
+    """
+    计算连接矩阵的摘要（用于区分不同网络）。
+
+    Parameters
+    ----------
+    Cmat : ndarray, shape (N, N)
+        连接矩阵
+
+    Returns
+    -------
+    digest : str
+        SHA1 摘要（前 16 位）
+    """
+    Cmat = np.ascontiguousarray(np.atleast_2d(Cmat), dtype=np.float64)
+    h = hashlib.sha1()
+    h.update(str(Cmat.shape).encode())
+    h.update(Cmat.tobytes())
+    return h.hexdigest()[:16]
+
+
+def _distance_matrix(params, Cmat, Dmat=None):
+    """距离矩阵：Dmat，或 params['lengthMat'] / params['Dmat']；都没有时为零矩阵（无延迟）。"""
+    if Dmat is None and hasattr(params, 'get'):
+        Dmat = params.get('lengthMat')
+        if Dmat is None:
+            Dmat = params.get('Dmat')
+    if Dmat is None:
+        Dmat = np.zeros(np.shape(np.atleast_2d(Cmat)))
+    return Dmat
+
+
+def _exact_values(params):
+    """EXACT_MATCH_KEYS 的取值（缺失为 None），用于索引中的精确比较。"""
+    return {key: (None if params.get(key) is None else
+                  np.round(np.asarray(params[key], dtype=np.float64), 10).tolist())
+            for key in EXACT_MATCH_KEYS}
+
+
+def get_final_state(model):
+    """
+    提取模型最后一个时间点的状态。
+
+    Parameters
+    ----------
+    model : WendlingModel
+        已运行的模型
+
+    Returns
+    -------
+    state : ndarray, shape (N, 10)
+        y0...y9 的最终值
+    """
+    return np.stack([np.asarray(getattr(model, f'y{k}'))[:, -1]
+                     for k in range(N_STATE_VARS)], axis=1)
+
+
+def set_initial_state(model, state):
+    """
+    将状态写入模型初始条件（y0_init ... y9_init）。
+
+    Parameters
+    ----------
+    model : WendlingModel
+        模型
+    state : ndarray, shape (N, 10)
+        初始状态
+    """
+    state = np.asarray(state, dtype=np.float64)
+    if state.ndim != 2 or state.shape[1] != N_STATE_VARS:
+        raise ValueError(f"state 形状应为 (N, {N_STATE_VARS})，实际为 {state.shape}")
+
+    for k in range(N_STATE_VARS):
+        model.params[f'y{k}_init'] = state[:, k:k+1].copy()
+
+
+def _param_vector(params, keys=WARM_START_KEYS):
+    """将参数展平为向量（缺失的参数跳过）。"""
+    parts = []
+    names = []
+    for key in keys:
+        if key in params and params[key] is not None:
+            val = np.atleast_1d(np.asarray(params[key], dtype=np.float64)).ravel()
+            parts.append(val)
+            names.append(f'{key}:{len(val)}')
+    if not parts:
+        return np.zeros(0), ''
+    return np.concatenate(parts), ','.join(names)
+
+
+def detect_burn_in(signal, dt, window=250.0, tol=0.2, max_fraction=0.5):
+    """
+    平稳性检测：找到最短的安全 burn-in 长度。
+
+    将信号切分为等长窗口，以后半段的统计量（均值、标准差）为参考，
+    返回第一个满足“此后所有窗口都与参考一致”的时间点。
+
+    Parameters
+    ----------
+    signal : ndarray, shape (T,) 或 (N, T)
+        时间序列（多节点时取最慢达到平稳的节点）
+    dt : float
+        时间步长 (ms)
+    window : float
+        窗口长度 (ms)
+    tol : float
+        相对容差（相对于参考标准差）
+    max_fraction : float
+        burn-in 的上限（占总长度的比例）
+
+    Returns
+    -------
+    burn_in : float
+        burn-in 长度 (ms)
+    """
+    signal = np.atleast_2d(signal)
+    n_win = int(round(window / dt))
+    n_windows = signal.shape[1] // n_win
+
+    if n_windows < 4:
+        return max_fraction * signal.shape[1] * dt
+
+    segs = signal[:, :n_windows * n_win].reshape(signal.shape[0], n_windows, n_win)
+    means = segs.mean(axis=2)
+    stds = segs.std(axis=2)
+
+    ref = n_windows // 2
+    ref_mean = means[:, ref:].mean(axis=1, keepdims=True)
+    ref_std = stds[:, ref:].mean(axis=1, keepdims=True)
+    scale = np.maximum(ref_std, 1e-6)
+
+    ok = (np.abs(means - ref_mean) <= tol * scale) & \
+         (np.abs(stds - ref_std) <= tol * scale)
+    ok = ok.all(axis=0)
+
+    # 从后往前找到最后一个不平稳的窗口
+    bad = np.where(~ok[:ref])[0]
+    first_ok = 0 if len(bad) == 0 else bad[-1] + 1
+
+    max_windows = int(max_fraction * n_windows)
+    return min(first_ok, max_windows) * n_win * dt
+
+
+class WarmStartStore:
+    """
+    热启动状态库。
+
+    以 (参数, Cmat 摘要, Dmat 摘要, seed family) 为键，将去除暂态后的网络状态保存为
+    .npz，之后参数相同或相近的模拟可直接复用为初始条件。“相近”逐个参数判断
+    （|x - x_saved| <= rtol |x_saved| + atol），EXACT_MATCH_KEYS 必须相同。
+    参数向量同时保存在索引中，查找相近参数时不读取 .npz。
+
+    Parameters
+    ----------
+    path : str
+        存储目录
+    rtol : float
+        “相近参数”的逐参数相对容差
+    atol : float
+        “相近参数”的逐参数绝对容差
+    """
+
+    INDEX_FILE = 'index.json'
+
+    def __init__(self, path, rtol=0.05, atol=1e-9):
+        self.path = path
+        self.rtol = rtol
+        self.atol = atol
+        os.makedirs(path, exist_ok=True)
+        self._index = self._load_index()
+        self._vectors = {}
+
+    def _load_index(self):
+        index_path = os.path.join(self.path, self.INDEX_FILE)
+        if os.path.exists(index_path):
+            with open(index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return {}
+
+    def _save_index(self):
+        index_path = os.path.join(self.path, self.INDEX_FILE)
+        tmp_path = index_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._index, f, indent=1)
+        os.replace(tmp_path, index_path)
+
+    @staticmethod
+    def make_key(params, Cmat, seed_family=0, Dmat=None):
+        """计算精确键值（Dmat 默认取 params['lengthMat'] 或 params['Dmat']）。"""
+        vec, layout = _param_vector(params)
+        h = hashlib.sha1()
+        h.update(layout.encode())
+        h.update(np.round(vec, 10).tobytes())
+        h.update(cmat_digest(Cmat).encode())
+        h.update(cmat_digest(_distance_matrix(params, Cmat, Dmat)).encode())
+        h.update(str(seed_family).encode())
+        return h.hexdigest()[:20]
+
+    def _param_vector_of(self, key):
+        """已保存条目的参数向量（索引中没有时从 .npz 读取一次并缓存）。"""
+        if key not in self._vectors:
+            vec = self._index[key].get('params')
+            if vec is None:
+                vec = np.load(os.path.join(self.path, f'{key}.npz'))['params']
+            self._vectors[key] = np.asarray(vec, dtype=np.float64)
+        return self._vectors[key]
+
+    def save(self, params, Cmat, state, seed_family=0, burn_in=None, Dmat=None):
+        """
+        保存状态。
+
+        Parameters
+        ----------
+        params : dict
+            模型参数（model.params）
+        Cmat : ndarray
+            连接矩阵
+        state : ndarray, shape (N, 10)
+            去除暂态后的状态
+        seed_family : int or str
+            随机种子族
+        burn_in : float, optional
+            产生该状态所用的 burn-in (ms)
+        Dmat : ndarray, optional
+            距离矩阵（默认取 params['lengthMat'] 或 params['Dmat']）
+
+        Returns
+        -------
+        key : str
+            键值
+        """
+        key = self.make_key(params, Cmat, seed_family, Dmat)
+        vec, layout = _param_vector(params)
+
+        np.savez(os.path.join(self.path, f'{key}.npz'),
+                 state=np.asarray(state, dtype=np.float64), params=vec)
+
+        self._index[key] = {
+            'cmat': cmat_digest(Cmat),
+            'dmat': cmat_digest(_distance_matrix(params, Cmat, Dmat)),
+            'seed_family': str(seed_family),
+            'layout': layout,
+            'exact': _exact_values(params),
+            'params': vec.tolist(),
+            'burn_in': burn_in,
+        }
+        self._vectors[key] = vec
+        self._save_index()
+        return key
+
+    def lookup(self, params, Cmat, seed_family=0, exact=False, Dmat=None):
+        """
+        查找状态（先精确匹配，再在 Cmat、Dmat 与 seed family 相同的条目中找最近的
+        相近参数）。
+
+        Returns
+        -------
+        state : ndarray or None
+            找到的状态，未找到返回 None
+        meta : dict or None
+            元数据（包含 'key' 和 'distance'）
+        """
+        key = self.make_key(params, Cmat, seed_family, Dmat)
+        if key in self._index:
+            meta = dict(self._index[key], key=key, distance=0.0)
+            meta.pop('params', None)
+            return self._load_state(key), meta
+
+        if exact:
+            return None, None
+
+        vec, layout = _param_vector(params)
+        digest = cmat_digest(Cmat)
+        d_digest = cmat_digest(_distance_matrix(params, Cmat, Dmat))
+        exact_values = _exact_values(params)
+        best_key, best_dist = None, np.inf
+
+        for k, meta in self._index.items():
+            if meta['cmat'] != digest or meta['seed_family'] != str(seed_family):
+                continue
+            # 旧条目没有 Dmat 摘要，无法确认延迟相同，不复用
+            if meta.get('dmat') != d_digest or meta['layout'] != layout:
+                continue
+            if meta.get('exact') != exact_values:
+                continue
+            other = self._param_vector_of(k)
+            diff = np.abs(vec - other)
+            if np.any(diff > self.rtol * np.abs(other) + self.atol):
+                continue
+            # 距离：最大的逐参数相对偏差
+            dist = float(np.max(diff / (np.abs(other) + self.atol), initial=0.0))
+            if dist < best_dist:
+                best_key, best_dist = k, dist
+
+        if best_key is None:
+            return None, None
+
+        meta = dict(self._index[best_key], key=best_key, distance=float(best_dist))
+        meta.pop('params', None)
+        return self._load_state(best_key), meta
+
+    def _load_state(self, key):
+        return np.load(os.path.join(self.path, f'{key}.npz'))['state']
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, key):
+        return key in self._index
+
+
+def warm_start_model(model, store, seed_family=0, exact=False):
+    """
+    若状态库中有匹配状态，则设置为模型初始条件。
+
+    Parameters
+    ----------
+    model : WendlingModel
+        模型（需有 model.params 和 model.Cmat）
+    store : WarmStartStore
+        状态库
+    seed_family : int or str
+        随机种子族
+    exact : bool
+        是否只接受精确匹配
+
+    Returns
+    -------
+    hit : bool
+        是否命中
+    """
+    Cmat = getattr(model, 'Cmat', None)
+    if Cmat is None:
+        Cmat = model.params.get('Cmat', np.zeros((1, 1)))
+
+    state, meta = store.lookup(model.params, Cmat, seed_family, exact=exact)
+    if state is None:
+        return False
+
+    set_initial_state(model, state)
+    return True
@@ -0,0 +1,921 @@
+"""
+分块积分的 Wendling 内核
+
+与 neurolib 的 `_integrate_wendling_unified` 使用相同的方程（见
+docs/01_ANALYSIS_ALN_vs_WENDLING.md），但按块推进：状态和延迟历史在块之间保留，
+每块结束后把（可降采样的）输出交给观察器（observers），不必在内存中保存整段轨迹。
+"""
+
+import hashlib
+import inspect
+import os
+from contextlib import nullcontext
+
+import numpy as np
+from numba import njit
+
+from .profiling import RunStats, append_jsonl, jit_cache_info
+
+
+# loadDefaultParams 的默认值（未在 params 中给出时使用）
+DEFAULT_PARAMS = {
+    'A': 5.0, 'B': 25.0, 'G': 15.0,
+    'a': 100.0, 'b': 50.0, 'g': 500.0,
+    'C': 135.0,
+    'e0': 2.5, 'v0': 6.0, 'r': 0.56,
+    'p_mean': 90.0, 'p_sigma': 2.0,
+    'K_gl': 0.0, 'signalV': 20.0,
+    'dt': 0.1,
+}
+
+# C1...C7 相对于 C 的比例（Wendling 2002）
+C_RATIOS = (1.0, 0.8, 0.25, 0.25, 0.3, 0.1, 0.8)
+
+# 状态变量数
+N_STATE_VARS = 10
+
+# 可在运行中按时间表变化的参数（顺序即内核中的编码）
+SCHEDULABLE_PARAMS = ('A', 'B', 'G', 'p_mean', 'p_sigma', 'K_gl')
+
+# low_rank_coupling 在尚未分箱时使用的延迟箱数
+LOW_RANK_DELAY_BINS = 4
+
+# 可在块之间修改的逐节点参数（ChunkedSimulation.set_params）
+_NODE_PARAMS = ('A', 'B', 'G', 'a', 'b', 'g', 'e0', 'v0', 'r', 'p_mean', 'p_sigma', 'K_gl',
+                'C1', 'C2', 'C3', 'C4', 'C5', 'C6', 'C7')
+
+
+@njit(cache=True)
+def _sigm(v, e0, v0, r):
+    return 2.0 * e0 / (1.0 + np.exp(r * (v0 - v)))
+
+
+@njit(cache=True)
+def _seed_kernel(seed):
+    np.random.seed(seed)
+
+
+@njit(cache=True, nogil=True)
+def _integrate_chunk(y, hist, hist_pos, n_steps, dt, N,
+                     A, a, B, b, G, g, C1, C2, C3, C4, C5, C6, C7,
+                     e0, v0, r, p_mean, p_sigma,
+                     csr_ptr, csr_idx, csr_w, csr_delay, bin_ptr, bin_delay, lr_U, lr_Vt,
+                     K_gl, decimate, out_v, out_y, sched, sched_param, sched_step, step0):
+    """
+    推进 n_steps 步（Euler-Maruyama）。
+
+    所有神经元参数（A, a, B, b, G, g, C1...C7, e0, v0, r, p_mean, p_sigma）
+    以及 K_gl 均为长度 N 的向量，同一次调用可以混合任意 activity types。
+
+    y : (N, 10) 当前状态，原地更新
+    hist : (N, n_hist) 突触前发放率 S(v_pyr) 的环形历史缓冲，hist_pos 为最新一列
+           （写入时计算一次 sigmoid，每条连接读取时不再重复计算）
+    bin_ptr, bin_delay : 延迟分箱（见 bin_coupling_delays）；bin_delay 长度 K > 0 时
+           每步先把 K 个延迟对应的历史列收集为连续的 (K, N) 缓冲，节点 i 第 kb 箱的
+           连接 bin_ptr[i*K+kb] ... bin_ptr[i*K+kb+1]-1 读取缓冲的第 kb 行，
+           不再按各自的 csr_delay 访问历史；K = 0 为精确延迟
+    lr_U, lr_Vt : (K, N, r) 与 (K, r, N) 每个延迟箱连接矩阵的低秩分解（见
+           low_rank_coupling）；r > 0 时耦合为 sum_k lr_U[k] @ (lr_Vt[k] @ x_k)，
+           每步 O(K N r)，不再遍历连接；K = 0 时不使用
+    out_v : (N, n_steps // decimate) 降采样的 v_pyr 输出
+    out_y : (10, N, n_out) 降采样的全部状态（长度为 0 表示不记录）
+    sched : (P, N, K) 参数时间表节点值，每 sched_step 步一个节点，节点间线性插值；
+            sched_param[p] 为 SCHEDULABLE_PARAMS 中的编号；P=0 表示无时间表
+    step0 : 本块第一步的全局步数（保证分块运行时时间表连续）
+    """
+    n_hist = hist.shape[1]
+    record_states = out_y.shape[2] > 0
+    sqrt_dt = np.sqrt(dt)
+    dy = np.empty((N, N_STATE_VARS))
+    i_out = 0
+    n_sched = sched.shape[0]
+    n_knots = sched.shape[2]
+    n_bins = bin_delay.shape[0]
+    xbuf = np.empty((n_bins, N))
+    rank = lr_U.shape[2] if lr_U.shape[0] > 0 else 0
+    zbuf = np.empty((n_bins, rank))
+
+    for k in range(n_steps):
+        # 参数时间表（在内核内插值，不经 Python）
+        if n_sched > 0:
+            pos = (step0 + k) / sched_step
+            i0 = int(pos)
+            if i0 >= n_knots - 1:
+                i0 = n_knots - 1
+                frac = 0.0
+            else:
+                frac = pos - i0
+            i1 = min(i0 + 1, n_knots - 1)
+            for p in range(n_sched):
+                code = sched_param[p]
+                for node in range(N):
+                    val = sched[p, node, i0] * (1.0 - frac) + sched[p, node, i1] * frac
+                    if code == 0:
+                        A[node] = val
+                    elif code == 1:
+                        B[node] = val
+                    elif code == 2:
+                        G[node] = val
+                    elif code == 3:
+                        p_mean[node] = val
+                    elif code == 4:
+                        p_sigma[node] = val
+                    else:
+                        K_gl[node] = val
+
+        # 延迟分箱：每个箱的历史列收集为连续向量
+        for kb in range(n_bins):
+            idx = hist_pos - bin_delay[kb]
+            if idx < 0:
+                idx += n_hist
+            for j in range(N):
+                xbuf[kb, j] = hist[j, idx]
+            # 低秩耦合：先投影到 r 维
+            for q in range(rank):
+                acc = 0.0
+                for j in range(N):
+                    acc += lr_Vt[kb, q, j] * xbuf[kb, j]
+                zbuf[kb, q] = acc
+
+        for node in range(N):
+            # 节点特定参数
+            A_node = A[node]
+            B_node = B[node]
+            G_node = G[node]
+            a_n = a[node]
+            b_n = b[node]
+            g_n = g[node]
+            e0_n = e0[node]
+            v0_n = v0[node]
+            r_n = r[node]
+
+            # 噪声输入
+            p_t = p_mean[node] + p_sigma[node] * np.random.normal(0.0, 1.0) * sqrt_dt
+
+            # 耦合输入（延迟的突触前发放率）
+            coupling_input = 0.0
+            if rank > 0:
+                for kb in range(n_bins):
+                    for q in range(rank):
+                        coupling_input += lr_U[kb, node, q] * zbuf[kb, q]
+            elif n_bins > 0:
+                for kb in range(n_bins):
+                    seg = node * n_bins + kb
+                    for e in range(bin_ptr[seg], bin_ptr[seg + 1]):
+                        coupling_input += csr_w[e] * xbuf[kb, csr_idx[e]]
+            else:
+                for e in range(csr_ptr[node], csr_ptr[node + 1]):
+                    idx = hist_pos - csr_delay[e]
+                    if idx < 0:
+                        idx += n_hist
+                    coupling_input += csr_w[e] * hist[csr_idx[e], idx]
+            coupling_input *= K_gl[node]
+
+            y0_ = y[node, 0]
+            y1 = y[node, 1]
+            y2 = y[node, 2]
+            y3 = y[node, 3]
+            y4 = y[node, 4]
+            s_c3 = _sigm(C3[node] * y0_, e0_n, v0_n, r_n)
+
+            dy[node, 0] = y[node, 5]
+            dy[node, 5] = A_node * a_n * (_sigm(y1 - y2 - y3, e0_n, v0_n, r_n) + coupling_input) \
+                - 2.0 * a_n * y[node, 5] - a_n * a_n * y0_
+            dy[node, 1] = y[node, 6]
+            dy[node, 6] = A_node * a_n * (C2[node] * _sigm(C1[node] * y0_, e0_n, v0_n, r_n) + p_t) \
+                - 2.0 * a_n * y[node, 6] - a_n * a_n * y1
+            dy[node, 2] = y[node, 7]
+            dy[node, 7] = B_node * b_n * (C4[node] * s_c3) \
+                - 2.0 * b_n * y[node, 7] - b_n * b_n * y2
+            dy[node, 3] = y[node, 8]
+            dy[node, 8] = G_node * g_n * (C7[node] * _sigm(C5[node] * y0_ - C6[node] * y4,
+                                                           e0_n, v0_n, r_n)) \
+                - 2.0 * g_n * y[node, 8] - g_n * g_n * y3
+            dy[node, 4] = y[node, 9]
+            dy[node, 9] = B_node * b_n * s_c3 \
+                - 2.0 * b_n * y[node, 9] - b_n * b_n * y4
+
+        hist_pos += 1
+        if hist_pos == n_hist:
+            hist_pos = 0
+
+        for node in range(N):
+            for m in range(N_STATE_VARS):
+                y[node, m] += dt * dy[node, m]
+            hist[node, hist_pos] = _sigm(y[node, 1] - y[node, 2] - y[node, 3],
+                                         e0[node], v0[node], r[node])
+
+        if (k + 1) % decimate == 0:
+            for node in range(N):
+                out_v[node, i_out] = y[node, 1] - y[node, 2] - y[node, 3]
+            if record_states:
+                for m in range(N_STATE_VARS):
+                    for node in range(N):
+                        out_y[m, node, i_out] = y[node, m]
+            i_out += 1
+
+    return hist_pos
+
+
+# _integrate_chunk 的参数类型（AOT 导出与 Python 侧类型统一都以此为准）：
+# 数组一律为 C 连续的 float64 / int64，标量为 int64 / float64
+KERNEL_SIGNATURE = (
+    'i8(f8[:, ::1], f8[:, ::1], i8, i8, f8, i8, '
+    + 'f8[::1], ' * 18
+    + 'i8[::1], i8[::1], f8[::1], i8[::1], i8[::1], i8[::1], f8[:, :, ::1], f8[:, :, ::1], '
+    'f8[::1], i8, f8[:, ::1], f8[:, :, ::1], f8[:, :, ::1], i8[::1], i8, i8)')
+
+# kp 中的整数数组，其余数组均为 float64
+_INT_KEYS = ('csr_ptr', 'csr_idx', 'csr_delay', 'bin_ptr', 'bin_delay', 'Dmat_ndt')
+
+
+def kernel_source_hash():
+    """内核源码与签名的哈希（int64），用于判断 AOT 模块是否过期。"""
+    h = hashlib.sha1()
+    for func in (_sigm, _seed_kernel, _integrate_chunk):
+        h.update(inspect.getsource(func.py_func).encode())
+    h.update(KERNEL_SIGNATURE.encode())
+    return int(h.hexdigest()[:15], 16)
+
+
+def _load_aot():
+    """
+    读取预编译的内核（jit_cache.build_aot 生成的 _wendling_aot 扩展模块）。
+
+    模块不存在、源码已修改或设置了 WENDLING_NO_AOT 时返回 None（使用 JIT）。
+    """
+    if os.environ.get('WENDLING_NO_AOT'):
+        return None
+    try:
+        from . import _wendling_aot
+    except ImportError:
+        return None
+    if _wendling_aot.source_hash() != kernel_source_hash():
+        return None
+    return _wendling_aot
+
+
+_AOT = _load_aot()
+KERNEL_BACKEND = 'aot' if _AOT is not None else 'jit'
+_kernel = _AOT.integrate_chunk if _AOT is not None else _integrate_chunk
+_seed = _AOT.seed_kernel if _AOT is not None else _seed_kernel
+
+
+def coerce_kernel_params(kp):
+    """
+    把 kp 中的数组原地统一为 C 连续、可写的 float64 / int64（已符合时不复制）。
+
+    内核的类型签名因此固定：标量 / 向量参数、int32 矩阵、只读或非连续数组
+    都不会触发重新编译，也能直接调用 AOT 内核。
+    """
+    # 没有延迟分箱 / 低秩耦合时为空数组（精确耦合）
+    for key in ('bin_ptr', 'bin_delay'):
+        kp.setdefault(key, np.zeros(0, dtype=np.int64))
+    for key in ('lr_U', 'lr_Vt'):
+        kp.setdefault(key, np.zeros((0, 0, 0)))
+    for key, val in kp.items():
+        if isinstance(val, np.ndarray):
+            dtype = np.int64 if key in _INT_KEYS else np.float64
+            kp[key] = np.require(val, dtype=dtype, requirements=('C', 'W'))
+    kp['N'] = int(kp['N'])
+    kp['dt'] = float(kp['dt'])
+    return kp
+
+
+def _node_vector(val, N):
+    """标量或向量 -> 长度为 N 的 float64 向量（与 timeIntegration.py 的预处理一致）。"""
+    vec = np.atleast_1d(np.asarray(val, dtype=np.float64)).ravel()
+    if len(vec) == 1 and N > 1:
+        vec = np.full(N, vec[0], dtype=np.float64)
+    if len(vec) != N:
+        raise ValueError(f"参数长度 {len(vec)} 与节点数 N={N} 不一致")
+    return vec
+
+
+def coupling_csr(Cmat, Dmat_ndt):
+    """
+    把稠密连接矩阵压缩为按行 (CSR) 存储的非零连接。
+
+    内核只遍历非零连接，稀疏网络不必扫描整个 N x N 矩阵。
+    遍历顺序与稠密矩阵逐行扫描相同，因此结果逐位一致。
+
+    Returns
+    -------
+    csr : dict
+        'csr_ptr' (N+1,), 'csr_idx' (nnz,), 'csr_w' (nnz,), 'csr_delay' (nnz,)
+    """
+    rows, cols = np.nonzero(Cmat)
+    ptr = np.zeros(Cmat.shape[0] + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=Cmat.shape[0]), out=ptr[1:])
+    return {
+        'csr_ptr': ptr,
+        'csr_idx': cols.astype(np.int64),
+        'csr_w': np.ascontiguousarray(Cmat[rows, cols], dtype=np.float64),
+        'csr_delay': np.ascontiguousarray(Dmat_ndt[rows, cols], dtype=np.int64),
+    }
+
+
+def _quantize_delays(delay, n_bins, method, n_iter=20):
+    """每条连接的箱号与每个箱的代表延迟（步数）。"""
+    values, counts = np.unique(delay, return_counts=True)
+    if len(values) <= n_bins:
+        return np.searchsorted(values, delay), values
+
+    if method == 'uniform':
+        edges = np.linspace(values[0], values[-1], n_bins + 1)
+    elif method in ('quantile', 'kmeans'):
+        edges = np.quantile(delay, np.linspace(0.0, 1.0, n_bins + 1))
+    else:
+        raise ValueError(f"未知的分箱方法 {method!r}，可选 'kmeans'、'quantile'、'uniform'")
+    label = np.clip(np.searchsorted(edges, values, side='right') - 1, 0, n_bins - 1)
+    _, label = np.unique(label, return_inverse=True)
+    centers = np.bincount(label, values * counts) / np.bincount(label, counts)
+
+    if method == 'kmeans':
+        # 一维 Lloyd 迭代（按连接数加权），使延迟的平方误差最小
+        for _ in range(n_iter):
+            new = np.argmin(np.abs(values[:, None] - centers[None, :]), axis=1)
+            _, new = np.unique(new, return_inverse=True)
+            centers = np.bincount(new, values * counts) / np.bincount(new, counts)
+            if np.array_equal(new, label):
+                break
+            label = new
+
+    centers = np.rint(centers).astype(np.int64)
+    centers, remap = np.unique(centers, return_inverse=True)
+    return remap[label][np.searchsorted(values, delay)], centers
+
+
+def bin_coupling_delays(kp, n_bins, method='kmeans'):
+    """
+    把连接延迟量化为至多 n_bins 个值（原地修改 kp）。
+
+    内核每步把这 K 个延迟对应的历史列收集为连续的 (K, N) 缓冲，每条连接只读取该
+    缓冲，而不是按各自的延迟访问 (N, n_hist) 的历史；每行的连接按 (箱, 列) 重新排序，
+    读取是顺序的。稠密、延迟各不相同的连接组因此不再在历史缓冲中跳跃访问。
+    代价是延迟误差（至多半个箱宽），见 coupling_approx.delay_binning_report。
+
+    Parameters
+    ----------
+    kp : dict
+        prepare_kernel_params 的结果
+    n_bins : int
+        箱数 K；不同延迟值不超过 K 个时结果与精确延迟相同
+    method : str
+        'kmeans'（默认，延迟平方误差最小）、'quantile'（每箱连接数相同）或 'uniform'
+
+    Returns
+    -------
+    kp : dict
+        增加 'bin_delay' (K,) 与 'bin_ptr' (N*K+1,)（节点 i 第 k 箱的连接为
+        bin_ptr[i*K+k] ... bin_ptr[i*K+k+1]-1），'csr_*' 在每行内按箱重新排序
+    """
+    delay = kp['csr_delay']
+    if len(delay) == 0:
+        kp['bin_ptr'] = np.zeros(0, dtype=np.int64)
+        kp['bin_delay'] = np.zeros(0, dtype=np.int64)
+        return kp
+    label, centers = _quantize_delays(delay, int(n_bins), method)
+    N, K = kp['N'], len(centers)
+
+    rows = np.repeat(np.arange(N), np.diff(kp['csr_ptr']))
+    order = np.lexsort((kp['csr_idx'], label, rows))
+    for key in ('csr_idx', 'csr_w', 'csr_delay'):
+        kp[key] = np.ascontiguousarray(kp[key][order])
+    bin_ptr = np.zeros(N * K + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows * K + label, minlength=N * K), out=bin_ptr[1:])
+    kp['bin_ptr'] = bin_ptr
+    kp['bin_delay'] = np.ascontiguousarray(centers, dtype=np.int64)
+    return kp
+
+
+def _bin_matrices(kp):
+    """每个延迟箱的稠密连接矩阵 (K, N, N)（按箱拆分的 Cmat）。"""
+    N, K = kp['N'], len(kp['bin_delay'])
+    W = np.zeros((K, N, N))
+    seg = np.repeat(np.arange(N * K), np.diff(kp['bin_ptr']))
+    W[seg % K, seg // K, kp['csr_idx']] = kp['csr_w']
+    return W
+
+
+def low_rank_coupling(kp, rank, delay_bins=LOW_RANK_DELAY_BINS):
+    """
+    用截断 SVD 近似每个延迟箱的连接矩阵（原地修改 kp）。
+
+    延迟分箱后耦合为 sum_k W_k @ x_k（x_k 为延迟 bin_delay[k] 的历史列）；把每个
+    W_k 截断为秩 r 的 U_k S_k V_k^T，内核每步先算 z_k = V_k^T x_k，再得到
+    U_k S_k z_k，耦合代价从 O(nnz) 降为 O(K N r)，适合 1000 个以上区域的稠密连接组。
+    K_gl 按节点在内核中乘在结果上，不影响分解。误差见 coupling_approx.low_rank_report。
+
+    Parameters
+    ----------
+    kp : dict
+        prepare_kernel_params 的结果；已分箱时沿用其延迟箱
+    rank : int
+        保留的秩 r（不超过 N）
+    delay_bins : int
+        kp 尚未分箱时使用的箱数（见 bin_coupling_delays）
+
+    Returns
+    -------
+    kp : dict
+        增加 'lr_U' (K, N, r)（U_k S_k）、'lr_Vt' (K, r, N) 与 'lr_rel_error' (K,)
+        （每个箱 ||W_k - U_k S_k V_k^T||_F / ||W_k||_F）
+    """
+    if len(kp.get('bin_delay', ())) == 0:
+        bin_coupling_delays(kp, delay_bins)
+    N, K = kp['N'], len(kp['bin_delay'])
+    r = max(1, min(int(rank), N))
+    lr_U = np.zeros((K, N, r))
+    lr_Vt = np.zeros((K, r, N))
+    rel_error = np.zeros(K)
+    for k, W in enumerate(_bin_matrices(kp)):
+        u, sv, vt = np.linalg.svd(W, full_matrices=False)
+        lr_U[k] = u[:, :r] * sv[:r]
+        lr_Vt[k] = vt[:r]
+        total = np.sum(sv ** 2)
+        rel_error[k] = np.sqrt(np.sum(sv[r:] ** 2) / total) if total > 0 else 0.0
+    kp['lr_U'] = lr_U
+    kp['lr_Vt'] = lr_Vt
+    kp['lr_rel_error'] = rel_error
+    return kp
+
+
+def prepare_kernel_params(params, Cmat=None, Dmat=None, delay_bins=None, coupling_rank=None):
+    """
+    将 model.params（或普通 dict）整理为内核参数。
+
+    Parameters
+    ----------
+    params : dict
+        模型参数；缺失项使用 DEFAULT_PARAMS
+    Cmat : ndarray, optional
+        连接矩阵（默认取 params['Cmat']）
+    Dmat : ndarray, optional
+        距离矩阵 (mm)（默认取 params['lengthMat'] 或 params['Dmat']）
+    delay_bins : int, optional
+        把连接延迟量化为至多 delay_bins 个值（见 bin_coupling_delays）；None 为精确延迟
+    coupling_rank : int, optional
+        用秩为 coupling_rank 的截断 SVD 近似每个延迟箱的连接（见 low_rank_coupling；
+        未给出 delay_bins 时使用 LOW_RANK_DELAY_BINS 个箱）；None 为精确连接
+
+    Returns
+    -------
+    kp : dict
+        内核参数（时间单位为秒）；所有神经元参数都展开为长度 N 的向量，
+        连接同时以稠密矩阵 ('Cmat', 'Dmat_ndt') 和 CSR ('csr_*') 给出
+    """
+    def get(key):
+        val = params.get(key) if hasattr(params, 'get') else None
+        return DEFAULT_PARAMS[key] if val is None else val
+
+    if Cmat is None:
+        Cmat = params.get('Cmat') if hasattr(params, 'get') else None
+    if Cmat is None:
+        Cmat = np.zeros((1, 1))
+    Cmat = np.ascontiguousarray(np.atleast_2d(Cmat), dtype=np.float64)
+    N = Cmat.shape[0]
+
+    if Dmat is None and hasattr(params, 'get'):
+        Dmat = params.get('lengthMat')
+        if Dmat is None:
+            Dmat = params.get('Dmat')
+    if Dmat is None:
+        Dmat = np.zeros((N, N))
+    Dmat = np.atleast_2d(np.asarray(Dmat, dtype=np.float64))
+
+    dt = float(get('dt'))
+    signalV = float(get('signalV'))
+    if signalV > 0:
+        Dmat_ndt = np.rint(Dmat / signalV / dt).astype(np.int64)
+    else:
+        Dmat_ndt = np.zeros((N, N), dtype=np.int64)
+
+    C = _node_vector(get('C'), N)
+    C_vals = [params.get(f'C{i+1}') if hasattr(params, 'get') else None
+              for i in range(7)]
+    C_vals = [C * ratio if val is None else _node_vector(val, N)
+              for val, ratio in zip(C_vals, C_RATIOS)]
+
+    kp = {
+        'N': N,
+        'dt': dt / 1000.0,
+        'A': _node_vector(get('A'), N),
+        'B': _node_vector(get('B'), N),
+        'G': _node_vector(get('G'), N),
+        'a': _node_vector(get('a'), N),
+        'b': _node_vector(get('b'), N),
+        'g': _node_vector(get('g'), N),
+        'e0': _node_vector(get('e0'), N),
+        'v0': _node_vector(get('v0'), N),
+        'r': _node_vector(get('r'), N),
+        'p_mean': _node_vector(get('p_mean'), N),
+        'p_sigma': _node_vector(get('p_sigma'), N),
+        'Cmat': Cmat,
+        'K_gl': _node_vector(get('K_gl'), N),
+        'Dmat_ndt': np.ascontiguousarray(Dmat_ndt),
+    }
+    kp.update(coupling_csr(Cmat, Dmat_ndt))
+    for i, val in enumerate(C_vals):
+        kp[f'C{i+1}'] = val
+    if delay_bins is not None:
+        bin_coupling_delays(kp, delay_bins)
+    if coupling_rank is not None:
+        low_rank_coupling(kp, coupling_rank)
+    return kp
+
+
+def load_default_params(Cmat=None, Dmat=None, seed=None, heterogeneity=0.0,
+                        random_init=True, heterogeneous_keys=('A', 'B', 'G', 'p_mean')):
+    """
+    生成默认参数（与 loadDefaultParams 相同的约定），所有神经元参数均可为向量。
+
+    Parameters
+    ----------
+    Cmat, Dmat : ndarray, optional
+        连接矩阵与距离矩阵（默认单节点）
+    seed : int, optional
+        随机种子
+    heterogeneity : float
+        节点参数的相对变异范围 ±heterogeneity（N > 1 时生效）
+    random_init : bool
+        是否使用 [-0.1, 0.1] 的随机初始条件
+    heterogeneous_keys : sequence of str
+        施加异质性的参数，可包含 'p_sigma'、'a'、'b'、'g'、'C' 等
+
+    Returns
+    -------
+    params : dict
+    """
+    if Cmat is None:
+        Cmat = np.zeros((1, 1))
+    Cmat = np.atleast_2d(np.asarray(Cmat, dtype=np.float64))
+    N = Cmat.shape[0]
+    if Dmat is None:
+        Dmat = np.zeros((N, N))
+
+    params = dict(DEFAULT_PARAMS)
+    params.update({'N': N, 'Cmat': Cmat, 'lengthMat': np.asarray(Dmat, dtype=np.float64),
+                   'seed': seed, 'duration': 2000.0})
+
+    rng = np.random.RandomState(seed)
+    if heterogeneity > 0 and N > 1:
+        for key in heterogeneous_keys:
+            params[key] = DEFAULT_PARAMS[key] * \
+                (1 + rng.uniform(-heterogeneity, heterogeneity, N))
+
+    for k in range(N_STATE_VARS):
+        if random_init:
+            params[f'y{k}_init'] = rng.uniform(-0.1, 0.1, (N, 1))
+        else:
+            params[f'y{k}_init'] = np.zeros((N, 1))
+
+    return params
+
+
+def initial_state_from_params(params, N):
+    """
+    从 y0_init ... y9_init 读取初始状态（取最后一列），缺失时为零。
+
+    Returns
+    -------
+    state : ndarray, shape (N, 10)
+    """
+    state = np.zeros((N, N_STATE_VARS))
+    if not hasattr(params, 'get'):
+        return state
+    for k in range(N_STATE_VARS):
+        init = params.get(f'y{k}_init')
+        if init is not None:
+            init = np.atleast_2d(np.asarray(init, dtype=np.float64))
+            state[:, k] = init[:, -1] if init.shape[0] == N else init.ravel()[-1]
+    return state
+
+
+class ChunkedSimulation:
+    """
+    分块推进的 Wendling 网络模拟。
+
+    状态 (N, 10) 和 v_pyr 延迟历史在块之间保留，因此多次 advance() 等价于一次
+    连续积分。
+
+    Parameters
+    ----------
+    params : dict
+        模型参数（例如 model.params）
+    Cmat, Dmat : ndarray, optional
+        连接矩阵与距离矩阵（默认从 params 读取）
+    seed : int, optional
+        噪声随机种子（numba 全局随机数发生器）
+    state : ndarray, shape (N, 10), optional
+        初始状态（默认从 y*_init 读取）
+    profile : bool
+        是否记录分阶段统计（见 profiling.RunStats）；每次 run() / advance() 结束后
+        写入 last_run_stats
+    log_path : str, optional
+        profile 时把每次的 last_run_stats 追加到该 JSON lines 文件
+    delay_bins : int, optional
+        把连接延迟量化为至多 delay_bins 个值（近似，见 bin_coupling_delays）
+    coupling_rank : int, optional
+        每个延迟箱的连接用秩 coupling_rank 的截断 SVD 近似（见 low_rank_coupling）
+    """
+
+    def __init__(self, params, Cmat=None, Dmat=None, seed=None, state=None,
+                 profile=False, log_path=None, delay_bins=None, coupling_rank=None):
+        self.params = params
+        self._init_stats(profile, log_path)
+        with self._phase('prepare'):
+            kp = prepare_kernel_params(params, Cmat, Dmat, delay_bins=delay_bins,
+                                       coupling_rank=coupling_rank)
+        self._setup(kp, seed, state)
+
+    @classmethod
+    def from_kernel_params(cls, kp, seed=None, state=None, profile=False, log_path=None):
+        """
+        直接用内核参数构造（例如 coupling_approx 中分箱或低秩近似后的内核参数）。
+        """
+        sim = cls.__new__(cls)
+        sim.params = None
+        sim._init_stats(profile, log_path)
+        sim._setup(kp, seed, state)
+        return sim
+
+    def _init_stats(self, profile, log_path):
+        self.profile = profile
+        self.log_path = log_path
+        self.last_run_stats = None
+        self._stats = RunStats() if profile else None
+        self._jit = None
+
+    def _phase(self, name):
+        return self._stats.phase(name) if self._stats is not None else nullcontext()
+
+    def _setup(self, kp, seed, state):
+        params = self.params
+        self.kp = coerce_kernel_params(kp)
+        N = self.kp['N']
+        self.N = N
+        self.dt = self.kp['dt'] * 1000.0  # ms
+
+        if state is None:
+            state = initial_state_from_params(params, N)
+        self.y = np.ascontiguousarray(state, dtype=np.float64).copy()
+
+        delay = self.kp['csr_delay']
+        n_hist = int(delay.max()) + 1 if len(delay) > 0 else 1
+        v_init = self.y[:, 1] - self.y[:, 2] - self.y[:, 3]
+        s_init = 2.0 * kp['e0'] / (1.0 + np.exp(kp['r'] * (kp['v0'] - v_init)))
+        self.hist = np.repeat(s_init[:, None], n_hist, axis=1)
+        self.hist_pos = 0
+        self.t = 0.0  # ms
+        self.n_steps_done = 0
+        self.clear_schedule()
+
+        if seed is None and hasattr(params, 'get'):
+            seed = params.get('seed')
+        self.seed = seed
+        self._integrate = _kernel
+        if seed is not None:
+            _seed(int(seed))
+
+        if self.profile:
+            # 零步调用：把编译（或读取磁盘缓存）与积分分开计时
+            if _AOT is None:
+                before = jit_cache_info(_integrate_chunk)
+            with self._phase('compile'):
+                self._call_kernel(0, 1, np.empty((self.N, 0)),
+                                  np.empty((N_STATE_VARS, self.N, 0)))
+            if _AOT is None:
+                after = jit_cache_info(_integrate_chunk)
+                self._jit = {
+                    'backend': 'jit',
+                    'compiled': after['signatures'] > before['signatures']
+                                and after['cache_hits'] == before['cache_hits'],
+                    'cache_hit': after['cache_hits'] > before['cache_hits'],
+                    'cache_miss': after['cache_misses'] > before['cache_misses'],
+                }
+            else:
+                self._jit = {'backend': 'aot', 'compiled': False, 'cache_hit': False,
+                             'cache_miss': False}
+
+    @property
+    def state(self):
+        """当前状态 (N, 10) 的副本。"""
+        return self.y.copy()
+
+    def set_schedule(self, schedule):
+        """
+        设置参数时间表（见 schedules.ParameterSchedule），时间从当前 sim.t 起算。
+
+        被调度的参数在内核中逐步更新，块之间无需 Python 干预。
+        """
+        sched, codes, step = schedule.compile(self.N, self.dt)
+        self._sched = np.require(sched, dtype=np.float64, requirements=('C', 'W'))
+        self._sched_param = np.require(codes, dtype=np.int64, requirements=('C',))
+        self._sched_step = int(step)
+        self._sched_step0 = self.n_steps_done
+        # 内核会原地写入被调度的参数，因此使用副本
+        for name in schedule.names:
+            self.kp[name] = self.kp[name].copy()
+
+    def clear_schedule(self):
+        """取消参数时间表（参数保持当前值）。"""
+        self._sched = np.zeros((0, self.N, 1))
+        self._sched_param = np.zeros(0, dtype=np.int64)
+        self._sched_step = 1
+        self._sched_step0 = 0
+
+    def use_nogil_kernel(self):
+        """
+        改用 JIT 内核（nogil=True，积分期间释放 GIL），使模拟可以在后台线程中与分析
+        并行（见 pipeline.run_pipeline）；AOT 内核调用期间持有 GIL。
+
+        numba 的随机数状态按线程独立，调用线程需先用 _seed_kernel(seed) 设定种子。
+        同一种子下两种内核的输出逐位一致。
+        """
+        self._integrate = _integrate_chunk
+        return self
+
+    def set_params(self, **values):
+        """
+        在块之间修改神经元参数（标量或长度 N 的向量），从下一次 advance() 起生效。
+
+        可修改 A、B、G、a、b、g、e0、v0、r、p_mean、p_sigma、K_gl、C1 ... C7，
+        以及 C（按 C_RATIOS 同时更新 C1 ... C7）；正在被时间表调度的参数以时间表为准。
+        """
+        for name, val in values.items():
+            if name == 'C':
+                C = _node_vector(val, self.N)
+                for i, ratio in enumerate(C_RATIOS):
+                    self.kp[f'C{i+1}'] = C * ratio
+            elif name in _NODE_PARAMS:
+                self.kp[name] = _node_vector(val, self.N)
+            else:
+                raise ValueError(f"参数 {name} 不能在运行中修改，可选: {_NODE_PARAMS + ('C',)}")
+
+    def _kernel_args(self):
+        kp = self.kp
+        return (kp['A'], kp['a'], kp['B'], kp['b'], kp['G'], kp['g'],
+                kp['C1'], kp['C2'], kp['C3'], kp['C4'], kp['C5'], kp['C6'], kp['C7'],
+                kp['e0'], kp['v0'], kp['r'], kp['p_mean'], kp['p_sigma'],
+                kp['csr_ptr'], kp['csr_idx'], kp['csr_w'], kp['csr_delay'],
+                kp['bin_ptr'], kp['bin_delay'], kp['lr_U'], kp['lr_Vt'], kp['K_gl'])
+
+    def _schedule_args(self):
+        return (self._sched, self._sched_param, self._sched_step,
+                int(self.n_steps_done - self._sched_step0))
+
+    def _call_kernel(self, n_steps, decimate, out_v, out_y):
+        # 标量显式转换为 Python int / float，保证与 KERNEL_SIGNATURE 一致
+        return self._integrate(self.y, self.hist, int(self.hist_pos), int(n_steps), self.kp['dt'],
+                       self.N, *self._kernel_args(), int(decimate), out_v, out_y,
+                       *self._schedule_args())
+
+    def advance(self, duration, decimate=1, record_states=False):
+        """
+        推进一段时间。
+
+        Parameters
+        ----------
+        duration : float
+            时长 (ms)，向下取整到 decimate 步的整数倍
+        decimate : int
+            输出降采样倍数
+        record_states : bool
+            是否同时返回全部 10 个状态变量
+
+        Returns
+        -------
+        t : ndarray, shape (T,)
+            输出时间点 (ms)
+        v : ndarray, shape (N, T)
+            v_pyr = y1 - y2 - y3
+        ys : ndarray, shape (10, N, T) or None
+            全部状态（record_states=True 时）
+        """
+        n_out = int(round(duration / self.dt)) // decimate
+        result = self._advance(n_out, decimate, record_states)
+        self._finish_run()
+        return result
+
+    def _advance(self, n_out, decimate, record_states):
+        n_steps = n_out * decimate
+
+        with self._phase('output'):
+            out_v = np.empty((self.N, n_out))
+            out_y = np.empty((N_STATE_VARS, self.N, n_out if record_states else 0))
+
+        with self._phase('integrate'):
+            self.hist_pos = self._call_kernel(n_steps, decimate, out_v, out_y)
+        if self._stats is not None:
+            self._stats.add(steps=n_steps, node_steps=n_steps * self.N)
+
+        t = self.t + self.dt * decimate * np.arange(1, n_out + 1)
+        self.t += n_steps * self.dt
+        self.n_steps_done += n_steps
+
+        return t, out_v, (out_y if record_states else None)
+
+    def _finish_run(self, **extra):
+        """profile 时汇总本次运行的统计到 last_run_stats（并写日志），然后重新计数。"""
+        if self._stats is None:
+            return
+        stats = self._stats.to_dict()
+        stats.update({'N': self.N, 'dt': self.dt, 't_end': self.t, 'jit': self._jit})
+        stats.update(extra)
+        self._stats.close()
+        self.last_run_stats = stats
+        if self.log_path is not None:
+            append_jsonl(self.log_path, stats)
+        self._stats = RunStats()
+        self._jit = None
+
+    def run(self, duration, observers=(), chunk_duration=1000.0, decimate=1,
+            record_states=False):
+        """
+        分块运行并把每块输出交给观察器。
+
+        观察器需实现 update(t, v, ys)，可选实现 finalize()（运行结束时调用）。
+
+        Parameters
+        ----------
+        duration : float
+            总时长 (ms)
+        observers : sequence
+            观察器列表
+        chunk_duration : float
+            每块时长 (ms)
+        decimate : int
+            输出降采样倍数
+        record_states : bool
+            是否把全部状态交给观察器
+
+        Returns
+        -------
+        observers : sequence
+            传入的观察器（便于链式读取结果）
+        """
+        remaining = int(round(duration / self.dt)) // decimate
+        chunk_out = max(1, int(round(chunk_duration / self.dt)) // decimate)
+        while remaining > 0:
+            n_out = min(chunk_out, remaining)
+            t, v, ys = self._advance(n_out, decimate, record_states)
+            with self._phase('observers'):
+                for obs in observers:
+                    obs.update(t, v, ys)
+            remaining -= n_out
+
+        with self._phase('observers'):
+            for obs in observers:
+                if hasattr(obs, 'finalize'):
+                    obs.finalize()
+        self._finish_run()
+        return observers
+
+
+def run_model(model, duration=None, decimate=1, record_states=True, seed=None,
+              profile=False, log_path=None):
+    """
+    用分块内核运行模型参数，并整理为与 model.run() 相同布局的输出。
+
+    profile=True 时分阶段统计（prepare / compile / output / integrate / unpack）
+    同时写入 model.last_run_stats。
+
+    Parameters
+    ----------
+    model : object
+        模型（读取 model.params）
+    duration : float, optional
+        时长 (ms)（默认 model.params['duration']）
+    decimate : int
+        输出降采样倍数
+    record_states : bool
+        是否输出 y0 ... y9（否则只有 v_pyr）
+    seed : int, optional
+        噪声随机种子（默认 model.params['seed']）
+    profile : bool
+        是否记录分阶段统计
+    log_path : str, optional
+        把统计追加到该 JSON lines 文件
+
+    Returns
+    -------
+    outputs : dict
+        't' (T,)、'v_pyr' (N, T)，以及 record_states 时的 'y0' ... 'y9' (N, T)
+    """
+    params = model.params
+    if duration is None:
+        duration = params['duration']
+    sim = ChunkedSimulation(params, seed=seed, profile=profile, log_path=log_path)
+    n_out = int(round(duration / sim.dt)) // decimate
+    t, v, ys = sim._advance(n_out, decimate, record_states)
+
+    with sim._phase('unpack'):
+        outputs = {'t': t, 'v_pyr': v}
+        if record_states:
+            for k in range(N_STATE_VARS):
+                outputs[f'y{k}'] = ys[k]
+    sim._finish_run(duration_ms=float(duration))
+    if profile:
+        model.last_run_stats = sim.last_run_stats
+    return outputs